@@ -0,0 +1,180 @@
+"""Benchmarks variants of the generated NoC model in Modest.
+
+Every variant of a mesh size is simulated with the same properties, number of runs and seed, and the
+simulation time and peak memory Modest reports are compared against the first variant. Each noise type is
+measured on its own, since resistive and inductive noise are tracked by different parts of the model. Variants are
+different encodings of the same model, so their estimates are compared as well.
+
+    python benchmark.py                                  # 2x2 to 8x8, every variant against the generic model
+    python benchmark.py --variants list specialized      # generic against specialized router processes
+    python benchmark.py --sizes 2 4 --runs 5000 --repeat 3
+    python benchmark.py --ptypes INDUCTIVE               # only the inductive noise properties
+"""
+import argparse
+import csv
+import statistics
+from dataclasses import dataclass
+from pathlib import Path
+
+import modest
+from noc import Noc, PropertyType
+from probabilities import parse_probabilities
+
+# The keyword arguments of `Noc` that make up each variant of the model
+VARIANTS: dict[str, dict] = {
+    "list": {"buffer_encoding": "list"},
+    "array": {"buffer_encoding": "array"},
+    "specialized": {"specialize_routers": True},
+    "array-specialized": {"buffer_encoding": "array", "specialize_routers": True},
+}
+
+# The property types that can be simulated, as opposed to the functional properties that need model checking
+PTYPES: tuple[PropertyType, ...] = (PropertyType.RESISTIVE, PropertyType.INDUCTIVE, PropertyType.BOTH_RI)
+
+DEFAULT_SIZES: list[int] = [2, 3, 4, 5, 6, 7, 8]
+DEFAULT_PTYPES: list[PropertyType] = [PropertyType.RESISTIVE, PropertyType.INDUCTIVE]
+DEFAULT_RUNS: int = 1000
+DEFAULT_CLK_HIGH: int = 100
+DEFAULT_SEED: int = 1
+
+
+@dataclass
+class Measurement:
+    """The resources one variant of a model used in Modest.
+
+    Attributes:
+        size (int): The size of the mesh.
+        variant (str): The name of the variant in `VARIANTS`.
+        ptype (PropertyType): The properties that were simulated.
+        simulation_time (float | None): The median simulation time Modest reported in seconds.
+        memory (float | None): The largest peak memory of the runs in MB.
+        probabilities (list[tuple[int, float]]): The estimates of the first run.
+        failure (str | None): Why a run failed, or None if every run succeeded.
+    """
+    size: int
+    variant: str
+    ptype: PropertyType
+    simulation_time: float | None
+    memory: float | None
+    probabilities: list[tuple[int, float]]
+    failure: str | None = None
+
+
+def measure(size: int, variant: str, *, ptype: PropertyType = PropertyType.RESISTIVE, runs: int = DEFAULT_RUNS, clk_high: int = DEFAULT_CLK_HIGH, seed: int = DEFAULT_SEED,
+            repeat: int = 1, timeout: float | None = None) -> Measurement:
+    """Simulates a variant of the model of a mesh and measures it.
+
+    Args:
+        size (int): The size of the mesh.
+        variant (str): The name of the variant in `VARIANTS`.
+        ptype (PropertyType, optional): The noise properties to simulate, one of `PTYPES`. Defaults to RESISTIVE.
+        runs (int, optional): The number of simulation runs. Defaults to `DEFAULT_RUNS`.
+        clk_high (int, optional): The last clock cycle of the noise properties. Defaults to `DEFAULT_CLK_HIGH`.
+        seed (int, optional): The seed of the simulator. Defaults to `DEFAULT_SEED`.
+        repeat (int, optional): How many times to simulate the model. Defaults to 1.
+        timeout (float | None, optional): Seconds after which a simulation is stopped. Defaults to None.
+
+    Returns:
+        Measurement: The measurement.
+    """
+    assert ptype in PTYPES, f"Only the properties {[p.name for p in PTYPES]} can be simulated"
+    noc = Noc(size, **VARIANTS[variant])
+    precision = modest.Precision(runs=runs, seed=seed)
+
+    times, memories, probabilities = [], [], []
+    with modest.workspace().model(noc.iter_chunks(ptype, clk_high=clk_high)) as model:
+        for i in range(repeat):
+            result = modest.simulate_run(model, precision=precision, timeout=timeout)
+            if result.failure is not None:
+                return Measurement(size, variant, ptype, None, None, [], result.failure)
+
+            times.append(result.simulation_time if result.simulation_time is not None else result.wall_time)
+            memories.append(result.memory)
+            if i == 0:
+                probabilities = parse_probabilities(result.output)
+
+    return Measurement(size, variant, ptype, statistics.median(times), max(memories), probabilities)
+
+
+def max_difference(a: list[tuple[int, float]], b: list[tuple[int, float]]) -> float | None:
+    """Returns the largest difference between the estimates of two measurements, or None if they don't cover the same clock cycles."""
+    if [clk for clk, _ in a] != [clk for clk, _ in b]:
+        return None
+    return max((abs(p - q) for (_, p), (_, q) in zip(a, b)), default=0.0)
+
+
+def compare(measurements: list[Measurement]) -> list[tuple[float, float, float | None] | None]:
+    """Compares every measurement with the first one of its size and property type.
+
+    Returns:
+        list[tuple[float, float, float | None] | None]: The speedup, memory ratio and largest difference of the
+            estimates of each measurement, or None for a failed one.
+    """
+    comparisons = []
+    baselines = {}
+    for m in measurements:
+        if m.failure is not None:
+            comparisons.append(None)
+            continue
+
+        baseline = baselines.setdefault((m.size, m.ptype), m)
+        speedup = baseline.simulation_time / m.simulation_time if m.simulation_time else float("nan")
+        memory = m.memory / baseline.memory if baseline.memory else float("nan")
+        comparisons.append((speedup, memory, max_difference(baseline.probabilities, m.probabilities)))
+    return comparisons
+
+
+def format_measurements(measurements: list[Measurement]) -> str:
+    """Formats the measurements as a table, comparing every variant with the first one of its size and property type."""
+    report_str = f"{'Size':>6} {'Variant':>18} {'Noise':>10} {'Time (s)':>10} {'Speedup':>8} {'Memory (MB)':>12} {'Memory':>7} {'Max |dP|':>9}\n"
+    for m, comparison in zip(measurements, compare(measurements)):
+        if comparison is None:
+            report_str += f"{m.size:>4}x{m.size} {m.variant:>18} {m.ptype.name:>10} failed: {m.failure}\n"
+            continue
+
+        speedup, memory, difference = comparison
+        report_str += f"{m.size:>4}x{m.size} {m.variant:>18} {m.ptype.name:>10} {m.simulation_time:>10.3f} {speedup:>7.2f}x {m.memory:>12.1f} {memory:>6.2f}x"
+        report_str += f" {'-' if difference is None else f'{difference:.4f}':>9}\n"
+    return report_str
+
+
+def write_measurements(measurements: list[Measurement], filename: Path):
+    """Writes the measurements to a CSV file, comparing every variant with the first one of its size and property type."""
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    with open(filename, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Size", "Variant", "Noise Type", "Simulation Time (s)", "Peak Memory (MB)", "Speedup", "Memory Ratio", "Max |dP|", "Failure"])
+        for m, comparison in zip(measurements, compare(measurements)):
+            speedup, memory, difference = comparison or (None, None, None)
+            writer.writerow([m.size, m.variant, m.ptype.name, m.simulation_time, m.memory, speedup, memory, difference, m.failure or ""])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark variants of the NoC model in Modest.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="The mesh sizes.")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS),
+                        help="The variants, compared against the first.")
+    parser.add_argument("--ptypes", nargs="+", choices=[p.name for p in PTYPES], default=[p.name for p in DEFAULT_PTYPES],
+                        help="The noise properties, each benchmarked separately.")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="The number of simulation runs.")
+    parser.add_argument("--clk-high", type=int, default=DEFAULT_CLK_HIGH, help="The last clock cycle of the properties.")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=1, help="Simulate every model this many times and take the median time.")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds after which a simulation is stopped.")
+    parser.add_argument("--output", type=Path, default=Path("results/benchmark.csv"))
+    args = parser.parse_args()
+
+    measurements = []
+    for size in args.sizes:
+        for ptype in (PropertyType[name] for name in args.ptypes):
+            for variant in args.variants:
+                print(f"[info]: simulating the {variant} variant of the {size}x{size} model with {ptype.name} properties")
+                measurements.append(measure(size, variant, ptype=ptype, runs=args.runs, clk_high=args.clk_high, seed=args.seed,
+                                            repeat=args.repeat, timeout=args.timeout))
+
+    print(format_measurements(measurements))
+    write_measurements(measurements, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""Declarative PSN sweep campaigns, scheduled across the local cores by memory footprint.
+
+A campaign spec lists experiments. Every experiment is expanded into one job per combination of its
+sizes, noise types, thresholds and strides, and each job is a call of `psn_results.simulate`. The
+strides can also be given per threshold, as a mapping from threshold to stride. The
+jobs run in parallel processes, longest first. A job starts only while a core is free and its
+projected memory fits in the budget, so short jobs fill the gaps around long ones.
+
+Example spec:
+
+    {
+        "result_path": "results",
+        "cores": 8,
+        "memory_mb": 14000,
+        "defaults": {"block_size": 50},
+        "experiments": [
+            {"sizes": [2, 3], "noise": ["resistive"], "thresholds": [1, 5], "strides": [1], "clk_upper": null},
+            {"sizes": [2], "noise": ["inductive"], "thresholds": [1, 5], "strides": {"1": 6, "5": 12}},
+            {"sizes": [8], "noise": ["inductive"], "thresholds": [1], "strides": [1], "clk_upper": 5,
+             "noc": {"buffer_size": 4}}
+        ]
+    }
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import resource
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import modest
+import psn_results
+from noc import PropertyType
+from scheduling import MemoryBudget
+
+# Rough peak memory of a simulation in MB by mesh size, used until a job of that size has been measured
+DEFAULT_MEMORY_MB: dict[int, float] = {2: 120.0, 3: 200.0, 4: 300.0, 8: 600.0}
+
+# Rough duration of a sweep in seconds by mesh size, used when a job has no timing file from an earlier run
+DEFAULT_DURATION_S: dict[int, float] = {2: 15 * 60.0, 3: 45 * 60.0, 4: 2 * 3600.0, 8: 8 * 3600.0}
+
+NOISE_TYPES: dict[str, PropertyType] = {"resistive": PropertyType.RESISTIVE, "inductive": PropertyType.INDUCTIVE}
+
+# The sweeps of the paper, as run one after another by the noc_* functions of psn_results
+PAPER_CAMPAIGN: dict = {
+    "result_path": "results",
+    "experiments": [
+        {"sizes": [2], "noise": ["resistive"], "thresholds": [1, 5, 10, 20], "strides": {"1": 1, "5": 1, "10": 4, "20": 7}},
+        {"sizes": [2], "noise": ["inductive"], "thresholds": [1, 5, 10], "strides": {"1": 6, "5": 12, "10": 36}},
+        {"sizes": [3, 4], "noise": ["resistive"], "thresholds": [1, 5, 10, 20], "strides": [1]},
+        {"sizes": [3, 4], "noise": ["inductive"], "thresholds": [1, 5, 10], "strides": {"1": 1, "5": 2, "10": 4}},
+        {"sizes": [8], "noise": ["resistive"], "thresholds": [1, 5, 10, 20], "strides": [1], "clk_upper": 5},
+        {"sizes": [8], "noise": ["inductive"], "thresholds": [1, 5, 10, 20], "strides": [1], "clk_upper": 40},
+    ],
+}
+
+
+@dataclass
+class Job:
+    """A single sweep of a campaign.
+
+    Attributes:
+        size (int): The size of the NoC (size x size).
+        ptype (PropertyType): The noise type.
+        threshold (int): The noise threshold.
+        stride (int): The stride for the clock cycle.
+        clk_upper (int | None): The upper bound of the clock cycle, or None to sweep until saturation.
+        result_path (Path): The directory of the results.
+        noc_options (dict): Further keyword arguments of `Noc`.
+        options (dict): Further keyword arguments of `psn_results.simulate`, e.g. `block_size`.
+    """
+    size: int
+    ptype: PropertyType
+    threshold: int
+    stride: int
+    clk_upper: int | None
+    result_path: Path
+    noc_options: dict = field(default_factory=dict)
+    options: dict = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        """A short description of the job."""
+        return f"{self.size}x{self.size} {self.ptype.name.lower()} threshold {self.threshold} stride {self.stride}"
+
+    def simulate_kwargs(self) -> dict:
+        """Returns the keyword arguments of `psn_results.simulate` that run this job."""
+        return dict(size=self.size, ptype=self.ptype, threshold=self.threshold, stride=self.stride, clk_upper=self.clk_upper,
+                    result_path=self.result_path, noc_options=self.noc_options or None, **self.options)
+
+
+def expand(spec: dict) -> list[Job]:
+    """Expands a campaign spec into its jobs.
+
+    Args:
+        spec (dict): The campaign spec. See the module documentation for its format.
+
+    Returns:
+        list[Job]: One job per combination of the sizes, noise types, thresholds and strides of each experiment.
+    """
+    result_root = Path(spec.get("result_path", "results"))
+    defaults = spec.get("defaults", {})
+
+    jobs = []
+    for experiment in spec["experiments"]:
+        options = {**defaults, **experiment.get("options", {})}
+        strides = experiment.get("strides", [1])
+        for size, noise, threshold in itertools.product(experiment["sizes"], experiment["noise"], experiment["thresholds"]):
+            threshold_strides = [strides[str(threshold)]] if isinstance(strides, dict) else strides
+            jobs.extend(Job(
+                size=size,
+                ptype=NOISE_TYPES[noise],
+                threshold=threshold,
+                stride=stride,
+                clk_upper=experiment.get("clk_upper"),
+                result_path=Path(experiment.get("result_path", result_root / f"{size}x{size}")),
+                noc_options=experiment.get("noc", {}),
+                options=options,
+            ) for stride in threshold_strides)
+    return jobs
+
+
+def measured_duration(job: Job) -> float | None:
+    """Reads the duration of a job from the timing file of an earlier run, if there is one."""
+    pattern = f"noc_{job.size}x{job.size}_{job.ptype.name.lower()}_noise_threshold_{job.threshold}_stride_{job.stride}_*.time.txt"
+    for timing_file in sorted(job.result_path.glob(pattern)):
+        match = re.search(r"Total elapsed time: (\d+):(\d+):([\d.]+)", timing_file.read_text())
+        if match:
+            hours, minutes, seconds = match.groups()
+            return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    return None
+
+
+def estimate_duration(job: Job) -> float:
+    """Estimates how long a job runs in seconds, preferring the duration of an earlier run."""
+    duration = measured_duration(job)
+    if duration is not None:
+        return duration
+    if job.size in DEFAULT_DURATION_S:
+        return DEFAULT_DURATION_S[job.size]
+    # The state space grows with the number of routers, so scale the largest known size
+    known = max(DEFAULT_DURATION_S)
+    return DEFAULT_DURATION_S[known] * (job.size / known) ** 4
+
+
+def _job_kind(job: Job) -> tuple[str, int]:
+    return ("simulate", job.size)
+
+
+def _run_job(job: Job) -> tuple[float, float]:
+    """Runs a job in a worker process.
+
+    Returns:
+        tuple[float, float]: The wall time of the job in seconds and the largest resident set size of a
+            single one of its Modest processes in MB.
+    """
+    start_time = time.time()
+    psn_results.simulate(**job.simulate_kwargs())
+    max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux reports ru_maxrss in KB, macOS in bytes
+    max_rss /= 1024 * 1024 if sys.platform == "darwin" else 1024
+    return time.time() - start_time, max_rss
+
+
+@dataclass
+class JobReport:
+    """When a job ran and what it used.
+
+    Attributes:
+        job (Job): The job.
+        start (float): Seconds from the start of the campaign until the job started.
+        duration (float): The wall time of the job in seconds.
+        memory (float): The projected peak memory of the job in MB: the largest resident set size of its
+            Modest processes times the number of blocks it simulates at once.
+        error (str | None): The exception the job raised, or None if it succeeded.
+    """
+    job: Job
+    start: float
+    duration: float
+    memory: float
+    error: str | None = None
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+
+def run_campaign(jobs: list[Job], *, cores: int | None = None, memory_budget: MemoryBudget | None = None) -> list[JobReport]:
+    """Runs the jobs of a campaign in parallel processes.
+
+    Jobs are started longest first, by their estimated duration. Whenever a core frees up, the longest
+    waiting job that fits in the memory budget is started, so shorter jobs fill the gaps while a long
+    job waits for memory. A job reserves the footprint of a Modest run once for every block it simulates
+    at once (its `workers` option).
+
+    Args:
+        jobs (list[Job]): The jobs to run.
+        cores (int | None, optional): The number of cores to use. A job takes as many cores as its `workers`
+            option. Defaults to all cores.
+        memory_budget (MemoryBudget | None, optional): The memory available to the jobs. Defaults to no limit.
+
+    Returns:
+        list[JobReport]: What each job used, in the order the jobs finished.
+    """
+    cores = cores or os.cpu_count() or 1
+    if memory_budget is None:
+        memory_budget = MemoryBudget(float("inf"))
+
+    # Assume the rough footprints until a job of each size has been measured
+    for job in jobs:
+        if job.size in DEFAULT_MEMORY_MB:
+            memory_budget.defaults.setdefault(_job_kind(job), DEFAULT_MEMORY_MB[job.size])
+
+    waiting = sorted(jobs, key=estimate_duration, reverse=True)
+    running = {}
+    reports = []
+    free_cores = cores
+    start_time = time.time()
+
+    # A fresh process per job, so that the memory of its Modest processes is measured separately
+    with ProcessPoolExecutor(max_workers=cores, max_tasks_per_child=1) as executor:
+        while waiting or running:
+            for job in list(waiting):
+                job_cores = min(job.options.get("workers", 1), cores)
+                if job_cores > free_cores:
+                    continue
+
+                token = memory_budget.try_admit(_job_kind(job), job.options.get("workers", 1))
+                if token is None:
+                    continue
+
+                print(f"[campaign]: starting {job.name} (estimated {psn_results.time_to_str(estimate_duration(job))})")
+                running[executor.submit(_run_job, job)] = (job, token, time.time() - start_time, job_cores)
+                waiting.remove(job)
+                free_cores -= job_cores
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, token, started, job_cores = running.pop(future)
+                memory_budget.release(token)
+                free_cores += job_cores
+
+                try:
+                    duration, run_memory = future.result()
+                    error = None
+                    memory_budget.record(_job_kind(job), modest.RunResult(output=None, wall_time=duration, max_rss=run_memory))
+                    memory = run_memory * job.options.get("workers", 1)
+                except Exception as e:
+                    duration, memory, error = time.time() - start_time - started, 0.0, repr(e)
+
+                reports.append(JobReport(job, started, duration, memory, error))
+                status = "failed" if error else "finished"
+                print(f"[campaign]: {status} {job.name} in {psn_results.time_to_str(duration)}")
+
+    return reports
+
+
+def format_report(reports: list[JobReport], cores: int) -> str:
+    """Formats the schedule of a campaign and its critical path.
+
+    The jobs are independent, so the critical path of the campaign is its longest job. No schedule on
+    `cores` cores can finish before both the critical path and the total work divided by the cores.
+
+    Args:
+        reports (list[JobReport]): The reports of the jobs.
+        cores (int): The number of cores the campaign ran on.
+
+    Returns:
+        str: The report.
+    """
+    if not reports:
+        return "No jobs were run.\n"
+
+    makespan = max(report.end for report in reports)
+    work = sum(report.duration for report in reports)
+    critical = max(reports, key=lambda report: report.duration)
+    lower_bound = max(critical.duration, work / cores)
+
+    report_str = "Campaign schedule:\n"
+    for report in sorted(reports, key=lambda report: report.start):
+        report_str += f"  {psn_results.time_to_str(report.start)} - {psn_results.time_to_str(report.end)}  {report.job.name}"
+        report_str += f"  ({report.memory:.0f} MB)" if report.error is None else f"  FAILED: {report.error}"
+        report_str += "\n"
+
+    report_str += f"\nMakespan: {psn_results.time_to_str(makespan)}\n"
+    report_str += f"Critical path: {psn_results.time_to_str(critical.duration)} ({critical.job.name})\n"
+    report_str += f"Total work: {psn_results.time_to_str(work)} on {cores} cores\n"
+    report_str += f"Lower bound on the makespan: {psn_results.time_to_str(lower_bound)}\n"
+    return report_str
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a declarative campaign of PSN sweeps.")
+    parser.add_argument("spec", type=Path, nargs="?", help="The JSON campaign spec. Defaults to the sweeps of the paper.")
+    parser.add_argument("--cores", type=int, help="The number of cores to use. Overrides the spec.")
+    parser.add_argument("--memory", type=float, help="The memory budget in MB. Overrides the spec.")
+    parser.add_argument("--dry-run", action="store_true", help="List the jobs and their estimates without running them.")
+    args = parser.parse_args()
+
+    spec = json.loads(args.spec.read_text()) if args.spec else PAPER_CAMPAIGN
+    jobs = expand(spec)
+    cores = args.cores or spec.get("cores") or os.cpu_count() or 1
+    memory = args.memory or spec.get("memory_mb")
+
+    if args.dry_run:
+        for job in sorted(jobs, key=estimate_duration, reverse=True):
+            print(f"{job.name}: estimated {psn_results.time_to_str(estimate_duration(job))}")
+        return
+
+    reports = run_campaign(jobs, cores=cores, memory_budget=MemoryBudget(memory) if memory else None)
+    report_str = format_report(reports, cores)
+    print(report_str)
+
+    result_root = Path(spec.get("result_path", "results"))
+    result_root.mkdir(parents=True, exist_ok=True)
+    (result_root / f"{args.spec.stem if args.spec else 'paper'}.campaign.txt").write_text(report_str)
+
+
+if __name__ == "__main__":
+    main()
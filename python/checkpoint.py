@@ -0,0 +1,93 @@
+"""Checkpoints of the clock cycle blocks of a PSN sweep, so that an interrupted sweep can be resumed."""
+import dataclasses
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from modest import RunResult
+
+MANIFEST_NAME: str = "manifest.json"
+
+
+class BlockCheckpoint:
+    """A directory holding every block of a sweep that has finished so far.
+
+    Each block is written atomically to its own JSON file as soon as it finishes, so a crash loses
+    at most the blocks that were still running. A manifest records the parameters of the sweep;
+    blocks saved by a sweep with different parameters are discarded instead of resumed.
+    """
+
+    def __init__(self, path: Path, parameters: dict):
+        """Initializes the checkpoint.
+
+        Args:
+            path (Path): The checkpoint directory.
+            parameters (dict): Everything that affects the results of the sweep. Must be JSON serializable.
+        """
+        self.path: Path = path
+        self.parameters: dict = json.loads(json.dumps(parameters))
+
+    def _block_path(self, lower: int) -> Path:
+        return self.path / f"block_{lower:010d}.json"
+
+    def _write(self, path: Path, data: dict):
+        """Writes a JSON file atomically."""
+        fd, tmp_name = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_name, path)
+
+    def load(self) -> tuple[dict[int, tuple[int, RunResult]], float]:
+        """Reads the finished blocks and starts a new checkpoint if the parameters changed.
+
+        Returns:
+            tuple[dict[int, tuple[int, RunResult]], float]: The upper bound and Modest run of each finished
+                block by its lower bound, and the elapsed time of the sweep when the last of them finished.
+        """
+        try:
+            with open(self.path / MANIFEST_NAME, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            manifest = None
+
+        if manifest != self.parameters:
+            self.clear()
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._write(self.path / MANIFEST_NAME, self.parameters)
+            return {}, 0.0
+
+        blocks = {}
+        elapsed = 0.0
+        for block_path in sorted(self.path.glob("block_*.json")):
+            try:
+                with open(block_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except json.JSONDecodeError:
+                continue
+
+            blocks[data["lower"]] = (data["upper"], RunResult(**data["result"]))
+            elapsed = max(elapsed, data["elapsed"])
+
+        return blocks, elapsed
+
+    def save(self, lower: int, upper: int, result: RunResult, elapsed: float):
+        """Saves a finished block.
+
+        Args:
+            lower (int): The lower clock cycle of the block.
+            upper (int): The upper clock cycle of the block.
+            result (RunResult): The Modest run of the block.
+            elapsed (float): The elapsed time of the sweep in seconds.
+        """
+        self._write(self._block_path(lower), {
+            "lower": lower,
+            "upper": upper,
+            "result": dataclasses.asdict(result),
+            "elapsed": elapsed,
+        })
+
+    def clear(self):
+        """Removes the checkpoint."""
+        shutil.rmtree(self.path, ignore_errors=True)
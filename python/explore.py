@@ -0,0 +1,314 @@
+"""Explores the `Noc` parameters with a space-filling design and a Gaussian process surrogate of the PSN curves.
+
+Each configuration of the NoC parameters is summarized by its PSN curve at a few probe clock cycles.
+The exploration starts with a Latin hypercube design. A Gaussian process is fitted to the curves
+simulated so far, and the next configuration is the candidate with the highest expected information
+gain per unit of its predicted cost. Candidates the surrogate already predicts within the tolerance are
+not simulated. The exploration ends once every candidate is predicted confidently or the budget is spent.
+
+    exploration = explore(size=2, ptype=PropertyType.RESISTIVE, threshold=1, clk_upper=60, probe_clks=[10, 20, 30, 40])
+"""
+import csv
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import psn_results
+from noc import PropertyType
+
+# The parameters of `Noc.__init__` that are explored, and their inclusive ranges
+DEFAULT_SPACE: dict[str, tuple[int, int]] = {
+    "buffer_size": (2, 8),
+    "activity_thresh": (1, 5),
+    "injection_rate_numerator": (1, 9),
+    "injection_rate_denominator": (10, 10),
+}
+
+# The length scales the surrogate chooses from by maximum likelihood, on parameters scaled to [0, 1]
+LENGTH_SCALES: tuple[float, ...] = (0.1, 0.2, 0.4, 0.8, 1.6)
+
+
+def latin_hypercube(space: dict[str, tuple[int, int]], samples: int, rng: random.Random) -> list[dict[str, int]]:
+    """Samples integer configurations with a Latin hypercube design.
+
+    Every parameter's range is split into `samples` strata and each stratum is sampled once, so the
+    design covers every parameter evenly however few samples it has.
+
+    Args:
+        space (dict[str, tuple[int, int]]): The inclusive range of each parameter.
+        samples (int): The number of configurations.
+        rng (random.Random): The random number generator.
+
+    Returns:
+        list[dict[str, int]]: The configurations, without duplicates.
+    """
+    columns = {}
+    for name, (low, high) in space.items():
+        strata = [(i + rng.random()) / samples for i in range(samples)]
+        rng.shuffle(strata)
+        columns[name] = [min(high, low + math.floor(u * (high - low + 1))) for u in strata]
+
+    configurations = []
+    for i in range(samples):
+        configuration = {name: column[i] for name, column in columns.items()}
+        if "injection_rate_numerator" in configuration and "injection_rate_denominator" in configuration:
+            configuration["injection_rate_numerator"] = min(configuration["injection_rate_numerator"],
+                                                            configuration["injection_rate_denominator"])
+        if configuration not in configurations:
+            configurations.append(configuration)
+    return configurations
+
+
+def _cholesky(matrix: list[list[float]]) -> list[list[float]]:
+    """Returns the lower triangular Cholesky factor of a symmetric positive definite matrix."""
+    n = len(matrix)
+    factor = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1):
+            s = matrix[i][j] - sum(factor[i][k] * factor[j][k] for k in range(j))
+            factor[i][j] = math.sqrt(max(s, 1e-12)) if i == j else s / factor[j][j]
+    return factor
+
+
+def _solve_lower(factor: list[list[float]], b: list[float]) -> list[float]:
+    """Solves L x = b by forward substitution."""
+    x = []
+    for i, row in enumerate(factor):
+        x.append((b[i] - sum(row[k] * x[k] for k in range(i))) / row[i])
+    return x
+
+
+def _solve_upper(factor: list[list[float]], b: list[float]) -> list[float]:
+    """Solves L^T x = b by back substitution."""
+    n = len(factor)
+    x = [0.0] * n
+    for i in reversed(range(n)):
+        x[i] = (b[i] - sum(factor[k][i] * x[k] for k in range(i + 1, n))) / factor[i][i]
+    return x
+
+
+class GaussianProcess:
+    """A Gaussian process regression of several outputs that share one squared exponential kernel.
+
+    The inputs are scaled to [0, 1] by the ranges of the parameter space. The length scale is chosen
+    from `LENGTH_SCALES` by maximizing the marginal likelihood of every output together.
+    """
+
+    def __init__(self, space: dict[str, tuple[int, int]], *, noise: float = 0.01):
+        """Initializes an unfitted process.
+
+        Args:
+            space (dict[str, tuple[int, int]]): The inclusive range of each parameter.
+            noise (float, optional): The standard deviation of the noise of the observations, e.g. the half-width
+                of the estimated probabilities. Defaults to 0.01.
+        """
+        self.space: dict[str, tuple[int, int]] = space
+        self.noise: float = noise
+        self.length_scale: float = LENGTH_SCALES[0]
+        self._inputs: list[list[float]] = []
+        self._means: list[float] = []
+        self._variance: float = 1.0
+        self._factor: list[list[float]] = []
+        self._weights: list[list[float]] = []
+
+    def _scale(self, configuration: dict[str, int]) -> list[float]:
+        return [(configuration[name] - low) / (high - low) if high > low else 0.0 for name, (low, high) in self.space.items()]
+
+    def _kernel(self, a: list[float], b: list[float], length_scale: float) -> float:
+        return self._variance * math.exp(-0.5 * sum((x - y) ** 2 for x, y in zip(a, b)) / length_scale ** 2)
+
+    def _factorize(self, length_scale: float) -> list[list[float]]:
+        matrix = [[self._kernel(a, b, length_scale) for b in self._inputs] for a in self._inputs]
+        for i in range(len(matrix)):
+            matrix[i][i] += self.noise ** 2
+        return _cholesky(matrix)
+
+    def fit(self, configurations: list[dict[str, int]], outputs: list[list[float]]):
+        """Fits the process to observed outputs.
+
+        Args:
+            configurations (list[dict[str, int]]): The observed configurations.
+            outputs (list[list[float]]): The outputs of each configuration.
+        """
+        self._inputs = [self._scale(configuration) for configuration in configurations]
+        columns = list(zip(*outputs))
+        self._means = [sum(column) / len(column) for column in columns]
+        centered = [[y - mean for y in column] for column, mean in zip(columns, self._means)]
+        self._variance = max(sum(y * y for column in centered for y in column) / max(len(outputs) * len(columns), 1), self.noise ** 2)
+
+        best = None
+        for length_scale in LENGTH_SCALES:
+            factor = self._factorize(length_scale)
+            log_det = 2 * sum(math.log(factor[i][i]) for i in range(len(factor)))
+            likelihood = 0.0
+            for column in centered:
+                z = _solve_lower(factor, column)
+                likelihood -= 0.5 * sum(v * v for v in z) + 0.5 * log_det
+            if best is None or likelihood > best[0]:
+                best = (likelihood, length_scale, factor)
+
+        _, self.length_scale, self._factor = best
+        self._weights = [_solve_upper(self._factor, _solve_lower(self._factor, column)) for column in centered]
+
+    def predict(self, configuration: dict[str, int]) -> tuple[list[float], float]:
+        """Predicts the outputs of a configuration.
+
+        Returns:
+            tuple[list[float], float]: The predicted mean of each output and the predictive standard deviation,
+                which is the same for every output.
+        """
+        x = self._scale(configuration)
+        k = [self._kernel(x, a, self.length_scale) for a in self._inputs]
+        means = [mean + sum(ki * wi for ki, wi in zip(k, weights)) for mean, weights in zip(self._means, self._weights)]
+        v = _solve_lower(self._factor, k)
+        variance = max(self._variance - sum(vi * vi for vi in v), 0.0)
+        return means, math.sqrt(variance)
+
+    def information_gain(self, configuration: dict[str, int]) -> float:
+        """Returns the expected information gain of observing a configuration, in nats per output."""
+        _, std = self.predict(configuration)
+        return 0.5 * math.log(1 + std ** 2 / self.noise ** 2)
+
+
+def probe_curve(probs: list[tuple[int, float]], probe_clks: list[int]) -> list[float]:
+    """Reads a PSN curve at the probe clock cycles, interpolating linearly between the simulated cycles.
+
+    Probes past the end of the curve take its last probability, since a sweep ends once the curve saturates.
+    """
+    values = []
+    for clk in probe_clks:
+        below = [(c, p) for c, p in probs if c <= clk]
+        above = [(c, p) for c, p in probs if c >= clk]
+        if not below:
+            values.append(above[0][1] if above else 0.0)
+        elif not above:
+            values.append(below[-1][1])
+        else:
+            (c0, p0), (c1, p1) = below[-1], above[0]
+            values.append(p0 if c1 == c0 else p0 + (p1 - p0) * (clk - c0) / (c1 - c0))
+    return values
+
+
+@dataclass
+class Exploration:
+    """The outcome of an exploration.
+
+    Attributes:
+        probe_clks (list[int]): The clock cycles the curves are summarized at.
+        simulated (list[tuple[dict[str, int], list[float], float]]): Each simulated configuration, its probabilities
+            at the probe clock cycles and the wall time of its sweep in seconds.
+        predicted (list[tuple[dict[str, int], list[float], float]]): Each candidate that was not simulated, its
+            predicted probabilities and the predictive standard deviation.
+        sensitivity (dict[str, float]): How much the predicted mean probability changes over the range of each
+            parameter, with the other parameters at the middle of their ranges.
+    """
+    probe_clks: list[int]
+    simulated: list[tuple[dict[str, int], list[float], float]] = field(default_factory=list)
+    predicted: list[tuple[dict[str, int], list[float], float]] = field(default_factory=list)
+    sensitivity: dict[str, float] = field(default_factory=dict)
+
+
+def explore(*, size: int, ptype: PropertyType, threshold: int = 1, clk_upper: int | None, probe_clks: list[int], stride: int = 1,
+            space: dict[str, tuple[int, int]] = DEFAULT_SPACE, initial: int = 8, budget: int = 24, candidates: int = 200,
+            tolerance: float = 0.02, noise: float = 0.01, seed: int = 0, result_path: Path = Path("results/explore"),
+            **simulate_kwargs) -> Exploration:
+    """Maps how the PSN curve depends on the `Noc` parameters with as few sweeps as possible.
+
+    Args:
+        size (int): The size of the NoC (size x size).
+        ptype (PropertyType): The noise type.
+        threshold (int, optional): The noise threshold. Defaults to 1.
+        clk_upper (int | None): The upper bound of the clock cycle of each sweep.
+        probe_clks (list[int]): The clock cycles the curves are summarized at.
+        stride (int, optional): The stride for the clock cycle. Defaults to 1.
+        space (dict[str, tuple[int, int]], optional): The inclusive range of each explored parameter. Parameters
+            left out keep the defaults of `Noc`. Defaults to `DEFAULT_SPACE`.
+        initial (int, optional): The number of configurations of the initial Latin hypercube design. Defaults to 8.
+        budget (int, optional): The most configurations simulated, including the initial design. Defaults to 24.
+        candidates (int, optional): The number of candidate configurations the next one is chosen from. Defaults to 200.
+        tolerance (float, optional): Candidates whose predictive standard deviation is below this are predicted
+            confidently and not simulated. Defaults to 0.02.
+        noise (float, optional): The standard deviation of the simulated probabilities. Defaults to 0.01.
+        seed (int, optional): The seed of the designs. Defaults to 0.
+        result_path (Path, optional): The directory of the sweeps and the summary. Defaults to Path("results/explore").
+        **simulate_kwargs: Further keyword arguments of `psn_results.simulate`.
+
+    Returns:
+        Exploration: The simulated and predicted configurations and the sensitivity of each parameter.
+    """
+    rng = random.Random(seed)
+    exploration = Exploration(probe_clks=list(probe_clks))
+    surrogate = GaussianProcess(space, noise=noise)
+    # Sweep times vary over orders of magnitude, so their logarithm is modelled
+    cost_surrogate = GaussianProcess(space, noise=0.1)
+
+    def simulate(configuration: dict[str, int]):
+        name = "_".join(f"{key}_{value}" for key, value in configuration.items())
+        print(f"[explore]: simulating {configuration}")
+        start_time = time.time()
+        probs = psn_results.simulate(size=size, ptype=ptype, threshold=threshold, clk_upper=clk_upper, stride=stride,
+                                     result_path=result_path / name, noc_options=configuration, **simulate_kwargs)
+        exploration.simulated.append((configuration, probe_curve(probs, probe_clks), time.time() - start_time))
+
+    def refit():
+        configurations = [configuration for configuration, _, _ in exploration.simulated]
+        surrogate.fit(configurations, [values for _, values, _ in exploration.simulated])
+        cost_surrogate.fit(configurations, [[math.log(max(wall_time, 1e-3))] for _, _, wall_time in exploration.simulated])
+
+    for configuration in latin_hypercube(space, initial, rng):
+        simulate(configuration)
+
+    pool = [configuration for configuration in latin_hypercube(space, candidates, rng)
+            if configuration not in [simulated for simulated, _, _ in exploration.simulated]]
+
+    while len(exploration.simulated) < budget and pool:
+        refit()
+
+        # Skip the candidates the surrogate predicts confidently
+        pool = [configuration for configuration in pool if surrogate.predict(configuration)[1] >= tolerance]
+        if not pool:
+            break
+
+        def value(configuration: dict[str, int]) -> float:
+            cost = math.exp(cost_surrogate.predict(configuration)[0][0])
+            return surrogate.information_gain(configuration) / cost
+
+        configuration = max(pool, key=value)
+        pool.remove(configuration)
+        simulate(configuration)
+
+    refit()
+    for configuration in latin_hypercube(space, candidates, random.Random(seed)):
+        if configuration not in [simulated for simulated, _, _ in exploration.simulated]:
+            means, std = surrogate.predict(configuration)
+            exploration.predicted.append((configuration, [min(max(mean, 0.0), 1.0) for mean in means], std))
+
+    center = {name: (low + high) // 2 for name, (low, high) in space.items()}
+    for name, (low, high) in space.items():
+        curve_means = [sum(surrogate.predict({**center, name: value})[0]) / len(probe_clks) for value in range(low, high + 1)]
+        exploration.sensitivity[name] = max(curve_means) - min(curve_means)
+
+    write_exploration(exploration, result_path / f"noc_{size}x{size}_{ptype.name.lower()}_noise_threshold_{threshold}.explore.csv")
+    print(f"[explore]: simulated {len(exploration.simulated)} configurations and predicted {len(exploration.predicted)}")
+    for name, spread in sorted(exploration.sensitivity.items(), key=lambda item: -item[1]):
+        print(f"  [sensitivity]: {name}: {spread:.3f}")
+
+    return exploration
+
+
+def write_exploration(exploration: Exploration, filename: Path):
+    """Writes the simulated and predicted configurations of an exploration to a CSV file."""
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    rows = [(configuration, "simulated", values, 0.0) for configuration, values, _ in exploration.simulated]
+    rows += [(configuration, "predicted", values, std) for configuration, values, std in exploration.predicted]
+    if not rows:
+        return
+
+    names = list(rows[0][0])
+    with open(filename, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(names + ["Source"] + [f"P(clk={clk})" for clk in exploration.probe_clks] + ["Std"])
+        for configuration, source, values, std in rows:
+            writer.writerow([configuration[name] for name in names] + [source] + [f"{v:.4f}" for v in values] + [f"{std:.4f}"])
@@ -0,0 +1,520 @@
+"""Farms the clock cycle blocks of PSN sweeps out to Modest workers on several machines.
+
+A coordinator owns the queue of blocks of every sweep. Workers connect to it over TCP, pull one
+block at a time, simulate it with `modest.simulate_run` and send the result back. Every message is
+a single line of JSON, and every request uses its own connection, so a worker can be stopped or
+started at any time.
+
+A pulled block is leased to its worker. The worker renews the lease with heartbeats while Modest
+runs. If a worker is lost, its lease expires and the block is handed to the next worker that asks.
+Failed blocks are retried up to a number of attempts. Once a block saturates its curve, the later
+blocks of that sweep are dropped from the queue and workers still simulating them are told to stop.
+
+Running a campaign spec (see `campaign.py`) with two local workers for testing:
+
+    python farm.py coordinator campaign.json --port 7341 --local-workers 2
+
+And on every other machine:
+
+    python farm.py worker coordinator-host --port 7341
+"""
+import argparse
+import csv
+import dataclasses
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import campaign
+import modest
+import psn_results
+from noc import Noc
+from probabilities import parse_probabilities
+from result_cache import ResultCache
+from scheduling import RetryPolicy
+
+DEFAULT_PORT: int = 7341
+
+# Seconds a worker may go without a heartbeat before its block is handed to another worker
+LEASE_TIMEOUT: float = 120.0
+
+# Seconds between the heartbeats of a worker simulating a block
+HEARTBEAT_INTERVAL: float = 30.0
+
+# Seconds an idle worker waits before asking for a block again
+POLL_INTERVAL: float = 5.0
+
+# Seconds the coordinator keeps answering once the queue is done, so that every idle worker polls it once more
+DONE_LINGER: float = 2 * POLL_INTERVAL
+
+# The options of a campaign job that farmed sweeps support, the others are rejected
+FARM_OPTIONS: tuple[str, ...] = ("block_size", "generate_flits")
+
+# The `RunResult.killed` of a block whose worker was lost on its last attempt
+KILLED_WORKER_LOST: str = "worker lost"
+
+
+@dataclass
+class Block:
+    """A clock cycle block in the queue of the coordinator.
+
+    Attributes:
+        id (int): The id of the block.
+        sweep (int): The index of the sweep the block belongs to.
+        lower (int): The lower clock cycle of the block.
+        upper (int): The upper clock cycle of the block.
+        stride (int): The stride for the clock cycle.
+        model (str): The digest of the model text (see `Coordinator.add_model`).
+        constants (dict[str, int] | None): Values of the model's open constants.
+        precision (dict | None): The fields of the `modest.Precision` of the block.
+        attempts (int): How often the block has been handed to a worker.
+    """
+    id: int
+    sweep: int
+    lower: int
+    upper: int
+    stride: int
+    model: str
+    constants: dict[str, int] | None = None
+    precision: dict | None = None
+    attempts: int = 0
+
+
+class Coordinator:
+    """The queue of blocks that workers pull from, and the results they send back.
+
+    All methods are thread-safe, since the server handles every connection in its own thread.
+    """
+
+    def __init__(self, *, lease_timeout: float = LEASE_TIMEOUT, retry: RetryPolicy = RetryPolicy()):
+        """Initializes an empty queue.
+
+        Args:
+            lease_timeout (float, optional): Seconds a worker may go without a heartbeat before its block is
+                handed to another worker. Defaults to `LEASE_TIMEOUT`.
+            retry (RetryPolicy, optional): How often a block is attempted, counting attempts lost with their worker.
+                Defaults to RetryPolicy().
+        """
+        self.lease_timeout: float = lease_timeout
+        self.retry: RetryPolicy = retry
+        self.models: dict[str, str] = {}
+        self.blocks: dict[int, Block] = {}
+        self.results: dict[int, modest.RunResult] = {}
+        self._pending: list[int] = []
+        self._leases: dict[int, tuple[str, float]] = {}
+        self._saturated: dict[int, int] = {}
+        self._condition = threading.Condition()
+
+    def add_model(self, model: str) -> str:
+        """Adds a model text that blocks can refer to, so that workers fetch it only once.
+
+        Returns:
+            str: The digest of the model.
+        """
+        digest = hashlib.sha256(model.encode("utf-8")).hexdigest()
+        with self._condition:
+            self.models[digest] = model
+        return digest
+
+    def add_block(self, sweep: int, lower: int, upper: int, stride: int, model: str, constants: dict[str, int] | None = None,
+                  precision: modest.Precision | None = None) -> int:
+        """Adds a block to the end of the queue.
+
+        Args:
+            sweep (int): The index of the sweep the block belongs to.
+            lower (int): The lower clock cycle of the block.
+            upper (int): The upper clock cycle of the block.
+            stride (int): The stride for the clock cycle.
+            model (str): The text of the model.
+            constants (dict[str, int] | None, optional): Values of the model's open constants. Defaults to None.
+            precision (modest.Precision | None, optional): The precision of the estimates. Defaults to Modest's defaults.
+
+        Returns:
+            int: The id of the block.
+        """
+        digest = self.add_model(model)
+        with self._condition:
+            block_id = len(self.blocks)
+            self.blocks[block_id] = Block(block_id, sweep, lower, upper, stride, digest, constants,
+                                          None if precision is None else dataclasses.asdict(precision))
+            self._pending.append(block_id)
+            return block_id
+
+    def _is_dropped(self, block: Block) -> bool:
+        return block.sweep in self._saturated and block.lower > self._saturated[block.sweep]
+
+    def is_dropped(self, block_id: int) -> bool:
+        """Returns True if a block is past the saturation of its sweep, so that it is no longer needed."""
+        with self._condition:
+            return self._is_dropped(self.blocks[block_id])
+
+    def _expire_leases(self):
+        now = time.time()
+        for block_id, (worker, deadline) in list(self._leases.items()):
+            if deadline >= now:
+                continue
+
+            del self._leases[block_id]
+            block = self.blocks[block_id]
+            if block.attempts < self.retry.attempts:
+                print(f"  [warning]: lost worker {worker} simulating block ({block.lower},{block.upper}). Requeueing it...")
+                self._pending.insert(0, block_id)
+            else:
+                self.results[block_id] = modest.RunResult(None, killed=KILLED_WORKER_LOST)
+
+        self._pending = [block_id for block_id in self._pending if not self._is_dropped(self.blocks[block_id])]
+
+    @property
+    def done(self) -> bool:
+        """True once every block has a result or was dropped."""
+        with self._condition:
+            self._expire_leases()
+            return not self._pending and not self._leases
+
+    def pull(self, worker: str) -> Block | None:
+        """Leases the next block to a worker.
+
+        Args:
+            worker (str): The id of the worker.
+
+        Returns:
+            Block | None: The block, or None if no block is waiting.
+        """
+        with self._condition:
+            self._expire_leases()
+            if not self._pending:
+                return None
+
+            block = self.blocks[self._pending.pop(0)]
+            block.attempts += 1
+            self._leases[block.id] = (worker, time.time() + self.lease_timeout)
+            return block
+
+    def heartbeat(self, block_id: int, worker: str) -> bool:
+        """Renews the lease of a block.
+
+        Returns:
+            bool: False if the worker should stop simulating the block, because its lease expired or the
+                block is past the saturation of its sweep.
+        """
+        with self._condition:
+            lease = self._leases.get(block_id)
+            if lease is None or lease[0] != worker or self._is_dropped(self.blocks[block_id]):
+                return False
+
+            self._leases[block_id] = (worker, time.time() + self.lease_timeout)
+            return True
+
+    def complete(self, block_id: int, worker: str, result: modest.RunResult):
+        """Records the result a worker sent back, requeueing the block if it failed.
+
+        A result for a block whose lease was handed to another worker in the meantime is still accepted
+        if the block has no result yet, since it is just as good as the one the other worker is computing.
+        """
+        with self._condition:
+            if block_id in self.results:
+                return
+
+            block = self.blocks[block_id]
+            if self._leases.get(block_id, (None,))[0] == worker:
+                del self._leases[block_id]
+
+            if result.failure is not None and not self._is_dropped(block):
+                print(f"  [warning]: block ({block.lower},{block.upper}) failed on {worker}: {result.failure}")
+                if block.attempts < self.retry.attempts:
+                    if block_id not in self._leases and block_id not in self._pending:
+                        self._pending.insert(0, block_id)
+                    return
+
+            self._leases.pop(block_id, None)
+            if block_id in self._pending:
+                self._pending.remove(block_id)
+            self.results[block_id] = result
+
+            if result.output is not None:
+                probs = parse_probabilities(result.output, clk_low=block.lower, stride=block.stride)
+                if probs and max(p for _, p in probs) >= psn_results.SATURATION_PROBABILITY:
+                    self._saturated[block.sweep] = min(self._saturated.get(block.sweep, block.lower), block.lower)
+
+            print(f"  [info]: {worker} finished block ({block.lower},{block.upper}) of sweep {block.sweep}"
+                  f" ({len(self.results)}/{len(self.blocks)} blocks)")
+            self._condition.notify_all()
+
+    def handle(self, request: dict) -> dict:
+        """Answers a request of a worker.
+
+        Args:
+            request (dict): The request. Its "op" is "pull", "model", "heartbeat" or "result".
+
+        Returns:
+            dict: The reply.
+        """
+        op = request["op"]
+        if op == "pull":
+            block = self.pull(request["worker"])
+            if block is None:
+                return {"block": None, "done": self.done, "wait": POLL_INTERVAL}
+            return {"block": dataclasses.asdict(block), "done": False}
+        if op == "model":
+            with self._condition:
+                return {"model": self.models[request["digest"]]}
+        if op == "heartbeat":
+            return {"continue": self.heartbeat(request["block"], request["worker"])}
+        if op == "result":
+            self.complete(request["block"], request["worker"], modest.RunResult(**request["result"]))
+            return {"ok": True}
+        raise ValueError(f"Unknown request {op!r}")
+
+    def serve(self, host: str = "", port: int = DEFAULT_PORT) -> dict[int, modest.RunResult]:
+        """Serves the queue until every block has a result or was dropped.
+
+        Args:
+            host (str, optional): The address to listen on. Defaults to every address.
+            port (int, optional): The port to listen on. Defaults to `DEFAULT_PORT`.
+
+        Returns:
+            dict[int, modest.RunResult]: The result of every block that was not dropped, by block id.
+        """
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    reply = coordinator.handle(json.loads(self.rfile.readline()))
+                except Exception as e:
+                    reply = {"error": repr(e)}
+                self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        with Server((host, port), Handler) as server:
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            print(f"[farm]: serving {len(self.blocks)} blocks on port {server.server_address[1]}")
+
+            with self._condition:
+                while not self.done:
+                    self._condition.wait(timeout=1.0)
+
+            # Let idle workers learn that the queue is done before shutting down
+            time.sleep(DONE_LINGER)
+            server.shutdown()
+
+        return self.results
+
+
+def _request(host: str, port: int, message: dict, retry: RetryPolicy) -> dict:
+    """Sends a request to the coordinator, retrying while it can't be reached."""
+    for attempt in range(1, retry.attempts + 1):
+        try:
+            with socket.create_connection((host, port)) as connection:
+                connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+                reply = json.loads(connection.makefile("rb").readline())
+        except (OSError, json.JSONDecodeError):
+            if attempt == retry.attempts:
+                raise
+            time.sleep(retry.delay(attempt))
+            continue
+
+        if "error" in reply:
+            raise RuntimeError(f"The coordinator rejected {message['op']!r}: {reply['error']}")
+        return reply
+
+
+def run_worker(host: str, port: int = DEFAULT_PORT, *, worker_id: str | None = None, cache: ResultCache | None = None,
+               timeout: float | None = None, max_memory: float | None = None, retry: RetryPolicy = RetryPolicy(attempts=10)):
+    """Pulls blocks from a coordinator and simulates them until the coordinator's queue is done.
+
+    Args:
+        host (str): The address of the coordinator.
+        port (int, optional): The port of the coordinator. Defaults to `DEFAULT_PORT`.
+        worker_id (str | None, optional): The id the coordinator knows the worker by. Defaults to the host name and process id.
+        cache (ResultCache | None, optional): A local cache of Modest results. Defaults to None.
+        timeout (float | None, optional): Seconds after which the Modest run of a block is killed. Defaults to None.
+        max_memory (float | None, optional): Resident memory in MB above which the Modest run of a block is killed.
+            Defaults to None.
+        retry (RetryPolicy, optional): How often a request is retried while the coordinator can't be reached.
+            Defaults to 10 attempts.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    models = {}
+
+    while True:
+        reply = _request(host, port, {"op": "pull", "worker": worker_id}, retry)
+        if reply["done"]:
+            print(f"[farm]: {worker_id}: the queue is done")
+            return
+        if reply["block"] is None:
+            time.sleep(reply["wait"])
+            continue
+
+        block = Block(**reply["block"])
+        if block.model not in models:
+            models[block.model] = _request(host, port, {"op": "model", "digest": block.model}, retry)["model"]
+
+        # Renew the lease while Modest runs, and stop if the coordinator no longer needs the block
+        stopped = threading.Event()
+        finished = threading.Event()
+
+        def heartbeat():
+            while not finished.wait(HEARTBEAT_INTERVAL):
+                try:
+                    reply = _request(host, port, {"op": "heartbeat", "block": block.id, "worker": worker_id}, RetryPolicy(attempts=1))
+                except (OSError, RuntimeError, json.JSONDecodeError):
+                    continue
+                if not reply["continue"]:
+                    stopped.set()
+                    return
+
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+
+        print(f"[farm]: {worker_id}: simulating block ({block.lower},{block.upper}) of sweep {block.sweep}")
+        precision = None if block.precision is None else modest.Precision(**block.precision)
+        with modest.workspace().model(models[block.model]) as model_path:
+            result = modest.simulate_run(model_path, cancel=stopped.is_set, cache=cache, constants=block.constants,
+                                         precision=precision, timeout=timeout, max_memory=max_memory)
+
+        finished.set()
+        heartbeat_thread.join()
+
+        _request(host, port, {"op": "result", "block": block.id, "worker": worker_id, "result": dataclasses.asdict(result)}, retry)
+
+
+def _collect_sweep(coordinator: Coordinator, results: dict[int, modest.RunResult], sweep: int) -> tuple[list[tuple[int, float]], str]:
+    """Merges the results of the blocks of a sweep in clock order.
+
+    Blocks past the saturation of the sweep are reported as skipped, whether they were dropped from the
+    queue or stopped while running. The ones that finished anyway are merged like any other.
+
+    Returns:
+        tuple[list[tuple[int, float]], str]: The probabilities of the sweep, and the log of its blocks for the timing file.
+    """
+    probs = []
+    output_str = ""
+    blocks = sorted((block for block in coordinator.blocks.values() if block.sweep == sweep), key=lambda block: block.lower)
+
+    for block in blocks:
+        result = results.get(block.id)
+        if result is None or result.failure is not None:
+            if coordinator.is_dropped(block.id):
+                output_str += f"\n[skipped]: block ({block.lower},{block.upper}) past the saturation of the sweep\n"
+            elif result is not None:
+                output_str += f"\n[failed]: block ({block.lower},{block.upper}) {result.failure}\n"
+            continue
+
+        probs.extend(parse_probabilities(result.output, clk_low=block.lower, stride=block.stride))
+        output_str += f"\n{result.output}\n"
+        output_str += f"[resources]: block ({block.lower},{block.upper}) {psn_results.format_resources(result)}\n"
+
+    return probs, output_str
+
+
+def farm_sweeps(jobs: list[campaign.Job], *, host: str = "", port: int = DEFAULT_PORT, precision: modest.Precision | None = None,
+                lease_timeout: float = LEASE_TIMEOUT, retry: RetryPolicy = RetryPolicy()) -> list[list[tuple[int, float]]]:
+    """Farms the blocks of several sweeps out to workers and saves each sweep like `psn_results.simulate` does.
+
+    The queue is filled up front, so every sweep needs a finite `clk_upper`. Blocks past the saturation
+    of their sweep are dropped once it is known.
+
+    Args:
+        jobs (list[campaign.Job]): The sweeps. Their `block_size` option sets the number of properties per block,
+            and their `generate_flits` option the flit generation of the model. Other options are not supported.
+        host (str, optional): The address to listen on. Defaults to every address.
+        port (int, optional): The port to listen on. Defaults to `DEFAULT_PORT`.
+        precision (modest.Precision | None, optional): The precision of the estimates. Defaults to Modest's defaults.
+        lease_timeout (float, optional): Seconds a worker may go without a heartbeat before its block is handed to
+            another worker. Defaults to `LEASE_TIMEOUT`.
+        retry (RetryPolicy, optional): How often a block is attempted. Defaults to RetryPolicy().
+
+    Returns:
+        list[list[tuple[int, float]]]: The probabilities of each sweep.
+    """
+    coordinator = Coordinator(lease_timeout=lease_timeout, retry=retry)
+    nocs = []
+
+    for sweep, job in enumerate(jobs):
+        if job.clk_upper is None:
+            raise ValueError(f"{job.name}: farmed sweeps need a clk_upper")
+        unsupported = sorted(set(job.options) - set(FARM_OPTIONS))
+        if unsupported:
+            raise ValueError(f"{job.name}: farmed sweeps don't support the options {', '.join(unsupported)}")
+
+        noc = Noc(job.size, resistive_noise_threshold=job.threshold, inductive_noise_threshold=job.threshold, **job.noc_options)
+        nocs.append(noc)
+        models = {}
+        for lower, upper in psn_results.clock_blocks(job.clk_upper, job.options.get("block_size", 50) * job.stride):
+            slots = len(range(lower, upper + 1, job.stride))
+            if slots not in models:
+                models[slots] = noc.print(job.ptype, clk_low=lower, clk_high=upper, stride=job.stride,
+                                          generate_flits=job.options.get("generate_flits"), parametric=True)
+            coordinator.add_block(sweep, lower, upper, job.stride, models[slots],
+                                  noc.parametric_constants(clk_low=lower, stride=job.stride), precision)
+
+    start_time = time.time()
+    results = coordinator.serve(host, port)
+    time_str = psn_results.time_to_str(time.time() - start_time)
+
+    curves = []
+    for sweep, job in enumerate(jobs):
+        probs, blocks_str = _collect_sweep(coordinator, results, sweep)
+        output_str = f"Farmed simulation of {job.name} up to clock cycle {job.clk_upper}\n"
+        output_str += blocks_str
+        output_str += f"\nTotal elapsed time: {time_str}\n"
+
+        noc = nocs[sweep]
+        stem = (f"noc_{noc.dimension}x{noc.dimension}_{job.ptype.name.lower()}_noise_threshold_{job.threshold}"
+                f"_stride_{job.stride}_block_size_{job.options.get('block_size', 50) * job.stride}")
+        job.result_path.mkdir(parents=True, exist_ok=True)
+        (job.result_path / f"{stem}.time.txt").write_text(output_str)
+        with open(job.result_path / f"{stem}.csv", "w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["Clock Cycle", "Probability"])
+            writer.writerows(probs)
+        curves.append(probs)
+
+    return curves
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Farm the blocks of PSN sweeps out to Modest workers.")
+    subparsers = parser.add_subparsers(dest="role", required=True)
+
+    coordinator_parser = subparsers.add_parser("coordinator", help="Serve the blocks of a campaign spec.")
+    coordinator_parser.add_argument("spec", type=Path, help="The JSON campaign spec (see campaign.py).")
+    coordinator_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    coordinator_parser.add_argument("--lease-timeout", type=float, default=LEASE_TIMEOUT)
+    coordinator_parser.add_argument("--local-workers", type=int, default=0, help="Also start this many workers on this machine.")
+
+    worker_parser = subparsers.add_parser("worker", help="Simulate blocks pulled from a coordinator.")
+    worker_parser.add_argument("host", help="The address of the coordinator.")
+    worker_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    worker_parser.add_argument("--timeout", type=float, help="Seconds after which the Modest run of a block is killed.")
+
+    args = parser.parse_args()
+
+    if args.role == "worker":
+        run_worker(args.host, args.port, timeout=args.timeout)
+        return
+
+    workers = [multiprocessing.Process(target=run_worker, args=("localhost", args.port)) for _ in range(args.local_workers)]
+    for worker in workers:
+        worker.start()
+
+    farm_sweeps(campaign.expand(json.loads(args.spec.read_text())), port=args.port, lease_timeout=args.lease_timeout)
+
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
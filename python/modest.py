@@ -1,10 +1,62 @@
 """A wrapper for the modest model checker."""
+import asyncio
+import atexit
+import contextlib
+import functools
+import hashlib
+import math
+import os
 import shutil
+import signal
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from dataclasses import dataclass, replace
+from typing import Callable, Iterable, Iterator
+from weakref import WeakKeyDictionary
+
+from probabilities import iter_probabilities, merge_outputs, parse_peak_memory, parse_probabilities, parse_simulation_time
+from result_cache import ResultCache
 
 MODEST_EXECUTABLE: str = "modest"
 
+# How often (in seconds) a running modest process polls its cancellation callback and resource limits
+CANCEL_POLL_INTERVAL: float = 0.5
+
+# Reasons a modest process was killed before it finished (see `RunResult.killed`)
+KILLED_CANCELLED: str = "cancelled"
+KILLED_TIMEOUT: str = "timeout"
+KILLED_MEMORY: str = "memory"
+
+# Commands and options used by `check` and `simulate` (and their async counterparts)
+CHECK_COMMAND: list[str] = [MODEST_EXECUTABLE, "check", "--unsafe", "--chainopt", "-D"]
+SIMULATE_COMMAND: list[str] = [MODEST_EXECUTABLE, "simulate"]
+SIMULATE_OPTS: list[str] = ["--max-run-length", "0", "--unsafe"]
+
+# Options of modest's statistical model checking engine that set the precision of its estimates
+CONFIDENCE_OPT: str = "--confidence"
+WIDTH_OPT: str = "--width"
+RELATIVE_WIDTH_OPT: str = "--relative-width"
+MAX_RUN_COUNT_OPT: str = "--max-run-count"
+RUN_COUNT_OPT: str = "-N"
+SEED_OPT: str = "--seed"
+
+# Options of modest's rare event simulation by importance splitting, and its splitting methods
+SPLITTING_METHOD_OPT: str = "--res-method"
+IMPORTANCE_FUNCTION_OPT: str = "--importance-function"
+SPLITTING_RESTART: str = "restart"
+SPLITTING_FIXED_EFFORT: str = "fixed-effort"
+
+# Maximum number of modest processes the async API runs at the same time. Change it with `set_max_concurrency`.
+MAX_CONCURRENT_RUNS: int = os.cpu_count() or 1
+
+# Directory that holds the model workspaces. If None, a RAM-backed directory is used when available.
+WORKSPACE_ROOT: Path | None = None
+
 
 def is_modest_on_path() -> bool:
     """Checks if 'modest' is available in the system's PATH.
@@ -15,21 +67,453 @@ def is_modest_on_path() -> bool:
     return shutil.which(MODEST_EXECUTABLE) is not None
 
 
+@functools.cache
+def modest_version() -> str:
+    """Returns the version banner of the modest executable on the system's PATH.
+
+    Returns:
+        str: The first line of `modest --version`, or "unknown" if it printed nothing.
+    """
+    result = subprocess.run(
+        [MODEST_EXECUTABLE, "--version"], capture_output=True, text=True
+    )
+
+    stdout = result.stdout.strip()
+    stderr = result.stderr.strip()
+
+    output = stdout + stderr
+
+    lines = output.splitlines()
+    return lines[0] if lines else "unknown"
+
+
+def modest_identity() -> str | None:
+    """Identifies the modest executable on the system's PATH without running it.
+
+    Cheaper than `modest_version`, and still changes whenever modest is replaced or upgraded.
+
+    Returns:
+        str | None: The path, size and modification time of the executable, or None if it is not on the PATH.
+    """
+    path = shutil.which(MODEST_EXECUTABLE)
+    if path is None:
+        return None
+    stat = os.stat(path)
+    return f"{os.path.realpath(path)} {stat.st_size} {stat.st_mtime_ns}"
+
+
+class ModelWorkspace:
+    """A private directory of content-addressed model files.
+
+    Model files are named after the hash of the model text, so identical models are written once
+    and shared by every run that uses them. Files are reference counted and removed as soon as the
+    last run using them finishes, and the whole directory is removed on `cleanup`.
+    """
+
+    def __init__(self, root: Path | None = None):
+        """Creates a new workspace directory.
+
+        Args:
+            root (Path | None, optional): The directory to create the workspace in. Defaults to
+                `WORKSPACE_ROOT`, or a RAM-backed directory if that is not set.
+        """
+        if root is None:
+            root = WORKSPACE_ROOT if WORKSPACE_ROOT is not None else default_workspace_root()
+
+        self.path: Path = Path(tempfile.mkdtemp(prefix="modest_", dir=root))
+        self.pid: int = os.getpid()
+        self._lock = threading.Lock()
+        self._refs: dict[Path, int] = {}
+
+    def acquire(self, model: str | Iterable[str]) -> Path:
+        """Returns the path of a file holding `model`, writing it if no other run is using it.
+
+        Every call must be paired with a call to `release`.
+
+        Args:
+            model (str | Iterable[str]): The text of the model, or its pieces (e.g. from `Noc.iter_chunks`).
+                Pieces are streamed to the file as they are generated, so the model is never held in memory
+                as a whole. The name of the file is only known once the last piece is written, so a streamed
+                model is always written, and discarded if an identical model is already in use.
+
+        Returns:
+            Path: The path to the model file.
+        """
+        if not isinstance(model, str):
+            return self._acquire_chunks(model)
+
+        path = self._path(hashlib.sha256(model.encode("utf-8")))
+
+        with self._lock:
+            if path not in self._refs:
+                tmp_path = path.with_suffix(".tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(model)
+                tmp_path.replace(path)
+                self._refs[path] = 0
+            self._refs[path] += 1
+
+        return path
+
+    def _acquire_chunks(self, chunks: Iterable[str]) -> Path:
+        """Streams the pieces of a model to a file of the workspace, hashing them on the way."""
+        fd, tmp_name = tempfile.mkstemp(suffix=".tmp", dir=self.path)
+        tmp_path = Path(tmp_name)
+        sha = hashlib.sha256()
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                for chunk in chunks:
+                    sha.update(chunk.encode("utf-8"))
+                    f.write(chunk)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        path = self._path(sha)
+        with self._lock:
+            if path in self._refs:
+                tmp_path.unlink()
+            else:
+                tmp_path.replace(path)
+                self._refs[path] = 0
+            self._refs[path] += 1
+
+        return path
+
+    def _path(self, sha) -> Path:
+        """Returns the path of the model file with the given hash."""
+        # Modest derives the model name from the file name, so it must start with a letter
+        return self.path / f"model_{sha.hexdigest()[:32]}.modest"
+
+    def release(self, path: Path):
+        """Releases a model file returned by `acquire`, deleting it once it is no longer used.
+
+        Args:
+            path (Path): The path returned by `acquire`.
+        """
+        with self._lock:
+            self._refs[path] -= 1
+            if self._refs[path] == 0:
+                del self._refs[path]
+                path.unlink(missing_ok=True)
+
+    @contextlib.contextmanager
+    def model(self, model: str | Iterable[str]) -> Iterator[Path]:
+        """Context manager that provides a model file for the duration of the block.
+
+        Args:
+            model (str | Iterable[str]): The text of the model, or its pieces (see `acquire`).
+
+        Yields:
+            Path: The path to the model file.
+        """
+        path = self.acquire(model)
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def cleanup(self):
+        """Removes the workspace directory and every model file in it."""
+        with self._lock:
+            self._refs.clear()
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self) -> "ModelWorkspace":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cleanup()
+
+
+def default_workspace_root() -> Path:
+    """Returns the directory model workspaces are created in by default.
+
+    Returns:
+        Path: /dev/shm if it is a writable RAM-backed directory, the system temp directory otherwise.
+    """
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm
+    return Path(tempfile.gettempdir())
+
+
+_workspace: ModelWorkspace | None = None
+_workspace_lock = threading.Lock()
+
+
+def workspace() -> ModelWorkspace:
+    """Returns the workspace used for models passed to modest as strings.
+
+    Each process gets its own workspace, which is removed when the process exits.
+
+    Returns:
+        ModelWorkspace: The workspace of the current process.
+    """
+    global _workspace
+
+    with _workspace_lock:
+        # A forked child must not share (and delete) the files of its parent
+        if _workspace is None or _workspace.pid != os.getpid():
+            _workspace = ModelWorkspace()
+            atexit.register(_workspace.cleanup)
+
+    return _workspace
+
+
+def __is_model_path(model: str) -> bool:
+    """Returns True if a model given as a string is the path of an existing model file."""
+    try:
+        return Path(model).exists()
+    except OSError:
+        # Model text is usually far too long to be a valid path
+        return False
+
+
+@contextlib.contextmanager
+def __model_file(model: str | Path) -> Iterator[str | Path]:
+    """Context manager that resolves a model to a file that can be passed to modest.
+
+    Args:
+        model (str | Path): Path to the model file or string repr of the model.
+
+    Yields:
+        str | Path: The model file. Models given as strings are written to the workspace.
+
+    Raises:
+        TypeError if model is not a string or Path.
+    """
+    if isinstance(model, str):
+        if __is_model_path(model):
+            yield model
+        else:
+            with workspace().model(model) as filename:
+                yield filename
+    elif isinstance(model, Path):
+        yield model
+    else:
+        raise TypeError(f"model must be a string or Path. Instead got {type(model)}")
+
+
+def __model_text(model: str | Path) -> str:
+    """Returns the text of a model given as a path or as a string."""
+    if isinstance(model, str) and not __is_model_path(model):
+        return model
+    with open(model, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def constant_opts(constants: dict[str, int] | None) -> list[str]:
+    """Returns the modest options that set the values of a model's open constants.
+
+    Args:
+        constants (dict[str, int] | None): The value of each open constant, by name.
+
+    Returns:
+        list[str]: The options to pass to modest.
+    """
+    if not constants:
+        return []
+    return ["-E", ",".join(f"{name}={value}" for name, value in constants.items())]
+
+
+def __slot_mapping(constants: dict[str, int] | None) -> dict[str, int]:
+    """Returns how the property slots of a parametric model map to clock cycles (see `Noc.parametric_constants`)."""
+    if not constants:
+        return {}
+    return {"clk_low": constants.get("CLK_LOW", 0), "stride": constants.get("CLK_STRIDE", 1)}
+
+
+@dataclass(frozen=True)
+class Precision:
+    """The precision modest's statistical model checking engine estimates probabilities to.
+
+    Settings left as None use modest's defaults (a confidence of 0.95 and an absolute half-width of 0.01).
+
+    Attributes:
+        confidence (float | None): The confidence level of the estimates, e.g. 0.95.
+        width (float | None): The half-width of the confidence interval.
+        relative_width (bool): Interpret `width` relative to the estimated probability instead of absolutely.
+        max_runs (int | None): The most simulation runs to spend per property, whatever the precision reached.
+        runs (int | None): Spend exactly this many simulation runs per property instead of stopping adaptively.
+        seed (int | None): The seed of the random number generator, e.g. to make independent simulations.
+        splitting (str | None): Estimate rare events by importance splitting with this method (`SPLITTING_RESTART`
+            or `SPLITTING_FIXED_EFFORT`) instead of plain Monte Carlo. Requires `importance_function`.
+        importance_function (str | None): The Modest expression splitting uses to measure how close a run is to
+            the rare event, e.g. `Noc.level_function`.
+    """
+    confidence: float | None = None
+    width: float | None = None
+    relative_width: bool = False
+    max_runs: int | None = None
+    runs: int | None = None
+    seed: int | None = None
+    splitting: str | None = None
+    importance_function: str | None = None
+
+    def options(self) -> list[str]:
+        """Returns the modest options that set this precision.
+
+        Returns:
+            list[str]: The options to pass to `modest simulate`.
+
+        Raises:
+            ValueError: If `splitting` is set without an `importance_function`.
+        """
+        opts = []
+        if self.confidence is not None:
+            opts += [CONFIDENCE_OPT, str(self.confidence)]
+        if self.width is not None:
+            opts += [RELATIVE_WIDTH_OPT if self.relative_width else WIDTH_OPT, str(self.width)]
+        if self.max_runs is not None:
+            opts += [MAX_RUN_COUNT_OPT, str(self.max_runs)]
+        if self.runs is not None:
+            opts += [RUN_COUNT_OPT, str(self.runs)]
+        if self.seed is not None:
+            opts += [SEED_OPT, str(self.seed)]
+        if self.splitting is not None:
+            if self.importance_function is None:
+                raise ValueError("Importance splitting requires an importance function")
+            opts += [SPLITTING_METHOD_OPT, self.splitting, IMPORTANCE_FUNCTION_OPT, self.importance_function]
+        return opts
+
+    def required_runs(self) -> int:
+        """Returns the number of runs the Okamoto bound needs for this confidence and absolute half-width.
+
+        This is the most runs modest's adaptive engine spends on a property, reached near a probability of 0.5.
+        A relative half-width has no such bound, since its runs grow as the probability shrinks, so `max_runs`
+        is returned instead.
+
+        Returns:
+            int: The number of runs.
+
+        Raises:
+            ValueError: If the half-width is relative and `max_runs` is not set.
+        """
+        if self.relative_width:
+            if self.max_runs is None:
+                raise ValueError("A relative half-width doesn't bound the number of runs, set max_runs")
+            return self.max_runs
+
+        confidence = 0.95 if self.confidence is None else self.confidence
+        width = 0.01 if self.width is None else self.width
+        return math.ceil(math.log(2 / (1 - confidence)) / (2 * width ** 2))
+
+
+def __simulate_opts(precision: Precision | None) -> list[str]:
+    """Returns the options of a simulation with the given precision."""
+    if precision is None:
+        return SIMULATE_OPTS
+    return SIMULATE_OPTS + precision.options()
+
+
+@dataclass
+class RunResult:
+    """The output of a modest run and the resources it used.
+
+    Attributes:
+        output (str | None): The modest output, or None if the run was killed.
+        wall_time (float): Wall clock time of the run in seconds.
+        cpu_time (float): User plus system CPU time of the modest process in seconds.
+        max_rss (float): Maximum resident set size of the modest process in MB.
+        peak_memory (float | None): The "Peak memory usage" modest reported, in MB.
+        simulation_time (float | None): The "Simulation time" modest reported, in seconds.
+        cached (bool): True if the output was read from a result cache instead of running modest.
+        returncode (int | None): The exit code of the modest process, or None if it didn't run or was stopped early.
+        killed (str | None): Why the modest process was killed (`KILLED_CANCELLED`, `KILLED_TIMEOUT` or
+            `KILLED_MEMORY`), or None if it ran to completion.
+    """
+    output: str | None
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    max_rss: float = 0.0
+    peak_memory: float | None = None
+    simulation_time: float | None = None
+    cached: bool = False
+    returncode: int | None = None
+    killed: str | None = None
+
+    @property
+    def failure(self) -> str | None:
+        """Why the run did not produce a usable output, or None if it did."""
+        if self.killed is not None:
+            return f"killed ({self.killed})"
+        if self.returncode not in (0, None):
+            return f"exit code {self.returncode}"
+        if self.output is None:
+            return "no output"
+        return None
+
+    @property
+    def memory(self) -> float:
+        """The best known peak memory of the run in MB."""
+        return max(self.max_rss, self.peak_memory or 0.0)
+
+
+def __rusage_mb(max_rss: int) -> float:
+    """Converts `ru_maxrss` to MB. Linux reports it in KB, macOS in bytes."""
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def __process_rss_mb(pid: int) -> float | None:
+    """Returns the current resident set size of a process in MB, or None if it can't be read."""
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def __kill_reason(
+    pid: int,
+    start_time: float,
+    cancel: Callable[[], bool] | None,
+    timeout: float | None,
+    max_memory: float | None,
+) -> str | None:
+    """Returns why a running modest process should be killed, or None if it may keep running."""
+    if cancel is not None and cancel():
+        return KILLED_CANCELLED
+    if timeout is not None and time.time() - start_time > timeout:
+        return KILLED_TIMEOUT
+    if max_memory is not None:
+        rss = __process_rss_mb(pid)
+        if rss is not None and rss > max_memory:
+            return KILLED_MEMORY
+    return None
+
+
 def __run(
     model: str | Path,
     output_path: Path | None = None,
     command: list[str] = [MODEST_EXECUTABLE, "check"],
     opts: list[str] = [],
-) -> str | None:
+    cancel: Callable[[], bool] | None = None,
+    cache: ResultCache | None = None,
+    refresh: bool = False,
+    constants: dict[str, int] | None = None,
+    timeout: float | None = None,
+    max_memory: float | None = None,
+) -> RunResult:
     """Runs the modest tool with the given model and property files.
 
     Args:
         model_path (str | Path): Path to the model file or string repr of the model.
         output_path (Path | None): Path to the output file. If None, the output is
             returned as a string.
+        cancel (Callable[[], bool] | None): Polled while modest is running. If it
+            returns True the modest process is killed and the output is None.
+        cache (ResultCache | None): If set, results are looked up in and stored to this cache.
+        refresh (bool): Ignore cached results and overwrite them with a fresh run.
+        constants (dict[str, int] | None): Values of the model's open constants.
+        timeout (float | None): Seconds after which modest is killed. None waits forever.
+        max_memory (float | None): Resident memory in MB above which modest is killed. None allows any amount.
 
     Returns:
-        None if output_path is set, modest result as string otherwise
+        The modest output and the resources the run used. The output is None if modest was killed.
 
     Raises:
         FileNotFoundError: If 'modest' is not found in the system's PATH.
@@ -39,36 +523,101 @@ def __run(
     if not is_modest_on_path():
         raise FileNotFoundError("modest is not on the system's PATH.")
 
-    tmp_model = False
+    opts = opts + constant_opts(constants)
 
-    if isinstance(model, str):
-        try:
-            if Path(model).exists():
-                filename = model
-            else:
-                raise FileNotFoundError
-        except:
-            filename = model
-            filename = "__tmp_model__.modest"
-            with open(filename, "w") as f:
-                f.write(model)
-            tmp_model = True
-    elif isinstance(model, Path):
-        filename = model
-    else:
-        raise TypeError(f"model must be a string or Path. Instead got {type(model)}")
+    key = None
+    if cache is not None:
+        key = ResultCache.key(__model_text(model), modest_version(), *command, *opts)
+        entry = None if refresh else cache.get(key)
+        if entry is not None:
+            output = __output(entry.output, "", output_path)
+            return RunResult(
+                output,
+                peak_memory=parse_peak_memory(output),
+                simulation_time=parse_simulation_time(output),
+                cached=True,
+            )
 
-    process_command = command + [filename] + opts
+    start_time = time.time()
 
-    result = subprocess.run(process_command, capture_output=True, text=True)
+    # The output goes to files instead of pipes, so that the process can be reaped with
+    # os.wait4 (which reports its resource usage) without the pipes filling up.
+    with __model_file(model) as filename, \
+            tempfile.TemporaryFile("w+", encoding="utf-8") as stdout_file, \
+            tempfile.TemporaryFile("w+", encoding="utf-8") as stderr_file:
+        process_command = command + [filename] + opts
 
-    stdout = result.stdout.strip()
-    stderr = result.stderr.strip()
+        process = subprocess.Popen(
+            process_command, stdout=stdout_file, stderr=stderr_file, text=True
+        )
 
-    output = stdout + stderr
+        exited = threading.Event()
+        status = {}
+
+        def reap():
+            try:
+                _, status["status"], status["rusage"] = os.wait4(process.pid, 0)
+            except ChildProcessError:
+                # Reaped elsewhere, so its status and resource usage are lost
+                pass
+            finally:
+                exited.set()
+
+        threading.Thread(target=reap, daemon=True).start()
+
+        # Watch the process until it exits, killing it if it is cancelled or exceeds its limits
+        watched = cancel is not None or timeout is not None or max_memory is not None
+        killed = None
+        while not exited.wait(CANCEL_POLL_INTERVAL if watched else None):
+            killed = __kill_reason(process.pid, start_time, cancel, timeout, max_memory)
+            if killed is not None:
+                # Popen.kill would poll, and could reap the process before the reaping thread does
+                with contextlib.suppress(ProcessLookupError):
+                    os.kill(process.pid, signal.SIGKILL)
+                exited.wait()
+
+        # Popen must not try to reap the process a second time
+        if "status" in status:
+            process.returncode = os.waitstatus_to_exitcode(status["status"])
+        elif process.returncode is None:
+            process.returncode = -signal.SIGKILL if killed is not None else -1
+
+        wall_time = time.time() - start_time
+        rusage = status.get("rusage")
+        cpu_time = rusage.ru_utime + rusage.ru_stime if rusage is not None else 0.0
+        max_rss = __rusage_mb(rusage.ru_maxrss) if rusage is not None else 0.0
 
-    if tmp_model and not "error:" in output:
-        Path(filename).unlink(missing_ok=False)
+        if killed is not None:
+            return RunResult(None, wall_time, cpu_time, max_rss, returncode=process.returncode, killed=killed)
+
+        stdout_file.seek(0)
+        stderr_file.seek(0)
+        stdout = stdout_file.read()
+        stderr = stderr_file.read()
+
+    output = __output(stdout, stderr, output_path)
+
+    # Failed runs are not worth remembering
+    if key is not None and process.returncode == 0 and "error:" not in output:
+        cache.put(key, output, parse_probabilities(output, **__slot_mapping(constants)))
+
+    return RunResult(
+        output,
+        wall_time,
+        cpu_time,
+        max_rss,
+        peak_memory=parse_peak_memory(output),
+        simulation_time=parse_simulation_time(output),
+        returncode=process.returncode,
+    )
+
+
+def __output(stdout: str, stderr: str, output_path: Path | None) -> str:
+    """Combines the output streams of a modest run and writes them to `output_path` if it is set."""
+    stdout = stdout.strip()
+    stderr = stderr.strip()
+
+    output = stdout + stderr
 
     if output_path is not None:
         with open(output_path, "w", encoding="utf-8") as f:
@@ -77,49 +626,542 @@ def __run(
     return output
 
 
-def check(model: str | Path, output_path: Path | None = None) -> str | None:
+def check(
+    model: str | Path,
+    output_path: Path | None = None,
+    *,
+    cache: ResultCache | None = None,
+    refresh: bool = False,
+    constants: dict[str, int] | None = None,
+    timeout: float | None = None,
+    max_memory: float | None = None,
+) -> str | None:
     """Checks a given model for deadlocks.
 
+    See `check_run` for the resources the check used.
+
     Args:
         model (str | Path): The model to check. This can be a path to a model file or a string containing the model.
         output_path (Path | None, optional): The path to write the output to. If None, the output is returned as a string. Defaults to None.
+        cache (ResultCache | None, optional): A cache of previous results. If None, the cache is bypassed. Defaults to None.
+        refresh (bool, optional): Rerun the check and overwrite its cached result. Defaults to False.
+        constants (dict[str, int] | None, optional): Values of the model's open constants. Defaults to None.
+        timeout (float | None, optional): Seconds after which the check is killed. Defaults to None.
+        max_memory (float | None, optional): Resident memory in MB above which the check is killed. Defaults to None.
 
     Returns:
         str | None: The output of the check, or None if an output path is provided.
     """
+    return check_run(model, output_path, cache=cache, refresh=refresh, constants=constants, timeout=timeout, max_memory=max_memory).output
+
+
+def check_run(
+    model: str | Path,
+    output_path: Path | None = None,
+    *,
+    cache: ResultCache | None = None,
+    refresh: bool = False,
+    constants: dict[str, int] | None = None,
+    timeout: float | None = None,
+    max_memory: float | None = None,
+) -> RunResult:
+    """Checks a given model and reports the resources the check used.
+
+    Args:
+        model (str | Path): The model to check. This can be a path to a model file or a string containing the model.
+        output_path (Path | None, optional): The path to write the output to. Defaults to None.
+        cache (ResultCache | None, optional): A cache of previous results. If None, the cache is bypassed. Defaults to None.
+        refresh (bool, optional): Rerun the check and overwrite its cached result. Defaults to False.
+        constants (dict[str, int] | None, optional): Values of the model's open constants. Defaults to None.
+        timeout (float | None, optional): Seconds after which the check is killed. Defaults to None.
+        max_memory (float | None, optional): Resident memory in MB above which the check is killed. Defaults to None.
+
+    Returns:
+        RunResult: The output of the check and the resources it used.
+    """
     return __run(
         model,
         output_path,
-        [MODEST_EXECUTABLE, "check", "--unsafe", "--chainopt", "-D"],
+        CHECK_COMMAND,
+        cache=cache,
+        refresh=refresh,
+        constants=constants,
+        timeout=timeout,
+        max_memory=max_memory,
     )
 
 
-def simulate(model: str | Path, output_path: Path | None = None) -> str | None:
-    """Generates a single simulation trace from a given model.
+def simulate(
+    model: str | Path,
+    output_path: Path | None = None,
+    *,
+    cancel: Callable[[], bool] | None = None,
+    cache: ResultCache | None = None,
+    refresh: bool = False,
+    constants: dict[str, int] | None = None,
+    precision: Precision | None = None,
+    timeout: float | None = None,
+    max_memory: float | None = None,
+) -> str | None:
+    """Estimates the probabilities of a given model's properties by statistical model checking.
+
+    See `simulate_run` for the resources the simulation used.
 
     Args:
         model (str | Path): The model to simulate. This can be a path to a model file or a string containing the model.
         output_path (Path | None, optional): The path to write the output to. If None, the output is returned as a string. Defaults to None.
+        cancel (Callable[[], bool] | None, optional): Polled while the simulation runs. Returning True kills the simulation. Defaults to None.
+        cache (ResultCache | None, optional): A cache of previous results. If None, the cache is bypassed. Defaults to None.
+        refresh (bool, optional): Rerun the simulation and overwrite its cached result. Defaults to False.
+        constants (dict[str, int] | None, optional): Values of the model's open constants. Defaults to None.
+        precision (Precision | None, optional): The precision of the estimates, see `Precision`. Defaults to modest's defaults.
+        timeout (float | None, optional): Seconds after which the simulation is killed. Defaults to None.
+        max_memory (float | None, optional): Resident memory in MB above which the simulation is killed. Defaults to None.
+
+    Returns:
+        str | None: The simulation output, or None if an output path is provided or the simulation was killed.
+    """
+    return simulate_run(model, output_path, cancel=cancel, cache=cache, refresh=refresh, constants=constants, precision=precision,
+                        timeout=timeout, max_memory=max_memory).output
+
+
+def simulate_run(
+    model: str | Path,
+    output_path: Path | None = None,
+    *,
+    cancel: Callable[[], bool] | None = None,
+    cache: ResultCache | None = None,
+    refresh: bool = False,
+    constants: dict[str, int] | None = None,
+    precision: Precision | None = None,
+    timeout: float | None = None,
+    max_memory: float | None = None,
+) -> RunResult:
+    """Simulates a given model and reports the resources the simulation used.
+
+    Args:
+        model (str | Path): The model to simulate. This can be a path to a model file or a string containing the model.
+        output_path (Path | None, optional): The path to write the output to. Defaults to None.
+        cancel (Callable[[], bool] | None, optional): Polled while the simulation runs. Returning True kills the simulation. Defaults to None.
+        cache (ResultCache | None, optional): A cache of previous results. If None, the cache is bypassed. Defaults to None.
+        refresh (bool, optional): Rerun the simulation and overwrite its cached result. Defaults to False.
+        constants (dict[str, int] | None, optional): Values of the model's open constants. Defaults to None.
+        precision (Precision | None, optional): The precision of the estimates, see `Precision`. Defaults to modest's defaults.
+        timeout (float | None, optional): Seconds after which the simulation is killed. Defaults to None.
+        max_memory (float | None, optional): Resident memory in MB above which the simulation is killed. Defaults to None.
 
     Returns:
-        str | None: The simulation output, or None if an output path is provided.
+        RunResult: The simulation output (None if killed) and the resources the simulation used.
     """
     return __run(
         model,
         output_path,
-        command=[MODEST_EXECUTABLE, "simulate"],
-        opts=["--max-run-length", "0", "--unsafe"],
+        command=SIMULATE_COMMAND,
+        opts=__simulate_opts(precision),
+        cancel=cancel,
+        cache=cache,
+        refresh=refresh,
+        constants=constants,
+        timeout=timeout,
+        max_memory=max_memory,
     )
 
 
-if is_modest_on_path():
-    result = subprocess.run(
-        [MODEST_EXECUTABLE, "--version"], capture_output=True, text=True
+def simulate_replicas(
+    model: str | Path,
+    replicas: int,
+    *,
+    cancel: Callable[[], bool] | None = None,
+    cache: ResultCache | None = None,
+    refresh: bool = False,
+    constants: dict[str, int] | None = None,
+    precision: Precision | None = None,
+    timeout: float | None = None,
+    max_memory: float | None = None,
+) -> RunResult:
+    """Splits the runs of every property across independent simulations and pools their counts.
+
+    Each of the `replicas` modest processes runs the same model with its own seed and a fixed share of
+    the runs the precision requires (see `Precision.required_runs`). The successes and runs of every
+    property are summed, and the estimate and its Clopper-Pearson interval are recomputed from the pooled
+    counts (see `probabilities.merge_outputs`). This parallelizes a single block that is too large to split
+    into smaller blocks.
+
+    Args:
+        model (str | Path): The model to simulate. This can be a path to a model file or a string containing the model.
+        replicas (int): The number of simulations to run at the same time.
+        cancel (Callable[[], bool] | None, optional): Polled while the simulations run. Returning True kills them. Defaults to None.
+        cache (ResultCache | None, optional): A cache of previous results. If None, the cache is bypassed. Defaults to None.
+        refresh (bool, optional): Rerun the simulations and overwrite their cached results. Defaults to False.
+        constants (dict[str, int] | None, optional): Values of the model's open constants. Defaults to None.
+        precision (Precision | None, optional): The precision of the pooled estimates. Its `runs` is the total over all
+            replicas, and its `seed` the seed of the first replica. See `Precision` for the other settings. Defaults to modest's defaults.
+        timeout (float | None, optional): Seconds after which each simulation is killed. Defaults to None.
+        max_memory (float | None, optional): Resident memory in MB above which each simulation is killed. Defaults to None.
+
+    Returns:
+        RunResult: The pooled output (None if any simulation failed) and the resources of all simulations together.
+    """
+    if precision is None:
+        precision = Precision()
+    total_runs = precision.runs if precision.runs is not None else precision.required_runs()
+    base_seed = precision.seed if precision.seed is not None else 0
+
+    def run(replica: int) -> RunResult:
+        replica_precision = replace(precision, runs=math.ceil(total_runs / replicas), seed=base_seed + replica, max_runs=None)
+        return simulate_run(model, cancel=cancel, cache=cache, refresh=refresh, constants=constants, precision=replica_precision,
+                            timeout=timeout, max_memory=max_memory)
+
+    # The threads only wait for their modest processes
+    with ThreadPoolExecutor(max_workers=replicas) as executor:
+        results = list(executor.map(run, range(replicas)))
+
+    failed = next((result for result in results if result.failure is not None), None)
+    confidence = 0.95 if precision.confidence is None else precision.confidence
+
+    return RunResult(
+        output=None if failed is not None else merge_outputs([result.output for result in results], confidence=confidence),
+        wall_time=max(result.wall_time for result in results),
+        cpu_time=sum(result.cpu_time for result in results),
+        # The replicas run at the same time, so their memory adds up
+        max_rss=sum(result.max_rss for result in results),
+        peak_memory=sum(result.peak_memory or 0.0 for result in results) or None,
+        simulation_time=max((result.simulation_time for result in results if result.simulation_time is not None), default=None),
+        cached=all(result.cached for result in results),
+        returncode=failed.returncode if failed is not None else 0,
+        killed=failed.killed if failed is not None else None,
     )
 
-    stdout = result.stdout.strip()
-    stderr = result.stderr.strip()
 
-    output = stdout + stderr
+class SimulationStream:
+    """The property results of a simulation, read while modest is still running.
+
+    Iterating yields `(clock cycle, probability)` for each property as soon as modest prints it.
+    The iteration ends when modest exits or when the stop predicate is met, in which case modest is
+    killed. Breaking out of the iteration also kills modest.
+
+    Attributes:
+        lines (list[str]): The output lines read so far.
+        stopped (bool): True if modest was killed because the stop predicate was met.
+        result (RunResult | None): The full output and the resources modest used, once it has exited.
+    """
+
+    def __init__(self):
+        self.lines: list[str] = []
+        self.stopped: bool = False
+        self.result: RunResult | None = None
+        self._results: Iterator[tuple[int, float]] = iter(())
+
+    def __iter__(self) -> Iterator[tuple[int, float]]:
+        return self._results
+
+    @property
+    def output(self) -> str:
+        """The output read so far, in the same form `simulate` returns it."""
+        return "".join(self.lines).strip()
+
+
+def __tee(lines: Iterable[str], sink: list[str]) -> Iterator[str]:
+    """Yields `lines` while recording each of them in `sink`."""
+    for line in lines:
+        sink.append(line)
+        yield line
+
+
+def __stream(
+    model: str | Path,
+    command: list[str],
+    opts: list[str],
+    stop: Callable[[int, float], bool] | None,
+    stream: SimulationStream,
+    cache: ResultCache | None,
+    refresh: bool,
+    constants: dict[str, int] | None,
+    timeout: float | None = None,
+    max_memory: float | None = None,
+) -> Iterator[tuple[int, float]]:
+    """Runs modest and yields the probabilities of its output as they are printed."""
+    opts = opts + constant_opts(constants)
+    slot_mapping = __slot_mapping(constants)
+
+    key = None
+    if cache is not None:
+        key = ResultCache.key(__model_text(model), modest_version(), *command, *opts)
+        entry = None if refresh else cache.get(key)
+        if entry is not None:
+            # Replay the cached output as if modest printed it
+            for cycle, probability in iter_probabilities(__tee(entry.output.splitlines(keepends=True), stream.lines), **slot_mapping):
+                yield cycle, probability
+                if stop is not None and stop(cycle, probability):
+                    stream.stopped = True
+                    break
+            output = stream.output
+            stream.result = RunResult(
+                output,
+                peak_memory=parse_peak_memory(output),
+                simulation_time=parse_simulation_time(output),
+                cached=True,
+            )
+            return
+
+    start_time = time.time()
+
+    with __model_file(model) as filename:
+        process = subprocess.Popen(
+            command + [filename] + opts,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+        )
+
+        # Reading the output blocks, so the resource limits are watched from another thread
+        finished = threading.Event()
+        kill_lock = threading.Lock()
+        killed = []
+
+        def watch():
+            while not finished.wait(CANCEL_POLL_INTERVAL):
+                reason = __kill_reason(process.pid, start_time, None, timeout, max_memory)
+                if reason is not None:
+                    with kill_lock:
+                        # The process must not be killed once it may have been reaped
+                        if not finished.is_set():
+                            os.kill(process.pid, signal.SIGKILL)
+                            killed.append(reason)
+                    return
+
+        if timeout is not None or max_memory is not None:
+            threading.Thread(target=watch, daemon=True).start()
+
+        exhausted = False
+        try:
+            for cycle, probability in iter_probabilities(__tee(process.stdout, stream.lines), **slot_mapping):
+                yield cycle, probability
+                if stop is not None and stop(cycle, probability):
+                    stream.stopped = True
+                    break
+            else:
+                exhausted = True
+        finally:
+            with kill_lock:
+                finished.set()
+
+            # Reap the process with os.wait4 for its resource usage. Popen.kill would reap it first.
+            if not exhausted:
+                with contextlib.suppress(ProcessLookupError):
+                    os.kill(process.pid, signal.SIGKILL)
+            _, status, rusage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            process.stdout.close()
+
+            output = stream.output
+            stream.result = RunResult(
+                None if killed else output,
+                time.time() - start_time,
+                rusage.ru_utime + rusage.ru_stime,
+                __rusage_mb(rusage.ru_maxrss),
+                peak_memory=parse_peak_memory(output),
+                simulation_time=parse_simulation_time(output),
+                # A stopped simulation was killed on purpose, so its exit code means nothing
+                returncode=process.returncode if exhausted else None,
+                killed=killed[0] if killed else None,
+            )
+
+    # Only complete runs are worth remembering
+    if key is not None and stream.result.failure is None and not stream.stopped and "error:" not in stream.output:
+        cache.put(key, stream.output, parse_probabilities(stream.output, **slot_mapping))
+
+
+def simulate_stream(
+    model: str | Path,
+    *,
+    stop: Callable[[int, float], bool] | None = None,
+    cache: ResultCache | None = None,
+    refresh: bool = False,
+    constants: dict[str, int] | None = None,
+    precision: Precision | None = None,
+    timeout: float | None = None,
+    max_memory: float | None = None,
+) -> SimulationStream:
+    """Simulates a model and streams the estimated probabilities while the simulation runs.
+
+    Args:
+        model (str | Path): The model to simulate. This can be a path to a model file or a string containing the model.
+        stop (Callable[[int, float], bool] | None, optional): Called with the clock cycle and probability of each
+            property. Returning True kills the simulation. Defaults to None.
+        cache (ResultCache | None, optional): A cache of previous results. Runs that are stopped early are not
+            cached. Defaults to None.
+        refresh (bool, optional): Rerun the simulation and overwrite its cached result. Defaults to False.
+        constants (dict[str, int] | None, optional): Values of the model's open constants. The clock cycles of
+            parametric properties are calculated from CLK_LOW and CLK_STRIDE. Defaults to None.
+        precision (Precision | None, optional): The precision of the estimates, see `Precision`. Defaults to modest's defaults.
+        timeout (float | None, optional): Seconds after which the simulation is killed. Defaults to None.
+        max_memory (float | None, optional): Resident memory in MB above which the simulation is killed. Defaults to None.
 
-    print(f"Found modest: {output.splitlines()[0]}")
\ No newline at end of file
+    Returns:
+        SimulationStream: An iterable of the `(clock cycle, probability)` results.
+
+    Raises:
+        FileNotFoundError: If 'modest' is not found in the system's PATH.
+    """
+    if not is_modest_on_path():
+        raise FileNotFoundError("modest is not on the system's PATH.")
+
+    stream = SimulationStream()
+    stream._results = __stream(model, SIMULATE_COMMAND, __simulate_opts(precision), stop, stream, cache, refresh, constants, timeout, max_memory)
+    return stream
+
+
+_async_semaphores: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def set_max_concurrency(limit: int):
+    """Sets how many modest processes the async API runs at the same time.
+
+    Args:
+        limit (int): The maximum number of concurrent modest processes.
+
+    Raises:
+        ValueError: If `limit` is less than 1.
+    """
+    global MAX_CONCURRENT_RUNS
+
+    if limit < 1:
+        raise ValueError(f"The concurrency limit must be at least 1, got {limit}")
+
+    MAX_CONCURRENT_RUNS = limit
+    _async_semaphores.clear()
+
+
+def __async_semaphore() -> asyncio.Semaphore:
+    """Returns the semaphore limiting concurrent runs in the running event loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _async_semaphores:
+        _async_semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+    return _async_semaphores[loop]
+
+
+async def __run_async(
+    model: str | Path,
+    output_path: Path | None = None,
+    command: list[str] = [MODEST_EXECUTABLE, "check"],
+    opts: list[str] = [],
+    timeout: float | None = None,
+    semaphore: asyncio.Semaphore | None = None,
+    constants: dict[str, int] | None = None,
+) -> str:
+    """Runs the modest tool as an asyncio subprocess.
+
+    The modest process is killed if the calling task is cancelled or the timeout expires.
+
+    Args:
+        model (str | Path): Path to the model file or string repr of the model.
+        output_path (Path | None): Path to the output file.
+        timeout (float | None): Seconds to wait for modest to finish. None waits forever.
+        semaphore (asyncio.Semaphore | None): Limits concurrent runs. Defaults to a shared
+            semaphore of size `MAX_CONCURRENT_RUNS`.
+        constants (dict[str, int] | None): Values of the model's open constants.
+
+    Returns:
+        The modest result as a string.
+
+    Raises:
+        FileNotFoundError: If 'modest' is not found in the system's PATH.
+        TimeoutError: If modest did not finish within `timeout` seconds.
+        TypeError if model is not a string or Path.
+    """
+
+    if not is_modest_on_path():
+        raise FileNotFoundError("modest is not on the system's PATH.")
+
+    if semaphore is None:
+        semaphore = __async_semaphore()
+
+    async with semaphore:
+        with __model_file(model) as filename:
+            process = await asyncio.create_subprocess_exec(
+                *command, str(filename), *opts, *constant_opts(constants),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except BaseException:
+                # Timed out or cancelled, don't leave modest running in the background
+                if process.returncode is None:
+                    process.kill()
+                await process.wait()
+                raise
+
+    return __output(stdout.decode(), stderr.decode(), output_path)
+
+
+async def check_async(
+    model: str | Path,
+    output_path: Path | None = None,
+    *,
+    timeout: float | None = None,
+    semaphore: asyncio.Semaphore | None = None,
+    constants: dict[str, int] | None = None,
+) -> str:
+    """Async version of `check`.
+
+    Args:
+        model (str | Path): The model to check. This can be a path to a model file or a string containing the model.
+        output_path (Path | None, optional): The path to write the output to. Defaults to None.
+        timeout (float | None, optional): Seconds to wait before the check is killed. Defaults to None.
+        semaphore (asyncio.Semaphore | None, optional): Limits concurrent runs. Defaults to the shared semaphore.
+        constants (dict[str, int] | None, optional): Values of the model's open constants. Defaults to None.
+
+    Returns:
+        str: The output of the check.
+
+    Raises:
+        TimeoutError: If the check did not finish within `timeout` seconds.
+    """
+    return await __run_async(model, output_path, CHECK_COMMAND, timeout=timeout, semaphore=semaphore, constants=constants)
+
+
+async def simulate_async(
+    model: str | Path,
+    output_path: Path | None = None,
+    *,
+    timeout: float | None = None,
+    semaphore: asyncio.Semaphore | None = None,
+    constants: dict[str, int] | None = None,
+    precision: Precision | None = None,
+) -> str:
+    """Async version of `simulate`.
+
+    Many simulations can be kept in flight from one event loop, e.g. with `asyncio.gather`.
+    Cancelling the awaiting task kills the simulation.
+
+    Args:
+        model (str | Path): The model to simulate. This can be a path to a model file or a string containing the model.
+        output_path (Path | None, optional): The path to write the output to. Defaults to None.
+        timeout (float | None, optional): Seconds to wait before the simulation is killed. Defaults to None.
+        semaphore (asyncio.Semaphore | None, optional): Limits concurrent runs. Defaults to the shared semaphore.
+        constants (dict[str, int] | None, optional): Values of the model's open constants. Defaults to None.
+        precision (Precision | None, optional): The precision of the estimates, see `Precision`. Defaults to modest's defaults.
+
+    Returns:
+        str: The simulation output.
+
+    Raises:
+        TimeoutError: If the simulation did not finish within `timeout` seconds.
+    """
+    return await __run_async(
+        model,
+        output_path,
+        command=SIMULATE_COMMAND,
+        opts=__simulate_opts(precision),
+        timeout=timeout,
+        semaphore=semaphore,
+        constants=constants,
+    )
+
+
+if is_modest_on_path():
+    print(f"Found modest: {modest_version()}")
\ No newline at end of file
@@ -1,6 +1,7 @@
-import math
 import enum
-from typing import Callable
+import functools
+import math
+from typing import Callable, Iterable, Iterator, TextIO
 from pathlib import Path
 
 class PropertyType(enum.Enum):
@@ -18,6 +19,9 @@ class PropertyType(enum.Enum):
     FUNCTION = 4
     NO_PROPS = 5
 
+# The encodings of the channel buffers in the model, see `Noc.__init__`
+BUFFER_ENCODINGS: tuple[str, ...] = ("list", "array")
+
 def add_info(func: Callable[..., str]) -> Callable[..., str]:
     """
     A decorator that appends a newline character to the end of a string returned by a function.
@@ -28,18 +32,76 @@ def add_info(func: Callable[..., str]) -> Callable[..., str]:
     Returns:
         The decorated function.
     """
+    @functools.wraps(func)
     def wrapper(*args, **kwargs) -> str:
         result: str = func(*args, **kwargs)
+        info_start, info_end = info_markers(func.__name__)
+        return info_start + result + info_end
+    return wrapper
+
+def add_info_chunks(func: Callable[..., Iterator[str]]) -> Callable[..., Iterator[str]]:
+    """
+    The `add_info` decorator for a section that is generated in chunks.
+
+    The section is named after the function without its `iter_` prefix, so that `iter_noc_init`
+    is marked like `noc_init`.
+
+    Args:
+        func: The generator function to be decorated.
+
+    Returns:
+        The decorated generator function.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs) -> Iterator[str]:
+        info_start, info_end = info_markers(func.__name__.removeprefix("iter_"))
+        yield info_start
+        yield from func(*args, **kwargs)
+        yield info_end
+    return wrapper
+
+def cached_section(func: Callable[..., str]) -> Callable[..., str]:
+    """
+    A decorator that caches the section a `Noc` method generates, keyed on the arguments it is called with.
 
-        func_name: str = func.__name__
-        filename: str = Path(__file__).name
+    The other parameters a section depends on are attributes of the `Noc`, and the cache is cleared whenever
+    one of them changes (see `Noc.__setattr__`). Nothing is cached if the `Noc` has `cache_sections` off.
 
-        info_start: str = f"// [info][section start] Section automatically generated by `{func_name}()` in '{filename}'\n"
-        info_end: str   = f"// [info][section end] Section automatically generated by `{func_name}()`\n"
+    Args:
+        func: The method to be decorated.
 
-        return info_start + result + info_end + "\n"
+    Returns:
+        The decorated method.
+    """
+    @functools.wraps(func)
+    def wrapper(self: "Noc", *args, **kwargs) -> str:
+        if not self.cache_sections:
+            return func(self, *args, **kwargs)
+
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        section = self._sections.get(key)
+        if section is None:
+            section = self._sections[key] = func(self, *args, **kwargs)
+        return section
     return wrapper
 
+def info_markers(func_name: str) -> tuple[str, str]:
+    """
+    Returns the comments that open and close a section generated by a function.
+
+    Args:
+        func_name: The name of the function.
+
+    Returns:
+        The start and end comment, the end followed by an empty line.
+    """
+    filename: str = Path(__file__).name
+
+    info_start: str = f"// [info][section start] Section automatically generated by `{func_name}()` in '{filename}'\n"
+    info_end: str   = f"// [info][section end] Section automatically generated by `{func_name}()`\n"
+
+    return info_start, info_end + "\n"
+
 
 class Noc:
     def __init__(self, size: int, *, 
@@ -48,7 +110,11 @@ class Noc:
                  injection_rate_numerator: int = 3,
                  injection_rate_denominator: int = 10,
                  resistive_noise_threshold: int = 1,
-                 inductive_noise_threshold: int = 1):
+                 inductive_noise_threshold: int = 1,
+                 buffer_encoding: str = "list",
+                 bounded_counters: bool = False,
+                 specialize_routers: bool = False,
+                 cache_sections: bool = True):
         """Initializes the NoC object.
 
         Args:
@@ -59,8 +125,30 @@ class Noc:
             injection_rate_denominator (int, optional): The denominator of the injection rate. Defaults to 10.
             resistive_noise_threshold (int, optional): The threshold for resistive noise. Defaults to 1.
             inductive_noise_threshold (int, optional): The threshold for inductive noise. Defaults to 1.
+            buffer_encoding (str, optional): How the model represents the channel buffers. "list" is a linked list
+                of flits, which Modest walks recursively for every length, front and membership query and reallocates
+                on every change. "array" is a fixed array of `buffer_size` slots, front first, and a count of the
+                flits, which makes every query a constant number of steps. The two only agree until a buffer overflows:
+                the array then loses flits the list keeps (see `buffer_functions`). Only the properties of
+                `PropertyType.FUNCTION` check for overflows, and both encodings violate them at the first one.
+                Defaults to "list".
+            bounded_counters (bool, optional): Declare the noise and activity counters with bounded ranges. The
+                activity counters are bounded by the number of channels and the noise counters saturate at the
+                largest threshold the properties check, which leaves the probabilities of the properties unchanged
+                but makes the state space finite, so the noise properties can be checked exactly. Defaults to False.
+            specialize_routers (bool, optional): Compose the NoC of a specialized process per router (see
+                `iter_router_processes`), with the ids of its neighbors, its boundaries and the channels its flits
+                arrive in written out as constants, instead of generic processes that look them up. Defaults to False.
+            cache_sections (bool, optional): Keep the sections that don't depend on the properties, so that
+                generating the models of a sweep block by block only generates their properties once the first
+                model is done. `iter_chunks` and `write` only keep the sections that don't grow with the mesh,
+                and stream the others, so their memory doesn't grow with the mesh either way. Defaults to True.
         """
         assert size >= 2, "Size must be at least 2x2"
+        assert buffer_encoding in BUFFER_ENCODINGS, f"The buffer encoding must be one of {BUFFER_ENCODINGS}"
+
+        self._sections: dict = {}
+        self.cache_sections: bool = cache_sections
 
         self.num_nodes: int = size * size
         self.dimension: int = size
@@ -70,37 +158,183 @@ class Noc:
         self.injection_rate_denominator: int = injection_rate_denominator
         self.resistive_noise_threshold: int = resistive_noise_threshold
         self.inductive_noise_threshold: int = inductive_noise_threshold
+        self.buffer_encoding: str = buffer_encoding
+        self.bounded_counters: bool = bounded_counters
+        self.specialize_routers: bool = specialize_routers
+
+    def __setattr__(self, name: str, value):
+        # Any change to the NoC may change any cached section
+        if name != "_sections" and "_sections" in self.__dict__:
+            self._sections.clear()
+        super().__setattr__(name, value)
     
-    def print(self, ptype: PropertyType, *, clk_low: int = 0, clk_high: int = 100, stride: int = 1, generate_flits: str | None = None):
+    def print(self, ptype: PropertyType, *, clk_low: int = 0, clk_high: int = 100, stride: int = 1, generate_flits: str | None = None, parametric: bool = False,
+              clks: Iterable[int] | None = None, thresholds: Iterable[int] | None = None):
         """Generates the Modest model for the NoC.
 
+        Builds the whole model in memory. For large meshes, `write` or `iter_chunks` stream it instead.
+
         Args:
             ptype (PropertyType): The type of property to generate.
             clk_low (int, optional): The lower bound of the clock cycle. Defaults to 0.
             clk_high (int, optional): The upper bound of the clock cycle. Defaults to 100.
             stride (int, optional): The stride for the clock cycle. Defaults to 1.
             generate_flits (str | None, optional): A custom flit generation process. Defaults to None.
+            parametric (bool, optional): Leave the noise thresholds and the clock bounds of the properties
+                as open constants. Only the number of clock cycles in the range is part of the model, so
+                one model serves every block and threshold of a sweep. The constants for a run are given
+                by `parametric_constants`. Defaults to False.
+            clks (Iterable[int] | None, optional): Generate the properties for exactly these clock cycles instead
+                of the range given by `clk_low`, `clk_high` and `stride`. Can't be combined with `parametric`.
+                Defaults to None.
+            thresholds (Iterable[int] | None, optional): Generate the noise properties for each of these thresholds
+                instead of the thresholds of the NoC, so that one simulation estimates every threshold (see
+                `fused_properties`). Defaults to None.
 
         Returns:
             str: The Modest model for the NoC.
         """
-        return self.type() \
-                + self.user_defined_constants() \
-                + self.calculated_constants()\
-                + self.functional_datatypes(ptype) \
-                + self.verification_datatypes() \
-                + self.variables(ptype) \
-                + self.functions() \
-                + self.processes(ptype, generate_flits=generate_flits) \
-                + self.composition() \
-                + self.properties(ptype, clk_low=clk_low, clk_high=clk_high, stride=stride)
+        # The whole model is built anyway, so the sections that grow with the mesh can be kept as well
+        return "".join(self._iter_chunks(ptype, clk_low=clk_low, clk_high=clk_high, stride=stride, generate_flits=generate_flits,
+                                         parametric=parametric, clks=clks, thresholds=thresholds, whole_sections=self.cache_sections))
+
+    def iter_chunks(self, ptype: PropertyType, *, clk_low: int = 0, clk_high: int = 100, stride: int = 1, generate_flits: str | None = None,
+                    parametric: bool = False, clks: Iterable[int] | None = None, thresholds: Iterable[int] | None = None) -> Iterator[str]:
+        """Generates the Modest model for the NoC piece by piece.
+
+        The sections that grow with the mesh or the number of properties are yielded one router or one
+        property at a time, so the memory used doesn't depend on the size of the model. Joined, the chunks
+        are the model `print` returns for the same arguments.
+
+        Args:
+            ptype (PropertyType): The type of property to generate.
+            clk_low, clk_high, stride, generate_flits, parametric, clks, thresholds: As in `print`.
+
+        Yields:
+            str: The next piece of the model.
+        """
+        yield from self._iter_chunks(ptype, clk_low=clk_low, clk_high=clk_high, stride=stride, generate_flits=generate_flits,
+                                     parametric=parametric, clks=clks, thresholds=thresholds, whole_sections=False)
+
+    def _iter_chunks(self, ptype: PropertyType, *, clk_low: int, clk_high: int, stride: int, generate_flits: str | None,
+                     parametric: bool, clks: Iterable[int] | None, thresholds: Iterable[int] | None,
+                     whole_sections: bool) -> Iterator[str]:
+        """Generates the model for `print` and `iter_chunks`.
+
+        If `whole_sections` is set, the sections that grow with the mesh are yielded whole from the cache
+        instead of one router at a time.
+        """
+        if thresholds is not None:
+            thresholds = tuple(thresholds)
+
+        yield self.type()
+        yield self.user_defined_constants(parametric)
+        yield self.calculated_constants()
+        yield self.functional_datatypes(ptype)
+        yield self.verification_datatypes()
+        if whole_sections:
+            yield self.variables(ptype, thresholds)
+        else:
+            yield from self.iter_variables(ptype, thresholds)
+        yield self.functions()
+        yield self.processes(ptype, generate_flits=generate_flits)
+        if self.specialize_routers:
+            if whole_sections:
+                yield self.router_processes(ptype)
+            else:
+                yield from self.iter_router_processes(ptype)
+        if whole_sections:
+            yield self.composition()
+        else:
+            yield from self.iter_composition()
+
+        if thresholds is not None:
+            yield from self.iter_fused_properties(ptype, thresholds, clk_low=clk_low, clk_high=clk_high, stride=stride,
+                                                  parametric=parametric, clks=clks)
+        else:
+            yield from self.iter_properties(ptype, clk_low=clk_low, clk_high=clk_high, stride=stride, parametric=parametric, clks=clks)
+
+    def write(self, fp: TextIO, ptype: PropertyType, **kwargs) -> None:
+        """Streams the Modest model for the NoC to a file, without building it in memory.
+
+        Args:
+            fp (TextIO): The file to write to.
+            ptype (PropertyType): The type of property to generate.
+            **kwargs: The other arguments of `print`.
+        """
+        fp.writelines(self.iter_chunks(ptype, **kwargs))
+
+    def parametric_constants(self, *, clk_low: int = 0, stride: int = 1) -> dict[str, int]:
+        """Returns the values of the open constants of a parametric model.
+
+        Args:
+            clk_low (int, optional): The lower bound of the clock cycle. Defaults to 0.
+            stride (int, optional): The stride for the clock cycle. Defaults to 1.
 
+        Returns:
+            dict[str, int]: The value of each open constant, by name.
+        """
+        return {
+            "RESISTIVE_NOISE_THRESH": self.resistive_noise_threshold,
+            "INDUCTIVE_NOISE_THRESH": self.inductive_noise_threshold,
+            "CLK_LOW": clk_low,
+            "CLK_STRIDE": stride,
+        }
+
+    def level_function(self, ptype: PropertyType) -> str:
+        """Returns an importance function for rare event simulation of the noise properties.
+
+        The noise counters only ever grow, and a run satisfies a noise property once its counter reaches
+        the threshold, so the counter capped at the threshold measures how close a run is to the rare event.
+        For both noise types, the closer of the two counters counts. The thresholds are referred to by their
+        constants, so the function also serves parametric models.
+
+        Args:
+            ptype (PropertyType): The type of the properties, RESISTIVE, INDUCTIVE or BOTH_RI.
+
+        Returns:
+            str: The importance function as a Modest expression.
+        """
+        resistive = "(resistiveNoise < RESISTIVE_NOISE_THRESH ? resistiveNoise : RESISTIVE_NOISE_THRESH)"
+        inductive = "(inductiveNoise < INDUCTIVE_NOISE_THRESH ? inductiveNoise : INDUCTIVE_NOISE_THRESH)"
+
+        if ptype == PropertyType.RESISTIVE:
+            return resistive
+        if ptype == PropertyType.INDUCTIVE:
+            return inductive
+        if ptype == PropertyType.BOTH_RI:
+            # Scale both counters to a common denominator, so that they are compared as fractions of their thresholds
+            resistive_scaled = f"{resistive} * INDUCTIVE_NOISE_THRESH"
+            inductive_scaled = f"{inductive} * RESISTIVE_NOISE_THRESH"
+            return f"({resistive_scaled} > {inductive_scaled} ? {resistive_scaled} : {inductive_scaled})"
+        raise ValueError(f"No level function for {ptype.name} properties")
+
+    @cached_section
     @add_info
     def type(self) -> str:
         return "option \"dtmc\";\n"
 
+    @cached_section
     @add_info
-    def user_defined_constants(self) -> str:
+    def user_defined_constants(self, parametric: bool = False) -> str:
+        if parametric:
+            thresholds: str = """\
+// #CUSTOMIZE this is the upper threshold for noise detected in the system.
+// The thresholds are open, set them when running the model (e.g. modest -E "RESISTIVE_NOISE_THRESH=1,...").
+const int RESISTIVE_NOISE_THRESH;
+const int INDUCTIVE_NOISE_THRESH;
+
+// The clock bound of the property in slot `k` is CLK_LOW + k * CLK_STRIDE.
+const int CLK_LOW;
+const int CLK_STRIDE;
+"""
+        else:
+            thresholds: str = f"""\
+// #CUSTOMIZE this is the upper threshold for noise detected in the system.
+const int RESISTIVE_NOISE_THRESH = {self.resistive_noise_threshold};
+const int INDUCTIVE_NOISE_THRESH = {self.inductive_noise_threshold};
+"""
+
         return f"""\
 //----- User Defined Constants -----
 
@@ -129,11 +363,9 @@ transient int(0..1) clk_indicator;
 // #CUSTOMIZE the number of buffers a router must service before noise will be incremented.
 const int ACTIVITY_THRESH = {self.activity_thresh};
 
-// #CUSTOMIZE this is the upper threshold for noise detected in the system.
-const int RESISTIVE_NOISE_THRESH = {self.resistive_noise_threshold};
-const int INDUCTIVE_NOISE_THRESH = {self.inductive_noise_threshold};
-"""
+""" + thresholds
 
+    @cached_section
     @add_info
     def calculated_constants(self) -> str:
         return """\
@@ -160,24 +392,22 @@ const int LOCAL = 4;
 const int NO_CONNECT = -1;
 """
     
+    @cached_section
     @add_info
     def functional_datatypes(self, ptype: PropertyType) -> str:
         first_half: str = """\
 // ----- Functional Datatypes -----
 
-datatype buffer = {
-    int(0..NOC_MAX_ID) hd,
-    buffer option tl
-};
+""" + self.buffer_datatype() + f"""\
 
-datatype channel = {
-    buffer option buffer,
+datatype channel = {{
+    {self.buffer_type()} buffer,
     bool serviced,
     bool isEmpty,
     bool isFull
-};
+}};
 
-datatype router = {
+datatype router = {{
     channel[] channels,
     int(-1..NOC_MAX_ID)[] ids,
     int(0..4)[] priority_list,
@@ -187,9 +417,11 @@ datatype router = {
     int(0..5) total_unserviced,
 """
 
-        optional_vars: str = """\
-	int thisActivity,
-	int lastActivity,
+        # A router services each of its five channels at most once per cycle
+        activity_type: str = "int(0..5)" if self.bounded_counters else "int"
+        optional_vars: str = f"""\
+	{activity_type} thisActivity,
+	{activity_type} lastActivity,
 """
 
         second_half: str = """\
@@ -201,6 +433,7 @@ datatype router = {
                 if ptype == PropertyType.FUNCTION \
                 else first_half + optional_vars + second_half 
 
+    @cached_section
     @add_info
     def verification_datatypes(self) -> str:
         return """\
@@ -211,9 +444,14 @@ datatype sendCounter = {
 };
 """
 
-    @add_info
+    @cached_section
     def noc_init(self, ptype: PropertyType) -> str:
-        init: str = "router[] noc = [\n"
+        return "".join(self.iter_noc_init(ptype))
+
+    @add_info_chunks
+    def iter_noc_init(self, ptype: PropertyType) -> Iterator[str]:
+        yield "router[] noc = [\n"
+        empty_buffer: str = self.empty_buffer()
 
         for y in range(self.dimension):
             for x in range(self.dimension):
@@ -235,14 +473,14 @@ datatype sendCounter = {
                 if y + 1 >= self.dimension:
                     id_south = "NO_CONNECT"
 
-                init += f"""\
+                init: str = f"""\
 router {{
     channels: [
-        channel {{buffer: none, serviced: false, isEmpty: true, isFull: false}},
-        channel {{buffer: none, serviced: false, isEmpty: true, isFull: false}},
-        channel {{buffer: none, serviced: false, isEmpty: true, isFull: false}},
-        channel {{buffer: none, serviced: false, isEmpty: true, isFull: false}},
-        channel {{buffer: none, serviced: false, isEmpty: true, isFull: false}}],
+        channel {{buffer: {empty_buffer}, serviced: false, isEmpty: true, isFull: false}},
+        channel {{buffer: {empty_buffer}, serviced: false, isEmpty: true, isFull: false}},
+        channel {{buffer: {empty_buffer}, serviced: false, isEmpty: true, isFull: false}},
+        channel {{buffer: {empty_buffer}, serviced: false, isEmpty: true, isFull: false}},
+        channel {{buffer: {empty_buffer}, serviced: false, isEmpty: true, isFull: false}}],
     ids: [{id_north}, {id_west}, {id_east}, {id_south}],
     priority_list: [NORTH, EAST, SOUTH, WEST, LOCAL],
     priority_list_temp: [0, 0, 0, 0, 0],
@@ -263,57 +501,105 @@ router {{
                     init += ",\n"
                 else:
                     init += "];\n"
-                
-        return init
+
+                yield init
     
-    @add_info
+    @cached_section
     def verification_init(self) -> str:
-        init: str = "sendCounter[] sendCounts = [\n"
+        return "".join(self.iter_verification_init())
+
+    @add_info_chunks
+    def iter_verification_init(self) -> Iterator[str]:
+        yield "sendCounter[] sendCounts = [\n"
 
         for i in range(self.num_nodes):
-            init += "    sendCounter{counts:[0, 0, 0, 0, 0, 0]}"
             if i < self.num_nodes - 1:
-                init += ","
-            init += "\n"
-        
-        init += "];\n"
+                yield "    sendCounter{counts:[0, 0, 0, 0, 0, 0]},\n"
+            else:
+                yield "    sendCounter{counts:[0, 0, 0, 0, 0, 0]}\n"
 
-        return init
+        yield "];\n"
     
+    @cached_section
     @add_info
-    def noise_tracking_init(self) -> str:
-        return """\
+    def noise_tracking_init(self, thresholds: tuple[int, ...] | None = None) -> str:
+        if not self.bounded_counters:
+            return """\
 int resistiveNoise = 0;
 int inductiveNoise = 0;
 """
 
-    @add_info
-    def variables(self, ptype: PropertyType) -> str:
-        var = "// ----- Variables -----\n\n"
-        var += self.noc_init(ptype)
+        # Properties of several thresholds name them, the others refer to the threshold constants
+        if thresholds is None:
+            resistive_max, inductive_max = "RESISTIVE_NOISE_THRESH", "INDUCTIVE_NOISE_THRESH"
+        else:
+            resistive_max = inductive_max = max(thresholds)
+
+        return f"""\
+// The noise counters saturate at the largest threshold of the properties
+const int RESISTIVE_NOISE_MAX = {resistive_max};
+const int INDUCTIVE_NOISE_MAX = {inductive_max};
+int(0..RESISTIVE_NOISE_MAX) resistiveNoise = 0;
+int(0..INDUCTIVE_NOISE_MAX) inductiveNoise = 0;
+"""
+
+    @cached_section
+    def variables(self, ptype: PropertyType, thresholds: tuple[int, ...] | None = None) -> str:
+        return "".join(self.iter_variables(ptype, thresholds))
+
+    @add_info_chunks
+    def iter_variables(self, ptype: PropertyType, thresholds: tuple[int, ...] | None = None) -> Iterator[str]:
+        yield "// ----- Variables -----\n\n"
+        yield from self.iter_noc_init(ptype)
 
         if ptype == PropertyType.FUNCTION:
-            var += self.verification_init()
+            yield from self.iter_verification_init()
         else:
-            var += self.noise_tracking_init()
-        
-        return var
-
-    @add_info
-    def functions(self) -> str:
+            yield self.noise_tracking_init(thresholds)
+
+    def buffer_type(self) -> str:
+        """Returns the Modest type of a channel buffer."""
+        return "buffer option" if self.buffer_encoding == "list" else "buffer"
+
+    def empty_buffer(self) -> str:
+        """Returns the Modest value of an empty channel buffer."""
+        if self.buffer_encoding == "list":
+            return "none"
+        return f"buffer {{slots: [{', '.join(['0'] * self.buffer_size)}], count: 0}}"
+
+    def buffer_datatype(self) -> str:
+        """Returns the Modest datatype of a channel buffer."""
+        if self.buffer_encoding == "list":
+            return """\
+datatype buffer = {
+    int(0..NOC_MAX_ID) hd,
+    buffer option tl
+};
+"""
         return """\
-// ----- Integer functions -----
-
-// Saturating addition
-function int sat_add(int l, int r, int max) =
-    if (l + r) > max then max
-    else l + r;
+// The flits are held front first in `slots`, and slots past `count` are 0, so that
+// buffers holding the same flits are the same state. A count of BUFFER_LENGTH + 1
+// marks a buffer that overflowed.
+datatype buffer = {
+    int(0..NOC_MAX_ID)[] slots,
+    int(0..BUFFER_LENGTH + 1) count
+};
+"""
 
-// ----- Boolean Algebra Functions -----
+    def buffer_functions(self) -> str:
+        """Returns the Modest functions that query and update a channel buffer.
 
-// Boolean implication (l ==> r)
-function bool implies(bool l, bool r) = (!l) || r;
+        Every encoding provides `len`, `enqueue`, `dequeue`, `contains` and `peekFront`, so the rest of the
+        model doesn't depend on the encoding. The array encoding unrolls its functions over the slots.
 
+        The encodings diverge once a buffer overflows. The list keeps every flit. The array drops the
+        overflowing flit, and its count saturates one past `BUFFER_LENGTH`, so further overflows aren't counted
+        and a dequeue afterwards leaves an empty slot inside the count, which reads as a flit with id 0. The
+        buffer size properties of `PropertyType.FUNCTION` fail at the first overflow with either encoding, but
+        the runs differ after it.
+        """
+        if self.buffer_encoding == "list":
+            return """\
 // ----- List Functions -----
 
 // Calculate length of list
@@ -347,10 +633,67 @@ function int peekFront(buffer option ls) =
     else if ls!.tl == none then ls!.hd
     else peekFront(ls!.tl);
 
+"""
+
+        slots = range(self.buffer_size)
+        enqueued = ", ".join(f"ls.count == {i} ? n : ls.slots[{i}]" for i in slots)
+        dequeued = ", ".join([f"ls.slots[{i}]" for i in slots][1:] + ["0"])
+        contained = " ||\n    ".join(f"(ls.count > {i} && ls.slots[{i}] == id)" for i in slots)
+
+        return f"""\
+// ----- Array Functions -----
+
+// Calculate length of the buffer
+function int len(buffer ls) = ls.count;
+
+// Add a flit to the back of the buffer. A full buffer drops the flit but still counts
+// it, so that the buffer size properties see the overflow.
+function buffer enqueue(int n, buffer ls) =
+    buffer {{
+        slots: [{enqueued}],
+        count: sat_add(ls.count, 1, BUFFER_LENGTH + 1)
+    }};
+
+// Remove the flit at the front of the buffer
+function buffer dequeue(buffer ls) =
+    if ls.count == 0 then ls
+    else buffer {{
+        slots: [{dequeued}],
+        count: ls.count - 1
+    }};
+
+// Returns true if the buffer `ls` contains `id`, otherwise returns false
+function bool contains(int id, buffer ls) =
+    {contained};
+
+// Return the front of the queue
+function int peekFront(buffer ls) =
+    if ls.count == 0 then -1
+    else ls.slots[0];
+
+"""
+
+    @cached_section
+    @add_info
+    def functions(self) -> str:
+        return """\
+// ----- Integer functions -----
+
+// Saturating addition
+function int sat_add(int l, int r, int max) =
+    if (l + r) > max then max
+    else l + r;
+
+// ----- Boolean Algebra Functions -----
+
+// Boolean implication (l ==> r)
+function bool implies(bool l, bool r) = (!l) || r;
+
+""" + self.buffer_functions() + """\
 // ----- Buffer Specific Functions -----
 
 // Tell if the buffer is full
-function bool isBufferFull(buffer option ls) = len(ls) >= BUFFER_LENGTH;
+function bool isBufferFull(""" + self.buffer_type() + """ ls) = len(ls) >= BUFFER_LENGTH;
 
 // ----- Routing Functions
 
@@ -376,6 +719,7 @@ function int idToRow(int id) = (int)(id / NOC_MESH_HEIGHT);
 function int getColumnShift(int id, int dst) = idToColumn(dst) - idToColumn(id);
 """
     
+    @cached_section
     @add_info
     def processes(self, ptype: PropertyType, generate_flits: str | None = None) -> str:
         if generate_flits is None:
@@ -848,10 +1192,10 @@ process UpdatePriority(int id) {
 process UpdateGlobalNoiseTracking(int id) {
     {= 
        // Update inductive noise
-       0: inductiveNoise += abs(noc[id].lastActivity - noc[id].thisActivity) >= ACTIVITY_THRESH ? 1 : 0,
+       0: """ + self.noise_update("inductive", "abs(noc[id].lastActivity - noc[id].thisActivity) >= ACTIVITY_THRESH") + """,
 
        // Update resistive noise
-       0: resistiveNoise += noc[id].thisActivity >= ACTIVITY_THRESH ? 1 : 0,
+       0: """ + self.noise_update("resistive", "noc[id].thisActivity >= ACTIVITY_THRESH") + """,
 
        // Update trackers for next round
        1: noc[id].lastActivity = noc[id].thisActivity,
@@ -896,14 +1240,222 @@ process Clock() {
         else:
             return functional
 
-    @add_info
+    @cached_section
+    def router_processes(self, ptype: PropertyType) -> str:
+        return "".join(self.iter_router_processes(ptype))
+
+    @add_info_chunks
+    def iter_router_processes(self, ptype: PropertyType) -> Iterator[str]:
+        """Generates a specialized copy of the routing processes for every router.
+
+        The generic `Send`, `AdvanceFlits`, `AdvanceChannel` and `AdvanceRouter` processes look up the neighbors
+        of a router and the channels they receive in at every step. The topology of the mesh is known here, so
+        every router gets its own copies with these as constants. It has a `Send` for each connected direction
+        only, and the routing decisions its boundaries rule out are left out. The generic processes are still
+        generated, and `PrepRouter`, `UpdatePriority` and the flit generation are shared.
+
+        Args:
+            ptype (PropertyType): The type of the properties, which decides between the verification and the
+                noise tracking processes as in `processes`.
+
+        Yields:
+            str: The processes of the next router.
+        """
+        # The neighbor across each direction receives in the opposite channel (see `getDestinationChannel`)
+        opposite = {"NORTH": "SOUTH", "WEST": "EAST", "EAST": "WEST", "SOUTH": "NORTH"}
+        verification = ptype == PropertyType.FUNCTION
+
+        for y in range(self.dimension):
+            for x in range(self.dimension):
+                id = x + y * self.dimension
+                neighbors = {}
+                if y > 0:
+                    neighbors["NORTH"] = id - self.dimension
+                if x > 0:
+                    neighbors["WEST"] = id - 1
+                if x < self.dimension - 1:
+                    neighbors["EAST"] = id + 1
+                if y < self.dimension - 1:
+                    neighbors["SOUTH"] = id + self.dimension
+
+                front = f"peekFront(noc[{id}].channels[ch].buffer)"
+                processes = f"// ----- Router {id} -----\n\n"
+
+                if verification:
+                    send_count = f"""\
+            // #VERIFICATION
+            // Increment the send counts using a saturating count
+            0: sendCounts[{id}].counts[ch] = sat_add(sendCounts[{id}].counts[ch], 1, 2),
+
+"""
+                    send_activity = "\n"
+                    delivery_activity = ""
+                else:
+                    send_count = ""
+                    send_activity = f""",
+
+            // Increment the count for buffers serviced in this cycle
+            4: noc[{id}].thisActivity++
+"""
+                    delivery_activity = f"""\
+
+            // Increment the activity for this cycle as we removed a flit
+            noc[{id}].thisActivity = !noc[{id}].used[LOCAL] ? noc[{id}].thisActivity + 1 : noc[{id}].thisActivity,
+"""
+
+                for dir, neighbor in neighbors.items():
+                    destination = f"noc[{neighbor}].channels[{opposite[dir]}]"
+                    processes += f"""\
+// Send a flit from Router {id} across channel `ch` to Router {neighbor} in the {dir} direction
+process Send_{id}_{dir}(int ch) {{
+    advanceChannel;
+
+    // If the destination is not full, and the channel has not been used in this cycle, then service the buffer
+    if(!{destination}.isFull && !noc[{id}].used[{dir}]){{
+        advanceChannelSend {{=
+{send_count}\
+            // Add flit to destination buffer
+            1: {destination}.buffer =
+                enqueue({front}, {destination}.buffer),
+
+            // Then, remove it from the source buffer
+            2: noc[{id}].channels[ch].buffer = dequeue(noc[{id}].channels[ch].buffer),
+
+            // Mark that output as used and that channel as serviced
+            4: noc[{id}].used[{dir}] = true,
+            4: noc[{id}].channels[ch].serviced = true{send_activity}\
+        =}}
+    }}
+    // Otherwise, increment total unserviced buffers
+    else{{
+        advanceChannelSend {{=
+            noc[{id}].total_unserviced++
+        =}}
+    }}
+}}
+
+"""
+
+                # XY routing never sends a flit across a boundary, so a missing neighbor decides the branch
+                if "NORTH" in neighbors and "SOUTH" in neighbors:
+                    vertical = f"""\
+        if({front} < {id}){{
+            Send_{id}_NORTH(ch)
+        }}
+        else{{
+            Send_{id}_SOUTH(ch)
+        }}"""
+                else:
+                    vertical = f"        Send_{id}_{'NORTH' if 'NORTH' in neighbors else 'SOUTH'}(ch)"
+
+                if "WEST" in neighbors and "EAST" in neighbors:
+                    horizontal = f"""\
+        if({front} % NOC_MESH_WIDTH < {x}){{
+            Send_{id}_WEST(ch)
+        }}
+        else{{
+            Send_{id}_EAST(ch)
+        }}"""
+                else:
+                    horizontal = f"        Send_{id}_{'WEST' if 'WEST' in neighbors else 'EAST'}(ch)"
+
+                unconnected = "".join(f"ch == {dir} || " for dir in opposite if dir not in neighbors)
+                noise_tracking = "" if verification else f"    UpdateGlobalNoiseTracking({id});\n"
+
+                processes += f"""\
+// Determine which direction to send the front-most flit in channel `ch` of router {id}
+process AdvanceFlits_{id}(int ch) {{
+    // If flit needs to stay on this column
+    if({front} % NOC_MESH_WIDTH == {x}) {{
+{vertical}
+    }}
+    // Otherwise, it needs to change columns
+    else {{
+{horizontal}
+    }}
+}}
+
+// Advance a specific channel `ch` in router {id}
+process AdvanceChannel_{id}(int ch) {{
+    // If this channel has no neighbor or if it is
+    // empty, then mark it as serviced and move on to the next one
+    if ({unconnected}noc[{id}].channels[ch].isEmpty == true) {{
+        advanceChannel {{=
+            // Mark the channel as serviced
+            noc[{id}].channels[ch].serviced = true
+        =}};
+        advanceChannelSend
+    }}
+    // If the flit has reached its destination...
+    else if ({front} == {id}) {{
+        advanceChannel {{=
+            /* -- if the local channel has not been used this clock cycle -- */
+            // Mark the channel as serviced and used
+            noc[{id}].channels[ch].serviced = !noc[{id}].used[LOCAL],
+            noc[{id}].used[LOCAL] = !noc[{id}].used[LOCAL],
+
+            // Remove this flit. It has reached its destination
+            noc[{id}].channels[ch].buffer = !noc[{id}].used[LOCAL] ? dequeue(noc[{id}].channels[ch].buffer) : noc[{id}].channels[ch].buffer,
+{delivery_activity}
+            /* -- if the local channel has been used this clock cycle -- */
+            // Otherwise, increment total unserviced buffers
+            noc[{id}].total_unserviced = !noc[{id}].used[LOCAL] ? noc[{id}].total_unserviced : noc[{id}].total_unserviced + 1
+        =}};
+        advanceChannelSend
+    }}
+    // Otherwise, the flit must be for another router
+    else {{
+        AdvanceFlits_{id}(ch)
+    }}
+}}
+
+// Advance every channel in router {id} in the order of the priority list
+process AdvanceRouter_{id}() {{
+    AdvanceChannel_{id}(noc[{id}].priority_list[0]);
+    AdvanceChannel_{id}(noc[{id}].priority_list[1]);
+    AdvanceChannel_{id}(noc[{id}].priority_list[2]);
+    AdvanceChannel_{id}(noc[{id}].priority_list[3]);
+    AdvanceChannel_{id}(noc[{id}].priority_list[4])
+}}
+
+// Router {id} model
+process Router_{id}() {{
+    GenerateFlits({id});
+    PrepRouter({id});
+    AdvanceRouter_{id}();
+    UpdatePriority({id});
+{noise_tracking}\
+    nextClockCycle;
+    Router_{id}()
+}}
+
+"""
+                yield processes
+
+    def noise_update(self, noise: str, condition: str) -> str:
+        """Returns the assignment that counts a noise event of a router if `condition` holds.
+
+        Args:
+            noise (str): "resistive" or "inductive".
+            condition (str): The Modest expression that is true if the router caused a noise event.
+
+        Returns:
+            str: The assignment.
+        """
+        if self.bounded_counters:
+            return f"{noise}Noise = sat_add({noise}Noise, {condition} ? 1 : 0, {noise.upper()}_NOISE_MAX)"
+        return f"{noise}Noise += {condition} ? 1 : 0"
+
+    @cached_section
     def composition(self) -> str:
-        composition: str = "par {\n    :: Clock()\n"
-        for i in range(self.num_nodes):
-            composition += f"    :: Router({i})\n"
-        composition += "}\n"
+        return "".join(self.iter_composition())
 
-        return composition
+    @add_info_chunks
+    def iter_composition(self) -> Iterator[str]:
+        yield "par {\n    :: Clock()\n"
+        for i in range(self.num_nodes):
+            yield f"    :: Router_{i}()\n" if self.specialize_routers else f"    :: Router({i})\n"
+        yield "}\n"
 
     def resistive_noise(self, clk: int) -> str:
         return f"""\
@@ -915,31 +1467,44 @@ property resistiveNoiseProbability1RewardBounded{clk}  = Pmax(<>[S(clk_indicator
 property inductiveNoiseProbability1RewardBounded{clk}  = Pmax(<>[S(clk_indicator)<={clk}]  (inductiveNoise >= INDUCTIVE_NOISE_THRESH));
 """
 
-    def resistive_range(self, clk_low: int, clk_high: int, stride: int = 1) -> str:
-        properties: str = ""
-        for clk in range(clk_low, clk_high+1, stride):
-            properties += self.resistive_noise(clk)
-        return properties
+    def parametric_resistive_noise(self, slot: int) -> str:
+        return f"""\
+property resistiveNoiseProbability1RewardBoundedSlot{slot}  = Pmax(<>[S(clk_indicator)<=CLK_LOW + {slot} * CLK_STRIDE] (resistiveNoise >= RESISTIVE_NOISE_THRESH));
+"""
+
+    def parametric_inductive_noise(self, slot: int) -> str:
+        return f"""\
+property inductiveNoiseProbability1RewardBoundedSlot{slot}  = Pmax(<>[S(clk_indicator)<=CLK_LOW + {slot} * CLK_STRIDE]  (inductiveNoise >= INDUCTIVE_NOISE_THRESH));
+"""
+
+    def resistive_range(self, clk_low: int, clk_high: int, stride: int = 1, clks: Iterable[int] | None = None) -> str:
+        return "".join(self.iter_resistive_range(clk_low, clk_high, stride, clks))
+
+    def iter_resistive_range(self, clk_low: int, clk_high: int, stride: int = 1, clks: Iterable[int] | None = None) -> Iterator[str]:
+        for clk in (range(clk_low, clk_high+1, stride) if clks is None else clks):
+            yield self.resistive_noise(clk)
     
-    def inductive_range(self, clk_low: int, clk_high: int, stride: int = 1) -> str:
-        properties: str = ""
-        for clk in range(clk_low, clk_high+1, stride):
-            properties += self.inductive_noise(clk)
-        return properties
+    def inductive_range(self, clk_low: int, clk_high: int, stride: int = 1, clks: Iterable[int] | None = None) -> str:
+        return "".join(self.iter_inductive_range(clk_low, clk_high, stride, clks))
+
+    def iter_inductive_range(self, clk_low: int, clk_high: int, stride: int = 1, clks: Iterable[int] | None = None) -> Iterator[str]:
+        for clk in (range(clk_low, clk_high+1, stride) if clks is None else clks):
+            yield self.inductive_noise(clk)
     
     def correctness(self) -> str:
-        prop: str = ""
+        return "".join(self.iter_correctness())
 
+    def iter_correctness(self) -> Iterator[str]:
         # never generates flits for self (flit generation correctness)
-        prop += "// Flit generation verification\n"
+        yield "// Flit generation verification\n"
         for i in range(self.num_nodes):
-            prop += f"property neverGeneratesFlitsForSelf{i} = A[](!(contains({i}, noc[{i}].channels[LOCAL].buffer)));\n"
-        prop += "\n"
+            yield f"property neverGeneratesFlitsForSelf{i} = A[](!(contains({i}, noc[{i}].channels[LOCAL].buffer)));\n"
+        yield "\n"
 
         # priority list is always valid
-        prop += "// Valid priority list\n"
+        yield "// Valid priority list\n"
         for i in range(self.num_nodes):
-            prop += f"""\
+            yield f"""\
 property alwaysContainsNorth{i} = A[](noc[{i}].priority_list[0] == NORTH || noc[{i}].priority_list[1] == NORTH || noc[{i}].priority_list[2] == NORTH || noc[{i}].priority_list[3] == NORTH || noc[{i}].priority_list[4] == NORTH);
 property alwaysContainsEast{i}  = A[](noc[{i}].priority_list[0] == EAST  || noc[{i}].priority_list[1] == EAST  || noc[{i}].priority_list[2] == EAST  || noc[{i}].priority_list[3] == EAST  || noc[{i}].priority_list[4] == EAST);
 property alwaysContainsSouth{i} = A[](noc[{i}].priority_list[0] == SOUTH || noc[{i}].priority_list[1] == SOUTH || noc[{i}].priority_list[2] == SOUTH || noc[{i}].priority_list[3] == SOUTH || noc[{i}].priority_list[4] == SOUTH);
@@ -958,12 +1523,12 @@ property allPrioritiesAreUnique{i}  = A[]((noc[{i}].priority_list[0] != noc[{i}]
                                           (noc[{i}].priority_list[3] != noc[{i}].priority_list[4]));
 
 """
-        prop += "\n"
+        yield "\n"
 
         # buffer length valid
-        prop += "// Buffer length validation (never goes past specified size)\n"
+        yield "// Buffer length validation (never goes past specified size)\n"
         for i in range(self.num_nodes):
-            prop += f"""\
+            yield f"""\
 property r{i}BufferSizeAlwaysValidNorth = A[](len(noc[{i}].channels[NORTH].buffer) <= BUFFER_LENGTH);
 property r{i}BufferSizeAlwaysValidEast  = A[](len(noc[{i}].channels[EAST].buffer)  <= BUFFER_LENGTH);
 property r{i}BufferSizeAlwaysValidSouth = A[](len(noc[{i}].channels[SOUTH].buffer) <= BUFFER_LENGTH);
@@ -971,12 +1536,12 @@ property r{i}BufferSizeAlwaysValidWest  = A[](len(noc[{i}].channels[WEST].buffer
 property r{i}BufferSizeAlwaysValidLocal = A[](len(noc[{i}].channels[LOCAL].buffer) <= BUFFER_LENGTH);
 
 """
-        prop += "\n"
+        yield "\n"
 
         # only sends once per cycle
-        prop += "// Send once per cycle\n"
+        yield "// Send once per cycle\n"
         for i in range(self.num_nodes):
-            prop += f"""\
+            yield f"""\
 property r{i}SendAtMostOnceNorth = A[](sendCounts[{i}].counts[NORTH] <= 1);
 property r{i}SendAtMostOnceWest  = A[](sendCounts[{i}].counts[WEST]  <= 1);
 property r{i}SendAtMostOnceEast  = A[](sendCounts[{i}].counts[EAST]  <= 1);
@@ -984,22 +1549,98 @@ property r{i}SendAtMostOnceSouth = A[](sendCounts[{i}].counts[SOUTH] <= 1);
 property r{i}SendAtMostOnceLocal = A[](sendCounts[{i}].counts[LOCAL] <= 1);
 
 """
-        return prop
 
-    @add_info
-    def properties(self, ptype: PropertyType, *, clk_low: int = 0, clk_high: int = 100, stride: int = 1) -> str:
-        properties: str = ""
+    def parametric_range(self, property: Callable[[int], str], clk_low: int, clk_high: int, stride: int = 1) -> str:
+        return "".join(self.iter_parametric_range(property, clk_low, clk_high, stride))
+
+    def iter_parametric_range(self, property: Callable[[int], str], clk_low: int, clk_high: int, stride: int = 1) -> Iterator[str]:
+        for slot in range(len(range(clk_low, clk_high+1, stride))):
+            yield property(slot)
+
+    def fused_noise(self, noise: str, threshold: int, number: int, parametric: bool = False) -> str:
+        if parametric:
+            return f"""\
+property {noise}NoiseProbabilityThresh{threshold}RewardBoundedSlot{number}  = Pmax(<>[S(clk_indicator)<=CLK_LOW + {number} * CLK_STRIDE] ({noise}Noise >= {threshold}));
+"""
+        return f"""\
+property {noise}NoiseProbabilityThresh{threshold}RewardBounded{number}  = Pmax(<>[S(clk_indicator)<={number}] ({noise}Noise >= {threshold}));
+"""
+
+    def fused_properties(self, ptype: PropertyType, thresholds: Iterable[int], *, clk_low: int = 0, clk_high: int = 100, stride: int = 1,
+                         parametric: bool = False, clks: Iterable[int] | None = None) -> str:
+        """Generates the noise properties for several thresholds and both noise types at once.
+
+        Every run of a simulation is checked against every property, so estimating all thresholds in one
+        model shares the runs that separate models would each repeat. The thresholds are part of the property
+        names (e.g. `resistiveNoiseProbabilityThresh5RewardBounded12`), see `parse_fused_probabilities`.
+
+        Args:
+            ptype (PropertyType): RESISTIVE, INDUCTIVE, or BOTH_RI for both noise types.
+            thresholds (Iterable[int]): The noise thresholds.
+            clk_low (int, optional): The lower bound of the clock cycle. Defaults to 0.
+            clk_high (int, optional): The upper bound of the clock cycle. Defaults to 100.
+            stride (int, optional): The stride for the clock cycle. Defaults to 1.
+            parametric (bool, optional): Leave the clock bounds open, as in `print`. Defaults to False.
+            clks (Iterable[int] | None, optional): Explicit clock cycles instead of the range. Defaults to None.
+
+        Returns:
+            str: The properties.
+        """
+        return "".join(self.iter_fused_properties(ptype, thresholds, clk_low=clk_low, clk_high=clk_high, stride=stride,
+                                                  parametric=parametric, clks=clks))
+
+    @add_info_chunks
+    def iter_fused_properties(self, ptype: PropertyType, thresholds: Iterable[int], *, clk_low: int = 0, clk_high: int = 100, stride: int = 1,
+                              parametric: bool = False, clks: Iterable[int] | None = None) -> Iterator[str]:
+        """Generates the properties of `fused_properties` one at a time."""
+        assert ptype in (PropertyType.RESISTIVE, PropertyType.INDUCTIVE, PropertyType.BOTH_RI), "Only noise properties can be fused"
+        assert clks is None or not parametric, "Explicit clock cycles can't be combined with a parametric model"
+
+        noises = []
+        if ptype == PropertyType.RESISTIVE or ptype == PropertyType.BOTH_RI:
+            noises.append("resistive")
+        if ptype == PropertyType.INDUCTIVE or ptype == PropertyType.BOTH_RI:
+            noises.append("inductive")
+
+        if parametric:
+            numbers = range(len(range(clk_low, clk_high+1, stride)))
+        else:
+            numbers = list(range(clk_low, clk_high+1, stride) if clks is None else clks)
+
+        for noise in noises:
+            for threshold in thresholds:
+                for number in numbers:
+                    yield self.fused_noise(noise, threshold, number, parametric)
+
+    def properties(self, ptype: PropertyType, *, clk_low: int = 0, clk_high: int = 100, stride: int = 1, parametric: bool = False,
+                   clks: Iterable[int] | None = None) -> str:
+        return "".join(self.iter_properties(ptype, clk_low=clk_low, clk_high=clk_high, stride=stride, parametric=parametric, clks=clks))
+
+    @add_info_chunks
+    def iter_properties(self, ptype: PropertyType, *, clk_low: int = 0, clk_high: int = 100, stride: int = 1, parametric: bool = False,
+                        clks: Iterable[int] | None = None) -> Iterator[str]:
+        assert clks is None or not parametric, "Explicit clock cycles can't be combined with a parametric model"
+
+        if clks is not None:
+            clks = list(clks)
 
         if ptype == PropertyType.NO_PROPS:
-            return properties
+            return
+
+        if parametric and ptype != PropertyType.FUNCTION:
+            if ptype == PropertyType.RESISTIVE or ptype == PropertyType.BOTH_RI:
+                yield from self.iter_parametric_range(self.parametric_resistive_noise, clk_low, clk_high, stride)
+
+            if ptype == PropertyType.INDUCTIVE or ptype == PropertyType.BOTH_RI:
+                yield from self.iter_parametric_range(self.parametric_inductive_noise, clk_low, clk_high, stride)
+
+            return
         
         if ptype == PropertyType.RESISTIVE or ptype == PropertyType.BOTH_RI:
-            properties += self.resistive_range(clk_low, clk_high, stride)
+            yield from self.iter_resistive_range(clk_low, clk_high, stride, clks)
         
         if ptype == PropertyType.INDUCTIVE or ptype == PropertyType.BOTH_RI:
-            properties += self.inductive_range(clk_low, clk_high, stride)
+            yield from self.iter_inductive_range(clk_low, clk_high, stride, clks)
         
         if ptype == PropertyType.FUNCTION:
-            properties += self.correctness()
-        
-        return properties
\ No newline at end of file
+            yield from self.iter_correctness()
\ No newline at end of file
@@ -0,0 +1,286 @@
+"""Chooses between exact model checking and simulation for every PSN sweep of a campaign.
+
+Exact checking gives exact probabilities and can be much faster than simulation for small meshes,
+but it holds the whole state space in memory and its cost grows with the state space. For each
+job, the planner bounds the state space analytically from the `Noc` parameters, then explores it
+with Modest's model checker under a short timeout and a memory limit. Both the exploration and exact
+checking use the model with `bounded_counters`, whose state space is finite. If the exploration finishes,
+the measured states, transitions, time and memory predict the cost of checking the curve. A job is routed
+to exact checking only if the prediction fits in the memory budget and beats the estimated time of
+the simulation. The engine that produced each curve is recorded in its timing file.
+
+    python planner.py campaign.json               # print the plan
+    python planner.py campaign.json --calibrate   # measure the cost model on this machine first
+    python planner.py campaign.json --run         # run every job with its planned engine
+"""
+import argparse
+import json
+import math
+from dataclasses import dataclass
+from pathlib import Path
+
+import campaign
+import modest
+import psn_results
+from noc import Noc, PropertyType
+from probabilities import parse_state_space
+from psn_results import ENGINE_EXACT, ENGINE_SIMULATION
+
+# The memory available to a single job in MB
+MEMORY_BUDGET_MB: float = 16 * 1024
+
+# Seconds the model checker may spend exploring the state space of a job while planning
+EXPLORATION_TIMEOUT: float = 60.0
+
+# Time of the model checker per transition and bounded step of a property, in seconds. Value iteration
+# touches every transition once per step, at a few nanoseconds each on current hardware. This default is
+# only the order of magnitude; `calibrate` measures it on the machine at hand.
+SECONDS_PER_TRANSITION_STEP: float = 2e-9
+
+# Peak memory of checking properties relative to exploring the state space alone. Checking keeps a value
+# per state for every step next to the explored states and transitions. Like the time, the default is a
+# rough guess that `calibrate` replaces with a measurement.
+EXACT_MEMORY_FACTOR: float = 1.5
+
+# The clock bound of the property `calibrate` checks
+CALIBRATION_CLK: int = 20
+
+
+@dataclass
+class Plan:
+    """The engine chosen for a job and the predictions it was chosen by.
+
+    Attributes:
+        job (campaign.Job): The job.
+        engine (str): `ENGINE_EXACT` or `ENGINE_SIMULATION`.
+        reason (str): Why the engine was chosen.
+        log10_state_bound (float): The base 10 logarithm of the analytic bound on the number of states.
+        states (int | None): The number of states the exploration found, or None if it didn't finish.
+        exact_time (float | None): The predicted time of exact checking in seconds.
+        exact_memory (float | None): The predicted peak memory of exact checking in MB.
+        simulation_time (float): The estimated time of the simulation in seconds.
+    """
+    job: campaign.Job
+    engine: str
+    reason: str
+    log10_state_bound: float
+    states: int | None
+    exact_time: float | None
+    exact_memory: float | None
+    simulation_time: float
+
+
+def log10_state_bound(noc: Noc, ptype: PropertyType) -> float:
+    """Bounds the number of states of a NoC model analytically.
+
+    Every router has five channels, each buffering up to `buffer_size` flits addressed to any router, a
+    permutation of its five priorities, the service indices and two activity counters of at most five
+    services a cycle. The clock counter cycles through the injection rate denominator. The noise counters
+    are counted only up to their thresholds. Models with `bounded_counters` saturate them there, but other
+    models don't bound them, so whether such a model is finite at all is left to the exploration. The
+    bound ignores reachability and grows far faster than the real state space.
+
+    Args:
+        noc (Noc): The NoC.
+        ptype (PropertyType): The type of the properties.
+
+    Returns:
+        float: The base 10 logarithm of the bound.
+    """
+    buffer_contents = sum(noc.num_nodes ** k for k in range(noc.buffer_size + 1))
+    channel = buffer_contents * 2 * 2 * 2
+    router = channel ** 5 * math.factorial(5) * 5 * 5 * 6
+    if ptype != PropertyType.FUNCTION:
+        router *= 6 ** 2
+
+    log_bound = noc.num_nodes * math.log10(router) + math.log10(noc.injection_rate_denominator + 1)
+    if ptype in (PropertyType.RESISTIVE, PropertyType.BOTH_RI):
+        log_bound += math.log10(noc.resistive_noise_threshold + 1)
+    if ptype in (PropertyType.INDUCTIVE, PropertyType.BOTH_RI):
+        log_bound += math.log10(noc.inductive_noise_threshold + 1)
+    return log_bound
+
+
+def exact_noc_options(job: campaign.Job) -> dict:
+    """Returns the `Noc` options of a job for exact checking.
+
+    The counters are bounded, since the noise counters of other models grow without bound and their state
+    space is infinite. Bounding them leaves the probabilities of the properties unchanged.
+    """
+    return {**job.noc_options, "bounded_counters": True}
+
+
+def explore_state_space(noc: Noc, ptype: PropertyType, *, timeout: float = EXPLORATION_TIMEOUT,
+                        max_memory: float | None = MEMORY_BUDGET_MB) -> tuple[int, int, modest.RunResult] | None:
+    """Explores the state space of a NoC model with Modest's model checker, without checking any property.
+
+    The exploration is only bounded by its timeout and memory limit, so the model should have `bounded_counters`.
+
+    Args:
+        noc (Noc): The NoC.
+        ptype (PropertyType): The type of the properties, which decides the variables of the model.
+        timeout (float, optional): Seconds after which the exploration is abandoned. Defaults to `EXPLORATION_TIMEOUT`.
+        max_memory (float | None, optional): Resident memory in MB above which the exploration is abandoned.
+            Defaults to `MEMORY_BUDGET_MB`.
+
+    Returns:
+        tuple[int, int, modest.RunResult] | None: The number of states and transitions and the run of the
+            exploration, or None if it didn't finish.
+    """
+    # The noise properties share one model, so exploring it without properties covers all of them
+    model = noc.print(PropertyType.NO_PROPS if ptype != PropertyType.FUNCTION else ptype)
+    result = modest.check_run(model, timeout=timeout, max_memory=max_memory)
+    if result.failure is not None:
+        return None
+
+    state_space = parse_state_space(result.output)
+    if state_space is None:
+        return None
+    return state_space[0], state_space[1], result
+
+
+def calibrate(job: campaign.Job, *, clk: int = CALIBRATION_CLK, memory_mb: float = MEMORY_BUDGET_MB,
+              timeout: float = EXPLORATION_TIMEOUT) -> tuple[float, float] | None:
+    """Measures the cost model of exact checking on a job, to replace the rough defaults.
+
+    The state space of the job is explored, and then a single property with clock bound `clk` is checked.
+    The time the check takes beyond the exploration, per transition and step, gives the time per transition
+    step. The peak memory of the check relative to the exploration gives the memory factor. A small job
+    whose state space is explored in a few seconds calibrates best.
+
+    Args:
+        job (campaign.Job): The job to calibrate on.
+        clk (int, optional): The clock bound of the checked property. Defaults to `CALIBRATION_CLK`.
+        memory_mb (float, optional): The memory the runs may use in MB. Defaults to `MEMORY_BUDGET_MB`.
+        timeout (float, optional): Seconds each run may take. Defaults to `EXPLORATION_TIMEOUT`.
+
+    Returns:
+        tuple[float, float] | None: The seconds per transition step and the memory factor, or None if a run
+            didn't finish.
+    """
+    noc = Noc(job.size, resistive_noise_threshold=job.threshold, inductive_noise_threshold=job.threshold, **exact_noc_options(job))
+    exploration = explore_state_space(noc, job.ptype, timeout=timeout, max_memory=memory_mb)
+    if exploration is None:
+        return None
+
+    states, transitions, explored = exploration
+    result = modest.check_run(noc.print(job.ptype, clk_low=clk, clk_high=clk), timeout=timeout, max_memory=memory_mb)
+    if result.failure is not None:
+        return None
+
+    seconds_per_step = max(result.wall_time - explored.wall_time, 0.0) / (max(transitions, states) * clk)
+    memory_factor = result.memory / explored.memory if explored.memory > 0 else EXACT_MEMORY_FACTOR
+    return seconds_per_step, memory_factor
+
+
+def plan_job(job: campaign.Job, *, memory_mb: float = MEMORY_BUDGET_MB, exploration_timeout: float = EXPLORATION_TIMEOUT,
+             seconds_per_transition_step: float = SECONDS_PER_TRANSITION_STEP,
+             exact_memory_factor: float = EXACT_MEMORY_FACTOR) -> Plan:
+    """Chooses the engine of a job.
+
+    Args:
+        job (campaign.Job): The job.
+        memory_mb (float, optional): The memory available to the job in MB. Defaults to `MEMORY_BUDGET_MB`.
+        exploration_timeout (float, optional): Seconds the state space exploration may take. Defaults to `EXPLORATION_TIMEOUT`.
+        seconds_per_transition_step (float, optional): The time of the model checker per transition and bounded step,
+            e.g. from `calibrate`. Defaults to `SECONDS_PER_TRANSITION_STEP`.
+        exact_memory_factor (float, optional): The peak memory of checking relative to the exploration, e.g. from
+            `calibrate`. Defaults to `EXACT_MEMORY_FACTOR`.
+
+    Returns:
+        Plan: The chosen engine and the predictions behind it.
+    """
+    noc = Noc(job.size, resistive_noise_threshold=job.threshold, inductive_noise_threshold=job.threshold, **exact_noc_options(job))
+    log_bound = log10_state_bound(noc, job.ptype)
+    simulation_time = campaign.estimate_duration(job)
+
+    def plan(engine: str, reason: str, states: int | None = None, exact_time: float | None = None,
+             exact_memory: float | None = None) -> Plan:
+        return Plan(job, engine, reason, log_bound, states, exact_time, exact_memory, simulation_time)
+
+    if job.clk_upper is None:
+        return plan(ENGINE_SIMULATION, "the curve has no clock bound, so the cost of exact checking can't be predicted")
+
+    exploration = explore_state_space(noc, job.ptype, timeout=exploration_timeout, max_memory=memory_mb)
+    if exploration is None:
+        return plan(ENGINE_SIMULATION, f"the state space exploration didn't finish within {exploration_timeout:g} s and {memory_mb:g} MB")
+
+    states, transitions, result = exploration
+    # Every bounded property is one more value iteration over the transitions per step of its bound
+    steps = sum(range(0, job.clk_upper + 1, job.stride))
+    exact_time = result.wall_time + seconds_per_transition_step * max(transitions, states) * steps
+    exact_memory = result.memory * exact_memory_factor
+
+    if exact_memory > memory_mb:
+        return plan(ENGINE_SIMULATION, "exact checking is predicted to exceed the memory budget", states, exact_time, exact_memory)
+    if exact_time >= simulation_time:
+        return plan(ENGINE_SIMULATION, "simulation is predicted to be faster", states, exact_time, exact_memory)
+    return plan(ENGINE_EXACT, "exact checking is predicted to be faster and fits in memory", states, exact_time, exact_memory)
+
+
+def run_plan(plan: Plan) -> list[tuple[int, float]]:
+    """Runs a job with its planned engine.
+
+    Returns:
+        list[tuple[int, float]]: The probabilities of the curve.
+    """
+    job = plan.job
+    if plan.engine == ENGINE_EXACT:
+        return psn_results.check_curve(size=job.size, ptype=job.ptype, threshold=job.threshold, clk_upper=job.clk_upper,
+                                       stride=job.stride, result_path=job.result_path, noc_options=exact_noc_options(job),
+                                       block_size=job.options.get("block_size") or 50)
+    return psn_results.simulate(**job.simulate_kwargs())
+
+
+def format_plans(plans: list[Plan]) -> str:
+    """Formats the plans of a campaign as a table."""
+    def time_str(seconds: float | None) -> str:
+        return "-" if seconds is None else psn_results.time_to_str(seconds)
+
+    report_str = "Engine plan:\n"
+    for plan in plans:
+        report_str += f"  {plan.job.name}: {plan.engine} ({plan.reason})\n"
+        report_str += f"    state bound 10^{plan.log10_state_bound:.0f}, explored states {plan.states if plan.states is not None else '-'}"
+        report_str += f", exact {time_str(plan.exact_time)}"
+        report_str += f" / {'-' if plan.exact_memory is None else f'{plan.exact_memory:.0f} MB'}"
+        report_str += f", simulation {time_str(plan.simulation_time)}\n"
+    return report_str
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Route the sweeps of a campaign to exact checking or simulation.")
+    parser.add_argument("spec", type=Path, help="The JSON campaign spec (see campaign.py).")
+    parser.add_argument("--memory", type=float, default=MEMORY_BUDGET_MB, help="The memory available to a job in MB.")
+    parser.add_argument("--exploration-timeout", type=float, default=EXPLORATION_TIMEOUT)
+    parser.add_argument("--calibrate", action="store_true", help="Measure the cost model of exact checking on the smallest job first.")
+    parser.add_argument("--run", action="store_true", help="Run every job with its planned engine.")
+    args = parser.parse_args()
+
+    spec = json.loads(args.spec.read_text())
+    jobs = campaign.expand(spec)
+
+    cost_model = dict(seconds_per_transition_step=SECONDS_PER_TRANSITION_STEP, exact_memory_factor=EXACT_MEMORY_FACTOR)
+    bounded = [job for job in jobs if job.clk_upper is not None]
+    if args.calibrate and bounded:
+        calibration = calibrate(min(bounded, key=lambda job: job.size), memory_mb=args.memory, timeout=args.exploration_timeout)
+        if calibration is None:
+            print("[warning]: the calibration didn't finish, using the default cost model")
+        else:
+            cost_model = dict(seconds_per_transition_step=calibration[0], exact_memory_factor=calibration[1])
+            print(f"[info]: calibrated {calibration[0]:.3g} s per transition step and a memory factor of {calibration[1]:.2f}")
+
+    plans = [plan_job(job, memory_mb=args.memory, exploration_timeout=args.exploration_timeout, **cost_model) for job in jobs]
+    report_str = format_plans(plans)
+    print(report_str)
+
+    result_root = Path(spec.get("result_path", "results"))
+    result_root.mkdir(parents=True, exist_ok=True)
+    (result_root / f"{args.spec.stem}.plan.txt").write_text(report_str)
+
+    if args.run:
+        for plan in plans:
+            run_plan(plan)
+
+
+if __name__ == "__main__":
+    main()
@@ -27,24 +27,286 @@
 #       ε:         0.01
 #       δ:         0.050000000000000044
 
+import math
 import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator
 
-def parse_probabilities(output: str) -> list[tuple[int, float]]:
+# The label of a probability in the output of the simulator ("Estimated probability") and of the exact model checker ("Probability")
+PROBABILITY_LABEL: str = r"(?:Estimated probability|Probability)"
+
+def slot_to_cycle(slot: str, number: str, clk_low: int, stride: int) -> int:
+    """Converts the number in a property name to the clock cycle it bounds.
+
+    Properties of parametric models are numbered by slot, and the bound of slot `k`
+    is `clk_low + k * stride`. Other properties are numbered by the clock cycle itself.
+    """
+    return clk_low + int(number) * stride if slot else int(number)
+
+def parse_probabilities(output: str, *, clk_low: int = 0, stride: int = 1) -> list[tuple[int, float]]:
     """Parses the output of the Modest tool to extract probabilities.
 
     Args:
         output: The output string from the Modest tool.
+        clk_low: The CLK_LOW constant the output of a parametric model was produced with.
+        stride: The CLK_STRIDE constant the output of a parametric model was produced with.
 
     Returns:
         A list of floats representing the extracted probabilities.
     """
     probabilities = []
-    pattern = r"Property \w+Probability\w+RewardBounded(\d+)\s+Estimated probability:\s+([\d.]+)"
+    pattern = r"Property \w+Probability\w+RewardBounded(Slot)?(\d+)\s+" + PROBABILITY_LABEL + r":\s+([\d.]+)"
     matches = re.findall(pattern, output)
-    
-    # Sort matches by the number in the property name
-    matches.sort(key=lambda x: int(x[0]))
 
-    for cycle, probability in matches:
-        probabilities.append((int(cycle), float(probability)))
+    for slot, number, probability in matches:
+        probabilities.append((slot_to_cycle(slot, number, clk_low, stride), float(probability)))
+
+    # Sort matches by the clock cycle
+    probabilities.sort(key=lambda x: x[0])
     return probabilities
+
+def parse_fused_probabilities(output: str, *, clk_low: int = 0, stride: int = 1) -> dict[tuple[str, int], list[tuple[int, float]]]:
+    """Parses the output of a model generated with `Noc.fused_properties`.
+
+    Args:
+        output: The output string from the Modest tool.
+        clk_low: The CLK_LOW constant the output of a parametric model was produced with.
+        stride: The CLK_STRIDE constant the output of a parametric model was produced with.
+
+    Returns:
+        The probabilities of each curve, keyed by the noise type ("resistive" or "inductive") and threshold,
+        sorted by the clock cycle.
+    """
+    curves = {}
+    pattern = r"Property (\w+)NoiseProbabilityThresh(\d+)RewardBounded(Slot)?(\d+)\s+" + PROBABILITY_LABEL + r":\s+([\d.]+)"
+
+    for noise, threshold, slot, number, probability in re.findall(pattern, output):
+        curve = curves.setdefault((noise, int(threshold)), [])
+        curve.append((slot_to_cycle(slot, number, clk_low, stride), float(probability)))
+
+    for curve in curves.values():
+        curve.sort(key=lambda x: x[0])
+    return curves
+
+def iter_probabilities(lines: Iterable[str], *, clk_low: int = 0, stride: int = 1) -> Iterator[tuple[int, float]]:
+    """Incrementally parses Modest output, yielding each probability as soon as its lines are read.
+
+    Args:
+        lines: The lines of Modest output, e.g. read from a running process.
+        clk_low: The CLK_LOW constant the output of a parametric model was produced with.
+        stride: The CLK_STRIDE constant the output of a parametric model was produced with.
+
+    Yields:
+        The clock cycle and estimated probability of each property, in the order Modest prints them.
+    """
+    property_pattern = re.compile(r"Property \w+Probability\w+RewardBounded(Slot)?(\d+)\s*$")
+    probability_pattern = re.compile(PROBABILITY_LABEL + r":\s+([\d.]+)")
+
+    cycle = None
+    for line in lines:
+        match = property_pattern.search(line)
+        if match:
+            cycle = slot_to_cycle(match.group(1), match.group(2), clk_low, stride)
+            continue
+
+        match = probability_pattern.search(line)
+        if match and cycle is not None:
+            yield cycle, float(match.group(1))
+            cycle = None
+
+def parse_peak_memory(output: str) -> float | None:
+    """Parses the "Peak memory usage" that Modest reports.
+
+    Args:
+        output: The output string from the Modest tool.
+
+    Returns:
+        The peak memory usage in MB, or None if Modest didn't report it.
+    """
+    match = re.search(r"Peak memory usage:\s+([\d.]+)\s*([KMG]B)", output)
+    if not match:
+        return None
+    scale = {"KB": 1 / 1024, "MB": 1.0, "GB": 1024.0}[match.group(2)]
+    return float(match.group(1)) * scale
+
+def parse_simulation_time(output: str) -> float | None:
+    """Parses the "Simulation time" that Modest reports.
+
+    Args:
+        output: The output string from the Modest tool.
+
+    Returns:
+        The simulation time in seconds, or None if Modest didn't report it.
+    """
+    match = re.search(r"Simulation time:\s+([\d.]+)\s*s", output)
+    return float(match.group(1)) if match else None
+
+@dataclass
+class Estimate:
+    """The outcome of the simulation runs of one property.
+
+    Attributes:
+        successes: The number of runs that satisfied the property.
+        runs: The number of runs.
+    """
+    successes: int
+    runs: int
+
+    @property
+    def probability(self) -> float:
+        """The estimated probability."""
+        return self.successes / self.runs if self.runs else 0.0
+
+    def interval(self, confidence: float = 0.95) -> tuple[float, float]:
+        """Returns the exact (Clopper-Pearson) confidence interval of the probability."""
+        return clopper_pearson(self.successes, self.runs, confidence)
+
+def parse_estimates(output: str) -> dict[str, Estimate]:
+    """Parses the estimated probability and number of runs of every property in Modest output.
+
+    Modest estimates a probability as the fraction of its runs that satisfied the property, so the
+    number of successes is recovered from the estimate and the number of runs.
+
+    Args:
+        output: The output string from the Modest tool.
+
+    Returns:
+        The estimate of each property, keyed by the property name, in the order Modest printed them.
+    """
+    estimates = {}
+    pattern = r"Property (\w+)\s+Estimated probability:\s+([\d.]+)\s+(?:.*\n)*?\s*Runs used:\s+(\d+)"
+
+    for name, probability, runs in re.findall(pattern, output):
+        estimates[name] = Estimate(successes=round(float(probability) * int(runs)), runs=int(runs))
+    return estimates
+
+def __continued_fraction(x: float, a: float, b: float) -> float:
+    """Evaluates the continued fraction of the incomplete beta function with the modified Lentz method."""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+
+    for m in range(1, 1000):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1.0) < 1e-15:
+            break
+    return h
+
+def regularized_beta(x: float, a: float, b: float) -> float:
+    """Returns the regularized incomplete beta function I_x(a, b), the CDF of the Beta(a, b) distribution."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+
+    log_front = math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x)
+    # The continued fraction converges quickly only on one side of the mean
+    if x < (a + 1) / (a + b + 2):
+        return math.exp(log_front) * __continued_fraction(x, a, b) / a
+    return 1.0 - math.exp(log_front) * __continued_fraction(1.0 - x, b, a) / b
+
+def beta_quantile(q: float, a: float, b: float) -> float:
+    """Returns the q-quantile of the Beta(a, b) distribution, found by bisection."""
+    low, high = 0.0, 1.0
+    for _ in range(100):
+        mid = (low + high) / 2
+        if regularized_beta(mid, a, b) < q:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+def clopper_pearson(successes: int, runs: int, confidence: float = 0.95) -> tuple[float, float]:
+    """Returns the exact binomial confidence interval of a probability.
+
+    Args:
+        successes: The number of runs that satisfied the property.
+        runs: The number of runs.
+        confidence: The confidence level of the interval.
+
+    Returns:
+        The lower and upper bound of the interval.
+    """
+    if runs == 0:
+        return 0.0, 1.0
+
+    alpha = 1.0 - confidence
+    lower = 0.0 if successes == 0 else beta_quantile(alpha / 2, successes, runs - successes + 1)
+    upper = 1.0 if successes == runs else beta_quantile(1 - alpha / 2, successes + 1, runs - successes)
+    return lower, upper
+
+def merge_outputs(outputs: list[str], *, confidence: float = 0.95) -> str:
+    """Pools the runs of several independent simulations of the same model.
+
+    The successes and runs of each property are summed, and the estimate and its Clopper-Pearson
+    interval are recomputed from the pooled counts.
+
+    Args:
+        outputs: The outputs of the simulations, e.g. run with different seeds.
+        confidence: The confidence level of the pooled intervals.
+
+    Returns:
+        Modest-style output with the pooled estimate of every property, which the other parsers of this
+        module read like the output of a single simulation.
+    """
+    pooled = {}
+    for output in outputs:
+        for name, estimate in parse_estimates(output).items():
+            total = pooled.setdefault(name, Estimate(0, 0))
+            total.successes += estimate.successes
+            total.runs += estimate.runs
+
+    lines = [f"Pooled {len(outputs)} simulations"]
+    for name, estimate in pooled.items():
+        lower, upper = estimate.interval(confidence)
+        # Avoid the exponent notation the probability patterns don't match
+        probability = f"{estimate.probability:.17f}".rstrip("0").rstrip(".")
+        lines += [
+            f"  + Property {name}",
+            f"    Estimated probability: {probability}",
+            f"    Confidence interval:   [{lower:.6f}, {upper:.6f}]",
+            f"    Runs used:             {estimate.runs}",
+            f"    Successes:             {estimate.successes}",
+            "",
+        ]
+    return "\n".join(lines)
+
+def parse_error_bounds(output: str) -> dict[str, tuple[str, float, float]]:
+    """Parses the error bounds Modest guarantees for each property.
+
+    Args:
+        output: The output string from the Modest tool.
+
+    Returns:
+        The statement of the guarantee (e.g. "Adaptive: P(error > ε) < δ"), ε and δ of each property, keyed by
+        the property name. Properties without error bounds are left out.
+    """
+    bounds = {}
+    for section in re.split(r"\+ Property ", output)[1:]:
+        name = section.split(None, 1)[0]
+        match = re.search(r"Statement:\s+(.+?)\s*\n\s*ε:\s+([\d.eE+-]+)\s*\n\s*δ:\s+([\d.eE+-]+)", section)
+        if match:
+            bounds[name] = (match.group(1), float(match.group(2)), float(match.group(3)))
+    return bounds
+
+def parse_state_space(output: str) -> tuple[int, int] | None:
+    """Parses the size of the state space the exact model checker explored.
+
+    Args:
+        output: The output string from the Modest tool.
+
+    Returns:
+        The number of states and transitions, or None if Modest didn't report them.
+    """
+    states = re.search(r"States:\s+(\d+)", output)
+    transitions = re.search(r"Transitions:\s+(\d+)", output)
+    if not states:
+        return None
+    return int(states.group(1)), int(transitions.group(1)) if transitions else 0
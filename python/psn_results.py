@@ -1,9 +1,29 @@
 from noc import Noc, PropertyType
+import contextlib
 import csv
+import dataclasses
+import itertools
+import math
 import modest
+import multiprocessing
 import time
-from probabilities import parse_probabilities
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from checkpoint import BlockCheckpoint
+from probabilities import parse_error_bounds, parse_fused_probabilities, parse_probabilities
+from result_cache import ResultCache
+from scheduling import BlockSizeTuner, MemoryBudget, RetryPolicy
 from pathlib import Path
+from typing import Callable, Hashable, Iterator
+
+# Probability at which a curve is considered saturated and the sweep ends
+SATURATION_PROBABILITY: float = 1.0 - 1e-5
+
+# The engines that can produce a PSN curve, recorded in its timing file
+ENGINE_SIMULATION: str = "simulation (modest simulate)"
+ENGINE_EXACT: str = "exact (modest check)"
+
+# The most runs spent on a property in rare event mode, since an event that never happens has no relative error
+RARE_EVENT_MAX_RUNS: int = 1_000_000
 
 def time_to_str(time: float) -> str:
     """Formats time as HH:MM:SS.
@@ -40,7 +60,554 @@ def time_func(func):
         return result
     return wrapper
 
-def simulate(*, result_path: Path = Path("results"), size: int, ptype: PropertyType, clk_upper: int | None, threshold: int = 1, stride : int = 1, block_size : int = 50, generate_flits: str | None = None):
+def clock_blocks(clk_upper: int | None, block_size: int):
+    """Yields the (lower, upper) clock cycle windows of a sweep in clock order.
+
+    Args:
+        clk_upper (int | None): The upper bound of the clock cycle. If None the windows never end.
+        block_size (int): The number of clock cycles in each window.
+
+    Yields:
+        tuple[int, int]: The inclusive lower and upper clock cycle of each window.
+    """
+    clk = 0
+    while clk_upper is None or clk <= clk_upper:
+        lower = clk
+        upper = clk + block_size - 1
+
+        if clk_upper is not None and upper > clk_upper:
+            upper = clk_upper
+
+        yield lower, upper
+        clk += block_size
+
+def format_resources(result: modest.RunResult) -> str:
+    """Formats the resources used by a Modest run for the timing file.
+
+    Args:
+        result (modest.RunResult): The Modest run.
+
+    Returns:
+        str: The wall time, CPU time and memory of the run, or a note that it was read from the cache.
+    """
+    if result.cached:
+        return "cached"
+
+    resources = f"wall {result.wall_time:.2f} s, cpu {result.cpu_time:.2f} s, max RSS {result.max_rss:.1f} MB"
+    if result.peak_memory is not None:
+        resources += f", Modest peak {result.peak_memory:.1f} MB"
+    if result.simulation_time is not None:
+        resources += f", Modest time {result.simulation_time:.2f} s"
+    return resources
+
+def format_error_bounds(output: str) -> str:
+    """Summarizes the error bounds Modest guarantees for the properties of a block for the timing file."""
+    bounds = parse_error_bounds(output)
+    if not bounds:
+        return "no error bounds reported"
+
+    statements = sorted({statement for statement, _, _ in bounds.values()})
+    epsilon = max(epsilon for _, epsilon, _ in bounds.values())
+    delta = max(delta for _, _, delta in bounds.values())
+    return f"{'; '.join(statements)} with ε <= {epsilon:g}, δ <= {delta:g} for {len(bounds)} properties"
+
+# Chooses the precision of a block from its bounds and the probabilities merged so far. Returning None
+# keeps the precision of the sweep.
+PrecisionPolicy = Callable[[int, int, list[tuple[int, float]]], modest.Precision | None]
+
+def describe_policy(policy: PrecisionPolicy | None) -> str | None:
+    """Describes a precision policy for the checkpoint of a sweep, so that a sweep resumed with another policy starts over.
+
+    The description is the qualified name of the policy and the values it closes over, e.g. the precisions
+    and bounds of a `flat_region_policy`.
+    """
+    if policy is None:
+        return None
+    captured = [repr(cell.cell_contents) for cell in getattr(policy, "__closure__", None) or ()]
+    return f"{getattr(policy, '__module__', '')}.{getattr(policy, '__qualname__', repr(policy))}({', '.join(captured)})"
+
+def flat_region_policy(flat: modest.Precision, *, low: float = 0.01, high: float = 0.99) -> PrecisionPolicy:
+    """Creates a precision policy that spends fewer runs where the curve is flat.
+
+    A block gets the `flat` precision if the last probability merged before it is at most `low` or at least
+    `high`. Blocks simulated before any probability is known keep the precision of the sweep.
+
+    Args:
+        flat (modest.Precision): The precision of blocks in a flat region of the curve.
+        low (float, optional): Probabilities up to this are considered flat near 0. Defaults to 0.01.
+        high (float, optional): Probabilities from this on are considered flat near 1. Defaults to 0.99.
+
+    Returns:
+        PrecisionPolicy: The policy to pass to `simulate`.
+    """
+    def policy(lower: int, upper: int, probs: list[tuple[int, float]]) -> modest.Precision | None:
+        if not probs:
+            return None
+        last = probs[-1][1]
+        return flat if last <= low or last >= high else None
+
+    return policy
+
+def balanced_blocks(clk_upper: int, block_size: int, stride: int = 1, workers: int = 1) -> list[tuple[int, int]]:
+    """Plans the blocks of a sweep over [0, clk_upper] with nearly equal numbers of properties.
+
+    Args:
+        clk_upper (int): The upper bound of the clock cycle.
+        block_size (int): The largest number of clock cycles in a block (already multiplied by the stride).
+        stride (int, optional): The stride for the clock cycle. Defaults to 1.
+        workers (int, optional): The number of worker processes. There are at least this many blocks, if there
+            are enough properties, so that every worker has a block. Defaults to 1.
+
+    Returns:
+        list[tuple[int, int]]: The (lower, upper) bounds of each block, in clock order.
+    """
+    properties = clk_upper // stride + 1
+    blocks = max(math.ceil(properties / max(block_size // stride, 1)), min(workers, properties))
+    per_block = math.ceil(properties / blocks)
+
+    # Adjacent blocks must touch, since the blocks are merged back in clock order
+    return [(first * stride, min((first + per_block) * stride - 1, clk_upper))
+            for first in range(0, properties, per_block)]
+
+def tuned_blocks(tuner: BlockSizeTuner, clk_upper: int | None, stride: int = 1, workers: int = 1,
+                 remaining: Callable[[int], int | None] = lambda clk: None) -> Iterator[tuple[int, int]]:
+    """Generates clock cycle windows whose sizes are chosen by a block size tuner.
+
+    Windows are created as they are needed, so the tuner can pick the size of each window from the runs
+    measured so far.
+
+    Args:
+        tuner (BlockSizeTuner): Chooses the number of properties of each window.
+        clk_upper (int | None): The upper bound of the clock cycle. If None, the windows never end.
+        stride (int, optional): The stride for the clock cycle. Defaults to 1.
+        workers (int, optional): The number of worker processes. Defaults to 1.
+        remaining (Callable[[int], int | None], optional): Estimates the number of properties left in the sweep
+            from the next clock cycle, or returns None if it can't. Defaults to unknown.
+
+    Yields:
+        tuple[int, int]: The (lower, upper) bounds of each window, in clock order.
+    """
+    clk = 0
+    while clk_upper is None or clk <= clk_upper:
+        lower = clk
+        upper = clk + tuner.next_size(remaining(clk), workers) * stride - 1
+
+        if clk_upper is not None and upper > clk_upper:
+            upper = clk_upper
+
+        yield lower, upper
+        clk = upper + 1
+
+def find_saturation(probe: Callable[[int], float], *, stride: int = 1, start: int = 64, limit: int = 1 << 20) -> int | None:
+    """Finds the first clock cycle at which a probability that is monotone in the clock cycle saturates.
+
+    The clock bound is doubled until the probability saturates, and the saturation cycle is then located by
+    a binary search between the last two bounds. This takes about 2 log2(k) probes for a saturation cycle k.
+
+    Args:
+        probe (Callable[[int], float]): Returns the probability at a clock cycle.
+        stride (int, optional): Only multiples of the stride are probed. Defaults to 1.
+        start (int, optional): The first clock cycle probed. Defaults to 64.
+        limit (int, optional): Give up once the probability hasn't saturated by this clock cycle. Defaults to 2^20.
+
+    Returns:
+        int | None: The first multiple of the stride at which the probability saturates, or None if it doesn't
+            saturate by `limit`.
+    """
+    # Search over the index of the multiple of the stride
+    last = limit // stride
+    low = -1
+    high = min(max(start // stride, 1), last)
+
+    # Exponential search for a saturated bound
+    while probe(high * stride) < SATURATION_PROBABILITY:
+        if high == last:
+            return None
+        low, high = high, min(high * 2, last)
+
+    # Binary search for the first saturated bound
+    while high - low > 1:
+        middle = (low + high) // 2
+        if probe(middle * stride) >= SATURATION_PROBABILITY:
+            high = middle
+        else:
+            low = middle
+
+    return high * stride
+
+# Lower clock cycle of the earliest block known to be saturated, shared with the worker processes.
+# Workers kill their Modest run if their block starts after it.
+_saturated_from = None
+
+def _init_worker(saturated_from):
+    """Initializes a worker process of the block process pool."""
+    global _saturated_from
+    _saturated_from = saturated_from
+
+def _is_past(saturated_from, lower: int) -> bool:
+    """Returns True if the block starting at `lower` comes after the saturated block recorded in `saturated_from`."""
+    return saturated_from is not None and 0 <= saturated_from.value < lower
+
+def _is_past_saturation(lower: int) -> bool:
+    """Returns True if, in a worker process, the block starting at `lower` is no longer needed."""
+    return _is_past(_saturated_from, lower)
+
+def _simulate_block(lower: int, upper: int, *, model: str | Path, constants: dict[str, int] | None = None,
+                    cache: ResultCache | None = None, refresh_cache: bool = False, stream: bool = False,
+                    precision: modest.Precision | None = None, timeout: float | None = None, max_memory: float | None = None,
+                    replicas: int = 1, delay: float = 0.0) -> tuple[int, int, modest.RunResult]:
+    """Simulates the properties of a single clock cycle block.
+
+    This is the unit of work handed to the process pool, so it must stay a module level function.
+
+    Returns:
+        tuple[int, int, modest.RunResult]: The block bounds and the Modest run. Its output is None if the run
+            failed or was cancelled.
+    """
+    # Back off before a retry
+    if delay:
+        time.sleep(delay)
+        if _is_past_saturation(lower):
+            return lower, upper, modest.RunResult(None, killed=modest.KILLED_CANCELLED)
+
+    if replicas > 1:
+        result = modest.simulate_replicas(model, replicas, cancel=lambda: _is_past_saturation(lower), cache=cache, refresh=refresh_cache,
+                                          constants=constants, precision=precision, timeout=timeout, max_memory=max_memory)
+        return lower, upper, result
+
+    if not stream:
+        result = modest.simulate_run(model, cancel=lambda: _is_past_saturation(lower), cache=cache, refresh=refresh_cache, constants=constants,
+                                     precision=precision, timeout=timeout, max_memory=max_memory)
+        return lower, upper, result
+
+    # Stop as soon as the block saturates, or once an earlier block has saturated
+    def stop(clk: int, probability: float) -> bool:
+        return probability >= SATURATION_PROBABILITY or _is_past_saturation(lower)
+
+    results = modest.simulate_stream(model, stop=stop, cache=cache, refresh=refresh_cache, constants=constants, precision=precision,
+                                     timeout=timeout, max_memory=max_memory)
+    for clk, probability in results:
+        print(f"    [progress]: block ({lower},{upper}) clock cycle {clk}: P = {probability:.3f}")
+
+    if results.stopped and _is_past_saturation(lower):
+        results.result.output = None
+
+    return lower, upper, results.result
+
+def _run_blocks(windows: Iterator[tuple[int, int]], block_args: Callable[[int, int], dict], merge: Callable[[int, int, modest.RunResult], bool],
+                saturates: Callable[[int, int, str], bool], workers: int = 1, memory_budget: MemoryBudget | None = None, kind: Hashable = None,
+                retry: RetryPolicy = RetryPolicy(), restored: dict[int, tuple[int, modest.RunResult]] | None = None,
+                save: Callable[[int, int, modest.RunResult], None] | None = None):
+    """Simulates clock cycle blocks until the windows run out or a merged block saturates.
+
+    Args:
+        windows (Iterator[tuple[int, int]]): The (lower, upper) windows to simulate, in clock order.
+        block_args (Callable[[int, int], dict]): Returns the keyword arguments of `_simulate_block` for a window.
+        merge (Callable[[int, int, modest.RunResult], bool]): Called with each finished block in clock order, including
+            blocks that failed every attempt. Returns True once the sweep has saturated, which ends it.
+        saturates (Callable[[int, int, str], bool]): Returns True if the output of a block saturates the curve.
+            Used to cancel later blocks before the blocks in front of them have been merged.
+        workers (int, optional): The number of worker processes. Defaults to 1.
+        memory_budget (MemoryBudget | None, optional): If set, a block only starts once its projected memory fits
+            in the budget. Defaults to None.
+        kind (Hashable, optional): The kind of run used to estimate the memory of a block. Defaults to None.
+        retry (RetryPolicy, optional): How often a failed block is retried. Defaults to RetryPolicy().
+        restored (dict[int, tuple[int, modest.RunResult]] | None, optional): Blocks finished by an earlier sweep,
+            by their lower bound. They are merged without simulating them again. Defaults to None.
+        save (Callable[[int, int, modest.RunResult], None] | None, optional): Called with each block that simulated
+            successfully as soon as it finishes, before the blocks in front of it are merged. Not called for restored
+            blocks. Defaults to None.
+    """
+    # Only blocks with the same bounds can be restored, the block layout may differ between sweeps
+    restored = dict(restored or {})
+    restored_lowers = set()
+
+    def restore(lower: int) -> modest.RunResult:
+        restored_lowers.add(lower)
+        return restored.pop(lower)[1]
+
+    def is_restored(lower: int, upper: int) -> bool:
+        return lower in restored and restored[lower][0] == upper
+
+    def run(lower: int, upper: int) -> modest.RunResult:
+        if memory_budget is None:
+            return _simulate_block(lower, upper, **block_args(lower, upper))[2]
+
+        with memory_budget.reserve(kind):
+            result = _simulate_block(lower, upper, **block_args(lower, upper))[2]
+        memory_budget.record(kind, result)
+        return result
+
+    if workers == 1:
+        for lower, upper in windows:
+            if is_restored(lower, upper):
+                if merge(lower, upper, restore(lower)):
+                    break
+                continue
+
+            result = run(lower, upper)
+
+            for attempt in range(1, retry.attempts):
+                if result.failure is None:
+                    break
+                delay = retry.delay(attempt)
+                print(f"Clock cycle block ({lower},{upper}) failed to simulate: {result.failure}... Retrying in {delay:g} s...")
+                time.sleep(delay)
+                result = run(lower, upper)
+
+            if save is not None and result.failure is None and result.output is not None:
+                save(lower, upper, result)
+            if merge(lower, upper, result):
+                break
+        return
+
+    saturated_from = multiprocessing.Value("q", -1)
+    pending = {}
+    tokens = {}
+    attempts = {}
+    finished = {}
+    next_lower = None
+    saturated = False
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(saturated_from,)) as executor:
+        def submit(window: tuple[int, int]) -> bool:
+            """Starts a block if it fits in the memory budget. Returns False if it doesn't."""
+            if memory_budget is not None:
+                # Only wait for memory when none of our own blocks would free some up
+                token = memory_budget.try_admit(kind) if pending else memory_budget.admit(kind)
+                if token is None:
+                    return False
+
+            retries = attempts.get(window[0], 0)
+            delay = retry.delay(retries) if retries else 0.0
+            future = executor.submit(_simulate_block, *window, **block_args(*window), delay=delay)
+            pending[future] = window
+            if memory_budget is not None:
+                tokens[future] = token
+            return True
+
+        def finish(lower: int, upper: int, result: modest.RunResult):
+            """Queues a finished block for merging."""
+            finished[lower] = (upper, result)
+            if save is not None and result.failure is None and result.output is not None and lower not in restored_lowers:
+                save(lower, upper, result)
+
+            # Every later block is saturated as well, since the probability is monotone in the bound
+            if result.failure is None and saturates(lower, upper, result.output) and not _is_past(saturated_from, lower):
+                saturated_from.value = lower
+                for other, (other_lower, _) in pending.items():
+                    if other_lower > lower:
+                        other.cancel()
+
+        # Blocks that failed or did not fit in the memory budget, in clock order
+        backlog = []
+
+        def refill():
+            """Starts blocks until every worker is busy, but never past a saturated block."""
+            nonlocal next_lower
+            while not saturated and len(pending) < workers:
+                window = backlog.pop(0) if backlog else next(windows, None)
+                if window is None or _is_past(saturated_from, window[0]):
+                    break
+                if next_lower is None:
+                    next_lower = window[0]
+
+                # Restored blocks don't need a worker
+                if is_restored(*window):
+                    finish(*window, restore(window[0]))
+                    continue
+
+                if not submit(window):
+                    backlog.insert(0, window)
+                    break
+
+        while True:
+            refill()
+
+            # Merge the finished blocks back in clock order
+            while next_lower in finished and not saturated:
+                upper, result = finished.pop(next_lower)
+                saturated = merge(next_lower, upper, result)
+                next_lower = upper + 1
+
+            if saturated or not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                lower, upper = pending.pop(future)
+                if memory_budget is not None:
+                    memory_budget.release(tokens.pop(future))
+                if future.cancelled():
+                    continue
+
+                _, _, result = future.result()
+                if memory_budget is not None:
+                    memory_budget.record(kind, result)
+
+                if result.failure is not None:
+                    if _is_past(saturated_from, lower):
+                        continue
+
+                    attempts[lower] = attempts.get(lower, 0) + 1
+                    if attempts[lower] < retry.attempts:
+                        print(f"Clock cycle block ({lower},{upper}) failed to simulate: {result.failure}... "
+                              f"Retrying in {retry.delay(attempts[lower]):g} s...")
+                        backlog.append((lower, upper))
+                        backlog.sort()
+                        continue
+
+                finish(lower, upper, result)
+
+        # Stop whatever is still running. Those blocks are past the saturation point.
+        if next_lower is not None:
+            saturated_from.value = next_lower - 1
+        executor.shutdown(wait=True, cancel_futures=True)
+
+        if memory_budget is not None:
+            for token in tokens.values():
+                memory_budget.release(token)
+
+def refinement_points(probs: list[tuple[int, float]], tolerance: float, skip: set[int] = frozenset()) -> list[int]:
+    """Finds the clock cycles that refine a sampled curve where it is steep.
+
+    Args:
+        probs (list[tuple[int, float]]): The sampled (clock cycle, probability) pairs, in clock order.
+        tolerance (float): The largest difference between the probabilities of adjacent samples that needs no refinement.
+        skip (set[int], optional): Clock cycles that must not be sampled, e.g. because they failed to simulate.
+
+    Returns:
+        list[int]: The midpoint of every interval between adjacent samples whose probabilities differ by more than
+            `tolerance`, in clock order.
+    """
+    clks = []
+    for (clk_a, p_a), (clk_b, p_b) in itertools.pairwise(probs):
+        midpoint = (clk_a + clk_b) // 2
+        if clk_b - clk_a > 1 and abs(p_b - p_a) > tolerance and midpoint not in skip:
+            clks.append(midpoint)
+    return clks
+
+def _simulate_points(chunks: list[list[int]], block_args: Callable[[list[int]], dict], workers: int = 1,
+                     retry: RetryPolicy = RetryPolicy(), memory_budget: MemoryBudget | None = None, kind: Hashable = None,
+                     restored: dict[int, tuple[int, modest.RunResult]] | None = None,
+                     save: Callable[[int, int, modest.RunResult], None] | None = None) -> list[tuple[list[int], modest.RunResult]]:
+    """Simulates blocks of arbitrary clock cycles, retrying the blocks that fail.
+
+    Args:
+        chunks (list[list[int]]): The clock cycles of each block.
+        block_args (Callable[[list[int]], dict]): Returns the keyword arguments of `_simulate_block` for a block.
+        workers (int, optional): The number of worker processes. Defaults to 1.
+        retry (RetryPolicy, optional): How often a failed block is retried. Defaults to RetryPolicy().
+        memory_budget (MemoryBudget | None, optional): If set, a block only starts once its projected memory fits
+            in the budget. Defaults to None.
+        kind (Hashable, optional): The kind of run used to estimate the memory of a block. Defaults to None.
+        restored (dict[int, tuple[int, modest.RunResult]] | None, optional): Blocks finished by an earlier sweep, by
+            their first clock cycle. A block with the same first and last clock cycle isn't simulated again.
+            Defaults to None.
+        save (Callable[[int, int, modest.RunResult], None] | None, optional): Called with the first and last clock
+            cycle and the run of each block that simulated successfully, as soon as it finishes. Defaults to None.
+
+    Returns:
+        list[tuple[list[int], modest.RunResult]]: The clock cycles and Modest run of each block. Blocks that failed
+            every attempt are included with their last run.
+    """
+    restored = restored or {}
+    results = {i: restored[chunk[0]][1] for i, chunk in enumerate(chunks)
+               if chunk[0] in restored and restored[chunk[0]][0] == chunk[-1]}
+    remaining = [i for i in range(len(chunks)) if i not in results]
+
+    def finish(i: int, result: modest.RunResult):
+        results[i] = result
+        if memory_budget is not None:
+            memory_budget.record(kind, result)
+        if save is not None and result.failure is None:
+            save(chunks[i][0], chunks[i][-1], result)
+
+    with contextlib.ExitStack() as stack:
+        executor = None
+        if workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                               initargs=(multiprocessing.Value("q", -1),)))
+
+        for attempt in range(retry.attempts):
+            if not remaining:
+                break
+            if attempt:
+                print(f"{len(remaining)} clock cycle blocks failed to simulate... Retrying in {retry.delay(attempt):g} s...")
+                time.sleep(retry.delay(attempt))
+
+            if executor is None:
+                for i in remaining:
+                    if memory_budget is None:
+                        finish(i, _simulate_block(chunks[i][0], chunks[i][-1], **block_args(chunks[i]))[2])
+                        continue
+                    with memory_budget.reserve(kind):
+                        result = _simulate_block(chunks[i][0], chunks[i][-1], **block_args(chunks[i]))[2]
+                    finish(i, result)
+            else:
+                waiting = list(remaining)
+                pending = {}
+                while waiting or pending:
+                    while waiting:
+                        token = None
+                        if memory_budget is not None:
+                            # Only wait for memory when none of our own blocks would free some up
+                            token = memory_budget.try_admit(kind) if pending else memory_budget.admit(kind)
+                            if token is None:
+                                break
+                        i = waiting.pop(0)
+                        pending[executor.submit(_simulate_block, chunks[i][0], chunks[i][-1], **block_args(chunks[i]))] = (i, token)
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        i, token = pending.pop(future)
+                        if token is not None:
+                            memory_budget.release(token)
+                        finish(i, future.result()[2])
+
+            remaining = [i for i in remaining if results[i].failure is not None]
+
+    return [(chunks[i], results[i]) for i in range(len(chunks))]
+
+def _search_saturation(noc: Noc, ptype: PropertyType, *, stride: int, generate_flits: str | None, parametric: bool,
+                       block_kwargs: dict, retry: RetryPolicy) -> int:
+    """Locates the saturation cycle of a curve with single property models."""
+    with contextlib.ExitStack() as stack:
+        # A parametric model with a single property serves every probe
+        model = None
+        if parametric:
+            model = stack.enter_context(modest.workspace().model(
+                noc.iter_chunks(ptype, clk_low=0, clk_high=0, generate_flits=generate_flits, parametric=True)))
+
+        def probe(clk: int) -> float:
+            if parametric:
+                args = dict(model=model, constants=noc.parametric_constants(clk_low=clk), **block_kwargs)
+            else:
+                args = dict(model=noc.print(ptype, clks=[clk], generate_flits=generate_flits), **block_kwargs)
+
+            [(_, result)] = _simulate_points([[clk]], lambda chunk: args, retry=retry)
+            if result.failure is not None:
+                raise RuntimeError(f"The saturation search failed to simulate clock cycle {clk}: {result.failure}")
+
+            probability = max(p for _, p in parse_probabilities(result.output, clk_low=clk))
+            print(f"  [search]: clock cycle {clk}: P = {probability:.5f}")
+            return probability
+
+        k_sat = find_saturation(probe, stride=stride)
+
+    if k_sat is None:
+        raise RuntimeError("The probability did not saturate within the search limit")
+
+    return k_sat
+
+def simulate(*, result_path: Path = Path("results"), size: int, ptype: PropertyType, clk_upper: int | None, threshold: int = 1, stride : int = 1, block_size : int | None = 50, generate_flits: str | None = None, workers: int = 1,
+             cache: ResultCache | None = None, refresh_cache: bool = False, stream: bool = False, parametric: bool = True,
+             memory_budget: MemoryBudget | None = None, precision: modest.Precision | None = None,
+             precision_policy: PrecisionPolicy | None = None, timeout: float | None = None, max_memory: float | None = None,
+             retry: RetryPolicy = RetryPolicy(), max_consecutive_failures: int = 3, resume: bool = True,
+             adaptive_tolerance: float | None = None, search_saturation: bool = False, noc_options: dict | None = None,
+             replicas: int = 1, rare_event: float | None = None):
     """Runs a simulation for a given NoC configuration, calculates probabilities, and saves the results.
 
     Args:
@@ -50,81 +617,302 @@ def simulate(*, result_path: Path = Path("results"), size: int, ptype: PropertyT
         clk_upper (int | None): The upper bound of the clock cycle to check.
         threshold (int, optional): The noise threshold. Defaults to 1.
         stride (int, optional): The stride for the clock cycle. Defaults to 1.
-        block_size (int, optional): The block size for the properties. Defaults to 50.
+        block_size (int | None, optional): The block size for the properties. If None, the block size is tuned
+            automatically (see `BlockSizeTuner`): the first blocks measure the fixed and per property cost of a
+            Modest run, and the rest of the sweep uses the block size that minimizes the projected total time.
+            The chosen size is recorded in the timing file. Defaults to 50.
         generate_flits (str | None, optional): A custom Modest process definition for flit generation. Defaults to None.
+        workers (int, optional): The number of worker processes simulating clock cycle blocks at the
+            same time. Results are merged back in clock order. Defaults to 1.
+        cache (ResultCache | None, optional): A cache of Modest results. Blocks whose model is unchanged
+            since a previous sweep are read from it instead of simulated. Defaults to None.
+        refresh_cache (bool, optional): Simulate every block again and overwrite the cached results. Defaults to False.
+        stream (bool, optional): Read each property's probability while Modest is still running, print it as
+            progress, and kill Modest as soon as the probability saturates. Defaults to False.
+        parametric (bool, optional): Generate the model once with the threshold and clock bounds left open,
+            and set them for each block with Modest's constant definitions, instead of generating and writing
+            a new model for every block. Defaults to True.
+        memory_budget (MemoryBudget | None, optional): Only start a block while the projected peak memory of
+            the running blocks fits in this budget. The budget can be shared between sweeps. Defaults to None.
+        precision (modest.Precision | None, optional): The precision of the estimated probabilities.
+            Defaults to Modest's defaults.
+        precision_policy (PrecisionPolicy | None, optional): Called before each block is simulated with its
+            bounds and the probabilities merged so far. The precision it returns replaces `precision` for that
+            block, e.g. to spend fewer runs where the curve is flat (see `flat_region_policy`). Defaults to None.
+        timeout (float | None, optional): Seconds after which the Modest run of a block is killed. Defaults to None.
+        max_memory (float | None, optional): Resident memory in MB above which the Modest run of a block is killed.
+            Defaults to None.
+        retry (RetryPolicy, optional): How often and after what delay a failed block is retried. A block that
+            fails every attempt is skipped and reported as a gap in the timing file. Defaults to RetryPolicy().
+        max_consecutive_failures (int, optional): End the sweep after this many blocks in a row failed every
+            attempt. Defaults to 3.
+        resume (bool, optional): Every finished block is checkpointed next to the results. If True, blocks
+            checkpointed by an interrupted sweep with the same parameters are not simulated again. If False,
+            the checkpoint is discarded and the sweep starts over. Defaults to True.
+        adaptive_tolerance (float | None, optional): Sample the curve adaptively. The sweep with `stride` becomes
+            a coarse pass, after which the midpoint of every interval whose end probabilities differ by more than
+            this tolerance is simulated, recursively, until no interval needs refining. Should be well above the
+            half-width of the estimates. If None, only the sweep with `stride` is run. Defaults to None.
+        search_saturation (bool, optional): If `clk_upper` is None, locate the saturation cycle first with an
+            exponential and then binary search over single property models (see `find_saturation`). The sweep
+            then covers exactly the clock cycles up to it, in blocks planned up front. Defaults to False.
+        noc_options (dict | None, optional): Further keyword arguments of `Noc`, e.g. `buffer_size`. Defaults to None.
+        replicas (int, optional): Split the runs of every block across this many Modest processes with distinct seeds
+            and a fixed share of the runs, and pool their counts (see `modest.simulate_replicas`). Speeds up blocks
+            too large to split further, e.g. the single block of an 8x8 sweep. Can't be combined with `stream`.
+            Defaults to 1.
+        rare_event (float | None, optional): Estimate the probabilities by importance splitting, with the noise
+            counters as the level function (see `Noc.level_function`), to this relative half-width instead of an
+            absolute one. Resolves the tiny probabilities of high thresholds and early clock cycles. Unless
+            `precision` sets `max_runs`, each property is capped at `RARE_EVENT_MAX_RUNS`. The splitting, width
+            and cap also apply to the precisions of `precision_policy`. Can't be combined with `replicas`.
+            Defaults to None.
 
     Returns:
         list: A list of probabilities for each clock cycle.
     """
+    assert workers >= 1, "At least one worker is required"
+    assert replicas == 1 or not stream, "Replicated blocks can't be streamed"
+    assert replicas == 1 or rare_event is None, "Splitting estimates can't be pooled across replicas"
+
     # Create result directory
     result_path.mkdir(parents=True, exist_ok=True)
     
     # Initialize the NoC
-    noc = Noc(size, resistive_noise_threshold=threshold, inductive_noise_threshold=threshold)
+    noc = Noc(size, resistive_noise_threshold=threshold, inductive_noise_threshold=threshold, **(noc_options or {}))
+
+    # A relative half-width is only reachable by splitting, since plain Monte Carlo rarely sees the event at all
+    def with_rare_event(block_precision: modest.Precision) -> modest.Precision:
+        return dataclasses.replace(block_precision, width=rare_event, relative_width=True, splitting=modest.SPLITTING_RESTART,
+                                   importance_function=noc.level_function(ptype),
+                                   max_runs=block_precision.max_runs if block_precision.max_runs is not None else RARE_EVENT_MAX_RUNS)
+
+    if rare_event is not None:
+        precision = with_rare_event(precision or modest.Precision())
 
     # Print starting message
     output_str = f"Simulation parameters:\n"
+    output_str += f"  Engine: {ENGINE_SIMULATION}\n"
     output_str += f"  Size: {noc.dimension}x{noc.dimension}\n"
     output_str += f"  Noise Type: {ptype.name}\n"
     output_str += f"  Clock Upper Bound: {clk_upper}\n"
     output_str += f"  Threshold: {threshold}\n"
     output_str += f"  Stride: {stride}\n"
-    output_str += f"  Block Size: {block_size}\n"
+    output_str += f"  Block Size: {'auto' if block_size is None else block_size}\n"
+    output_str += f"  Workers: {workers}\n"
+    output_str += f"  Parametric Model: {parametric}\n"
+    output_str += f"  Precision: {precision}\n"
+    output_str += f"  Timeout: {timeout}\n"
+    output_str += f"  Retry: {retry}\n"
+    output_str += f"  Adaptive Tolerance: {adaptive_tolerance}\n"
+    output_str += f"  NoC Options: {noc_options}\n"
+    output_str += f"  Replicas: {replicas}\n"
     print(output_str, end="")
     print(f"\nStarting {noc.dimension}x{noc.dimension} {ptype.name} simulation...")
 
     # Initialize variables
-    clk = 0
     probs = []
+    policy_precision = {}
+    failed_blocks = []
+    consecutive_failures = 0
 
     # The block size is how many properties to count at once. If we have a stride > 1 then
     # we need to multiply the block size by the stride to get the the correct number of 
     # properties tested at a single time
-    block_size *= stride
+    tuner = None
+    if block_size is None:
+        tuner = BlockSizeTuner()
+        block_size_name = "auto"
+    else:
+        properties_per_block = block_size
+        block_size *= stride
+        block_size_name = block_size
+    stem = f"noc_{noc.dimension}x{noc.dimension}_{ptype.name.lower()}_noise_threshold_{threshold}_stride_{stride}_block_size_{block_size_name}"
+    if adaptive_tolerance is not None:
+        stem += f"_adaptive_{adaptive_tolerance:g}"
+    if rare_event is not None:
+        stem += f"_rare_event_{rare_event:g}"
 
-    # Start the sim counter
-    start_time = time.time()
+    # Locate the saturation cycle first, instead of walking block by block until the curve saturates
+    sweep_upper = clk_upper
+    if search_saturation and clk_upper is None:
+        sweep_upper = _search_saturation(noc, ptype, stride=stride, generate_flits=generate_flits, parametric=parametric,
+                                         block_kwargs=dict(cache=cache, refresh_cache=refresh_cache, precision=precision,
+                                                           timeout=timeout, max_memory=max_memory), retry=retry)
+        print(f"  [info]: saturates at clock cycle {sweep_upper}")
+        output_str += f"\n[search]: saturates at clock cycle {sweep_upper}\n"
 
-    # Simulation
-    while clk_upper is None or clk <= clk_upper:
-        lower = clk 
-        upper = clk + block_size - 1 
+    def remaining_properties(clk: int) -> int | None:
+        """Estimates the properties left in the sweep, extrapolating the curve linearly if it has no end."""
+        if sweep_upper is not None:
+            return max(sweep_upper - clk, 0) // stride + 1
+        pmax = max((p for _, p in probs), default=0.0)
+        if pmax <= 0:
+            return None
+        return max(round(len(probs) * (1 - pmax) / pmax), 1)
 
-        if clk_upper is not None and upper > clk_upper:
-            upper = clk_upper
-            
-        sim_output = modest.simulate(noc.print(ptype, clk_low=lower, clk_high=upper, stride=stride, generate_flits=generate_flits))
-        
-        if sim_output is None:
-            print(f"Clock cycle block ({lower},{upper}) failed to simulate... Skipping analysis...")
-            continue
-        
-        new_probs = parse_probabilities(sim_output)
-        clk += block_size
+    if tuner is not None:
+        windows = tuned_blocks(tuner, sweep_upper, stride, workers, remaining_properties)
+    elif sweep_upper != clk_upper:
+        # The end of the sweep is known, so plan the blocks up front
+        windows = balanced_blocks(sweep_upper, block_size, stride, workers)
+        print(f"  [info]: planned {len(windows)} blocks")
+        windows = iter(windows)
+    else:
+        windows = clock_blocks(clk_upper, block_size)
+
+    # Restore the blocks of an interrupted sweep
+    checkpoint = BlockCheckpoint(result_path / f"{stem}.blocks", {
+        "size": size, "ptype": ptype.name, "clk_upper": clk_upper, "threshold": threshold, "stride": stride,
+        "block_size": block_size_name, "generate_flits": generate_flits, "parametric": parametric,
+        "precision": None if precision is None else dataclasses.asdict(precision), "modest": modest.modest_identity(),
+        "noc_options": noc_options, "replicas": replicas, "precision_policy": describe_policy(precision_policy),
+        "search_saturation": search_saturation, "timeout": timeout, "max_memory": max_memory,
+    })
+    if not resume:
+        checkpoint.clear()
+    restored, restored_time = checkpoint.load()
+    if restored:
+        print(f"  [info]: resuming from {len(restored)} checkpointed clock cycle blocks")
+
+    # Start the sim counter, including the time spent before the sweep was interrupted
+    start_time = time.time() - restored_time
+
+    def merge_block(lower: int, upper: int, result: modest.RunResult) -> bool:
+        """Adds a finished block to the results. Returns True once the probability has saturated."""
+        nonlocal output_str, consecutive_failures
+
+        if result.failure is not None:
+            failed_blocks.append((lower, upper, result.failure))
+            consecutive_failures += 1
+            print(f"  [warning]: clock cycle block ({lower},{upper}) failed to simulate: {result.failure}. Skipping it...")
+            output_str += f"\n[failed]: block ({lower},{upper}) {result.failure} ({format_resources(result)})\n"
 
-        probs += new_probs
+            if consecutive_failures >= max_consecutive_failures:
+                print(f"  [error]: {consecutive_failures} blocks in a row failed to simulate. Ending the sweep...")
+                return True
+            return False
+
+        consecutive_failures = 0
+        if tuner is not None and not result.cached:
+            tuner.record(len(range(lower, upper + 1, stride)), result.wall_time)
+
+        sim_output = result.output
+        new_probs = parse_probabilities(sim_output, clk_low=lower, stride=stride)
+        probs.extend(new_probs)
         pmax = max(probs, key=lambda x: x[1])[1]
 
         print(f"  [info]: finished clock cycle block ({lower},{upper}). P: [", end="")        
-        print(*[f"{p[1]:.3f}" for p in probs[lower:lower+3]], sep=", ", end="")
+        print(*[f"{p[1]:.3f}" for p in new_probs[:3]], sep=", ", end="")
         print("...", end="")        
         print(*[f"{p[1]:.3f}" for p in probs[-3:]], sep=", ", end="")
         print(f"]. Pmax: {pmax:.3f}")
 
         output_str += f"\n{sim_output}\n"
+        output_str += f"[resources]: block ({lower},{upper}) {format_resources(result)}\n"
+        if lower in policy_precision:
+            output_str += f"[precision]: block ({lower},{upper}) {policy_precision.pop(lower)}\n"
+        if rare_event is not None:
+            output_str += f"[rare-event]: block ({lower},{upper}) {format_error_bounds(sim_output)}\n"
+
+        return pmax >= SATURATION_PROBABILITY
+
+    def block_saturates(lower: int, upper: int, sim_output: str) -> bool:
+        block_probs = parse_probabilities(sim_output, clk_low=lower, stride=stride)
+        return bool(block_probs) and max(p[1] for p in block_probs) >= SATURATION_PROBABILITY
+
+    def save_block(lower: int, upper: int, result: modest.RunResult):
+        checkpoint.save(lower, upper, result, time.time() - start_time)
+
+    with contextlib.ExitStack() as model_files:
+        # A parametric model only depends on the number of properties in a block, so a sweep needs
+        # at most two of them (the last block may be shorter). Their files are kept for the whole sweep.
+        parametric_models = {}
+
+        def block_args(lower: int, upper: int) -> dict:
+            block_precision = precision
+            if precision_policy is not None:
+                block_precision = precision_policy(lower, upper, probs)
+                # The policy can only change the runs of a rare-event sweep, never drop its splitting
+                if block_precision is not None and rare_event is not None:
+                    block_precision = with_rare_event(block_precision)
+                block_precision = policy_precision[lower] = block_precision or precision
+
+            if not parametric:
+                model = noc.print(ptype, clk_low=lower, clk_high=upper, stride=stride, generate_flits=generate_flits)
+                return dict(model=model, cache=cache, refresh_cache=refresh_cache, stream=stream,
+                            precision=block_precision, timeout=timeout, max_memory=max_memory, replicas=replicas)
+
+            slots = len(range(lower, upper + 1, stride))
+            if slots not in parametric_models:
+                model = noc.iter_chunks(ptype, clk_low=lower, clk_high=upper, stride=stride, generate_flits=generate_flits, parametric=True)
+                parametric_models[slots] = model_files.enter_context(modest.workspace().model(model))
+
+            return dict(model=parametric_models[slots], constants=noc.parametric_constants(clk_low=lower, stride=stride),
+                        cache=cache, refresh_cache=refresh_cache, stream=stream, precision=block_precision,
+                        timeout=timeout, max_memory=max_memory, replicas=replicas)
+
+        # Simulation
+        _run_blocks(windows, block_args, merge_block, block_saturates, workers,
+                    memory_budget=memory_budget, kind=("simulate", size), retry=retry, restored=restored, save=save_block)
+
+    # Record the block size the tuner chose
+    if tuner is not None:
+        properties_per_block = tuner.chosen or max(tuner.calibration_sizes)
+        model = tuner.fit()
+        tuned = f"Chosen block size: {properties_per_block} properties"
+        if model is not None:
+            tuned += f" (fixed cost per run {model[0]:.2f} s, cost per property {model[1]:.3f} s)"
+        print(f"  [info]: {tuned}")
+        output_str += f"\n[tuner]: {tuned}\n"
 
-        if pmax >= (1.0 - 1e-5):            
+    # Refine the coarse curve where it is steep. Explicit clock cycles need their own models.
+    failed_clks = set()
+    refinement_round = 0
+    while adaptive_tolerance is not None:
+        clks = refinement_points(probs, adaptive_tolerance, failed_clks)
+        if not clks:
             break
+
+        refinement_round += 1
+        print(f"  [info]: refinement round {refinement_round}: {len(clks)} clock cycles")
+
+        def refinement_args(chunk: list[int]) -> dict:
+            model = noc.print(ptype, clks=chunk, generate_flits=generate_flits)
+            return dict(model=model, cache=cache, refresh_cache=refresh_cache, precision=precision,
+                        timeout=timeout, max_memory=max_memory, replicas=replicas)
+
+        chunks = [clks[i:i + properties_per_block] for i in range(0, len(clks), properties_per_block)]
+        for chunk, result in _simulate_points(chunks, refinement_args, workers, retry, memory_budget=memory_budget,
+                                              kind=("simulate", size), restored=restored, save=save_block):
+            if result.failure is not None:
+                failed_clks.update(chunk)
+                failed_blocks.append((chunk[0], chunk[-1], result.failure))
+                output_str += f"\n[failed]: refinement {chunk} {result.failure} ({format_resources(result)})\n"
+                continue
+
+            probs.extend(parse_probabilities(result.output))
+            output_str += f"\n{result.output}\n"
+            output_str += f"[resources]: refinement {chunk} {format_resources(result)}\n"
+
+        probs.sort()
     
     # Timing
     end_time = time.time()
     elapsed_time = end_time - start_time
-    timing_file = result_path / Path(f"noc_{noc.dimension}x{noc.dimension}_{ptype.name.lower()}_noise_threshold_{threshold}_stride_{stride}_block_size_{block_size}.time.txt")
+    timing_file = result_path / Path(f"{stem}.time.txt")
     time_str = time_to_str(elapsed_time)
 
     # Print out the time string
     print(f"Simulation complete. Time elapsed: {time_str}\n")
 
+    # Report the clock cycles that are missing from the results
+    if failed_blocks:
+        print(f"Warning: {len(failed_blocks)} clock cycle blocks failed to simulate and are missing from the results.")
+        output_str += f"\nFailed blocks:\n"
+        for lower, upper, failure in failed_blocks:
+            output_str += f"  ({lower},{upper}): {failure}\n"
+
     # Write the output string to the output file
     output_str += f"\n"
     output_str += f"Total elapsed time: {time_str}\n"
@@ -132,14 +920,310 @@ def simulate(*, result_path: Path = Path("results"), size: int, ptype: PropertyT
         f.write(output_str)
 
     # Probabilities
-    filename = result_path / Path(f"noc_{noc.dimension}x{noc.dimension}_{ptype.name.lower()}_noise_threshold_{threshold}_stride_{stride}_block_size_{block_size}.csv")
+    filename = result_path / Path(f"{stem}.csv")
     with open(filename, "w", newline="") as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(["Clock Cycle", "Probability"])
         writer.writerows(probs)
 
+    # Keep the checkpoint of an incomplete sweep, so that running it again only simulates the failed blocks
+    if not failed_blocks:
+        checkpoint.clear()
+
     return probs 
 
+def simulate_fused(*, result_path: Path = Path("results"), size: int, ptype: PropertyType = PropertyType.BOTH_RI, thresholds: list[int],
+                   clk_upper: int | None, stride: int = 1, block_size: int = 50, generate_flits: str | None = None, workers: int = 1,
+                   cache: ResultCache | None = None, refresh_cache: bool = False, parametric: bool = True,
+                   memory_budget: MemoryBudget | None = None, precision: modest.Precision | None = None,
+                   precision_policy: PrecisionPolicy | None = None, timeout: float | None = None, max_memory: float | None = None,
+                   retry: RetryPolicy = RetryPolicy(), max_consecutive_failures: int = 3, resume: bool = True,
+                   noc_options: dict | None = None) -> dict[tuple[PropertyType, int], list[tuple[int, float]]]:
+    """Simulates the curves of several thresholds and both noise types in one sweep, and saves each curve.
+
+    Every block is a single Modest run over one model holding the properties of every curve, so the
+    simulation runs are shared instead of repeated once per threshold and noise type. A curve drops out
+    of the models once it saturates, and the sweep ends when every curve has saturated. The probabilities
+    are split into the same per-threshold CSV files `simulate` writes. The timing file is shared.
+
+    Args:
+        result_path (Path, optional): The path to the results directory. Defaults to Path("results").
+        size (int): The size of the NoC (size x size).
+        ptype (PropertyType, optional): RESISTIVE, INDUCTIVE, or BOTH_RI for both. Defaults to BOTH_RI.
+        thresholds (list[int]): The noise thresholds.
+        clk_upper (int | None): The upper bound of the clock cycle to check.
+        stride (int, optional): The stride for the clock cycle. Defaults to 1.
+        block_size (int, optional): The number of clock cycles per block. Defaults to 50.
+        generate_flits (str | None, optional): A custom Modest process definition for flit generation. Defaults to None.
+        workers (int, optional): The number of worker processes. Defaults to 1.
+        cache (ResultCache | None, optional): A cache of Modest results. Defaults to None.
+        refresh_cache (bool, optional): Simulate every block again and overwrite the cached results. Defaults to False.
+        parametric (bool, optional): Leave the clock bounds of the properties open, as in `simulate`. Defaults to True.
+        memory_budget (MemoryBudget | None, optional): Limits the blocks running at once by memory. Defaults to None.
+        precision (modest.Precision | None, optional): The precision of the estimated probabilities. Defaults to Modest's defaults.
+        precision_policy (PrecisionPolicy | None, optional): Called before each block with its bounds and the probabilities
+            of every active curve, as in `simulate`. Since the curves share the block, the precision it returns is only
+            used if it returns the same one for every active curve. Defaults to None.
+        timeout (float | None, optional): Seconds after which the Modest run of a block is killed. Defaults to None.
+        max_memory (float | None, optional): Resident memory in MB above which the Modest run of a block is killed.
+            Defaults to None.
+        retry (RetryPolicy, optional): How often and after what delay a failed block is retried. Defaults to RetryPolicy().
+        max_consecutive_failures (int, optional): End the sweep after this many blocks in a row failed every
+            attempt. Defaults to 3.
+        resume (bool, optional): Checkpoint every finished block and skip the blocks checkpointed by an interrupted
+            sweep with the same parameters, as in `simulate`. Defaults to True.
+        noc_options (dict | None, optional): Further keyword arguments of `Noc`, e.g. `buffer_size`. Defaults to None.
+
+    Returns:
+        dict[tuple[PropertyType, int], list[tuple[int, float]]]: The probabilities of each curve by noise type and threshold.
+    """
+    assert workers >= 1, "At least one worker is required"
+    assert ptype in (PropertyType.RESISTIVE, PropertyType.INDUCTIVE, PropertyType.BOTH_RI), "Only noise properties can be fused"
+
+    result_path.mkdir(parents=True, exist_ok=True)
+    noc = Noc(size, **(noc_options or {}))
+
+    noise_types = {"resistive": PropertyType.RESISTIVE, "inductive": PropertyType.INDUCTIVE}
+    curves = {(noise, threshold): [] for noise, noise_type in noise_types.items()
+              if ptype in (noise_type, PropertyType.BOTH_RI) for threshold in thresholds}
+    active = set(curves)
+
+    output_str = f"Simulation parameters:\n"
+    output_str += f"  Engine: {ENGINE_SIMULATION}\n"
+    output_str += f"  Size: {noc.dimension}x{noc.dimension}\n"
+    output_str += f"  Noise Type: {ptype.name}\n"
+    output_str += f"  Clock Upper Bound: {clk_upper}\n"
+    output_str += f"  Thresholds: {thresholds}\n"
+    output_str += f"  Stride: {stride}\n"
+    output_str += f"  Block Size: {block_size}\n"
+    output_str += f"  Workers: {workers}\n"
+    output_str += f"  Parametric Model: {parametric}\n"
+    output_str += f"  Precision: {precision}\n"
+    output_str += f"  Timeout: {timeout}\n"
+    output_str += f"  Retry: {retry}\n"
+    output_str += f"  NoC Options: {noc_options}\n"
+    print(output_str, end="")
+    print(f"\nStarting fused {noc.dimension}x{noc.dimension} {ptype.name} simulation of {len(curves)} curves...")
+
+    block_size *= stride
+    policy_precision = {}
+    failed_blocks = []
+    consecutive_failures = 0
+    stem = f"noc_{noc.dimension}x{noc.dimension}_fused_{ptype.name.lower()}_stride_{stride}_block_size_{block_size}"
+
+    # Restore the blocks of an interrupted sweep. Every block holds the properties of the curves that
+    # were active when it started, and merging it only reads the curves that are still active.
+    checkpoint = BlockCheckpoint(result_path / f"{stem}.blocks", {
+        "size": size, "ptype": ptype.name, "thresholds": list(thresholds), "clk_upper": clk_upper, "stride": stride,
+        "block_size": block_size, "generate_flits": generate_flits, "parametric": parametric,
+        "precision": None if precision is None else dataclasses.asdict(precision), "modest": modest.modest_identity(),
+        "noc_options": noc_options, "precision_policy": describe_policy(precision_policy),
+        "timeout": timeout, "max_memory": max_memory,
+    })
+    if not resume:
+        checkpoint.clear()
+    restored, restored_time = checkpoint.load()
+    if restored:
+        print(f"  [info]: resuming from {len(restored)} checkpointed clock cycle blocks")
+
+    start_time = time.time() - restored_time
+
+    def model_ptype(keys: set[tuple[str, int]]) -> PropertyType:
+        noises = {noise for noise, _ in keys}
+        return PropertyType.BOTH_RI if len(noises) == 2 else noise_types[noises.pop()]
+
+    def merge_block(lower: int, upper: int, result: modest.RunResult) -> bool:
+        """Adds a finished block to the curves that are still active. Returns True once every curve has saturated."""
+        nonlocal output_str, consecutive_failures
+
+        if result.failure is not None:
+            failed_blocks.append((lower, upper, result.failure))
+            consecutive_failures += 1
+            print(f"  [warning]: clock cycle block ({lower},{upper}) failed to simulate: {result.failure}. Skipping it...")
+            output_str += f"\n[failed]: block ({lower},{upper}) {result.failure} ({format_resources(result)})\n"
+            return consecutive_failures >= max_consecutive_failures
+
+        consecutive_failures = 0
+        block_curves = parse_fused_probabilities(result.output, clk_low=lower, stride=stride)
+        for key in sorted(active):
+            if key not in block_curves:
+                continue
+            curves[key].extend(block_curves[key])
+            if max(p for _, p in curves[key]) >= SATURATION_PROBABILITY:
+                active.discard(key)
+                print(f"  [info]: {key[0]} noise threshold {key[1]} saturated in clock cycle block ({lower},{upper})")
+
+        print(f"  [info]: finished clock cycle block ({lower},{upper}). Active curves: {len(active)}")
+        output_str += f"\n{result.output}\n"
+        output_str += f"[resources]: block ({lower},{upper}) {format_resources(result)}\n"
+        if lower in policy_precision:
+            output_str += f"[precision]: block ({lower},{upper}) {policy_precision.pop(lower)}\n"
+
+        return not active
+
+    def block_saturates(lower: int, upper: int, sim_output: str) -> bool:
+        block_curves = parse_fused_probabilities(sim_output, clk_low=lower, stride=stride)
+        return all(key in block_curves and max(p for _, p in block_curves[key]) >= SATURATION_PROBABILITY for key in active)
+
+    def save_block(lower: int, upper: int, result: modest.RunResult):
+        checkpoint.save(lower, upper, result, time.time() - start_time)
+
+    def block_precision(lower: int, upper: int, keys: set[tuple[str, int]]) -> modest.Precision | None:
+        """Asks the precision policy for every active curve, and only changes the precision if they all agree."""
+        if precision_policy is None:
+            return precision
+        choices = {precision_policy(lower, upper, curves[key]) for key in keys}
+        chosen = choices.pop() if len(choices) == 1 else None
+        policy_precision[lower] = chosen or precision
+        return policy_precision[lower]
+
+    with contextlib.ExitStack() as model_files:
+        # The models only depend on the number of properties and on the curves that are still active
+        parametric_models = {}
+
+        def block_args(lower: int, upper: int) -> dict:
+            keys = set(active)
+            block_ptype = model_ptype(keys)
+            block_thresholds = sorted({threshold for _, threshold in keys})
+            kwargs = dict(cache=cache, refresh_cache=refresh_cache, precision=block_precision(lower, upper, keys),
+                          timeout=timeout, max_memory=max_memory)
+
+            if not parametric:
+                model = noc.print(block_ptype, clk_low=lower, clk_high=upper, stride=stride, generate_flits=generate_flits,
+                                  thresholds=block_thresholds)
+                return dict(model=model, **kwargs)
+
+            slots = len(range(lower, upper + 1, stride))
+            key = (slots, block_ptype, tuple(block_thresholds))
+            if key not in parametric_models:
+                model = noc.iter_chunks(block_ptype, clk_low=lower, clk_high=upper, stride=stride, generate_flits=generate_flits,
+                                        parametric=True, thresholds=block_thresholds)
+                parametric_models[key] = model_files.enter_context(modest.workspace().model(model))
+
+            return dict(model=parametric_models[key], constants=noc.parametric_constants(clk_low=lower, stride=stride), **kwargs)
+
+        _run_blocks(clock_blocks(clk_upper, block_size), block_args, merge_block, block_saturates, workers,
+                    memory_budget=memory_budget, kind=("simulate", size), retry=retry, restored=restored, save=save_block)
+
+    elapsed_time = time.time() - start_time
+    time_str = time_to_str(elapsed_time)
+    print(f"Simulation complete. Time elapsed: {time_str}\n")
+
+    if failed_blocks:
+        print(f"Warning: {len(failed_blocks)} clock cycle blocks failed to simulate and are missing from the results.")
+        output_str += f"\nFailed blocks:\n"
+        for lower, upper, failure in failed_blocks:
+            output_str += f"  ({lower},{upper}): {failure}\n"
+
+    output_str += f"\n"
+    output_str += f"Total elapsed time: {time_str}\n"
+    timing_file = result_path / Path(f"{stem}.time.txt")
+    with open(timing_file, "w") as f:
+        f.write(output_str)
+
+    # Split the curves into the files `simulate` would have written for each of them
+    results = {}
+    for (noise, threshold), probs in curves.items():
+        filename = result_path / Path(f"noc_{noc.dimension}x{noc.dimension}_{noise}_noise_threshold_{threshold}_stride_{stride}_block_size_{block_size}.csv")
+        with open(filename, "w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["Clock Cycle", "Probability"])
+            writer.writerows(probs)
+        results[(noise_types[noise], threshold)] = probs
+
+    # Keep the checkpoint of an incomplete sweep, so that running it again only simulates the failed blocks
+    if not failed_blocks:
+        checkpoint.clear()
+
+    return results
+
+def check_curve(*, result_path: Path = Path("results"), size: int, ptype: PropertyType, clk_upper: int | None, threshold: int = 1,
+                stride: int = 1, block_size: int = 50, generate_flits: str | None = None, cache: ResultCache | None = None,
+                refresh_cache: bool = False, timeout: float | None = None, max_memory: float | None = None,
+                noc_options: dict | None = None) -> list[tuple[int, float]]:
+    """Computes a PSN curve exactly with Modest's model checker instead of estimating it, and saves the results.
+
+    The blocks are checked one after another, since the model checker holds the whole state space in memory.
+    The files are named like those of `simulate` with an `_exact` suffix, and the timing file records the engine.
+    The noise counters of the model are unbounded unless `noc_options` sets `bounded_counters`, without which
+    the state space of the noise properties is infinite.
+
+    Args:
+        result_path (Path, optional): The path to the results directory. Defaults to Path("results").
+        size (int): The size of the NoC (size x size).
+        ptype (PropertyType): The type of property to check (e.g., RESISTIVE, INDUCTIVE).
+        clk_upper (int | None): The upper bound of the clock cycle to check. If None, blocks are checked until
+            the curve saturates.
+        threshold (int, optional): The noise threshold. Defaults to 1.
+        stride (int, optional): The stride for the clock cycle. Defaults to 1.
+        block_size (int, optional): The number of properties checked at once. Defaults to 50.
+        generate_flits (str | None, optional): A custom Modest process definition for flit generation. Defaults to None.
+        cache (ResultCache | None, optional): A cache of Modest results. Defaults to None.
+        refresh_cache (bool, optional): Check every block again and overwrite the cached results. Defaults to False.
+        timeout (float | None, optional): Seconds after which the check of a block is killed. Defaults to None.
+        max_memory (float | None, optional): Resident memory in MB above which the check of a block is killed.
+            Defaults to None.
+        noc_options (dict | None, optional): Further keyword arguments of `Noc`, e.g. `buffer_size`. Defaults to None.
+
+    Returns:
+        list[tuple[int, float]]: The probability of each clock cycle. The curve ends early if a block failed.
+    """
+    result_path.mkdir(parents=True, exist_ok=True)
+    noc = Noc(size, resistive_noise_threshold=threshold, inductive_noise_threshold=threshold, **(noc_options or {}))
+
+    output_str = f"Model checking parameters:\n"
+    output_str += f"  Engine: {ENGINE_EXACT}\n"
+    output_str += f"  Size: {noc.dimension}x{noc.dimension}\n"
+    output_str += f"  Noise Type: {ptype.name}\n"
+    output_str += f"  Clock Upper Bound: {clk_upper}\n"
+    output_str += f"  Threshold: {threshold}\n"
+    output_str += f"  Stride: {stride}\n"
+    output_str += f"  Block Size: {block_size}\n"
+    output_str += f"  NoC Options: {noc_options}\n"
+    print(output_str, end="")
+    print(f"\nChecking {noc.dimension}x{noc.dimension} {ptype.name} exactly...")
+
+    probs = []
+    start_time = time.time()
+
+    with contextlib.ExitStack() as model_files:
+        models = {}
+        for lower, upper in clock_blocks(clk_upper, block_size * stride):
+            slots = len(range(lower, upper + 1, stride))
+            if slots not in models:
+                model = noc.iter_chunks(ptype, clk_low=lower, clk_high=upper, stride=stride, generate_flits=generate_flits, parametric=True)
+                models[slots] = model_files.enter_context(modest.workspace().model(model))
+
+            result = modest.check_run(models[slots], cache=cache, refresh=refresh_cache, timeout=timeout, max_memory=max_memory,
+                                      constants=noc.parametric_constants(clk_low=lower, stride=stride))
+            if result.failure is not None:
+                print(f"  [warning]: clock cycle block ({lower},{upper}) failed to check: {result.failure}. Ending the curve...")
+                output_str += f"\n[failed]: block ({lower},{upper}) {result.failure} ({format_resources(result)})\n"
+                break
+
+            new_probs = parse_probabilities(result.output, clk_low=lower, stride=stride)
+            probs.extend(new_probs)
+            print(f"  [info]: checked clock cycle block ({lower},{upper}). Pmax: {max((p for _, p in probs), default=0.0):.3f}")
+            output_str += f"\n{result.output}\n"
+            output_str += f"[resources]: block ({lower},{upper}) {format_resources(result)}\n"
+
+            if new_probs and max(p for _, p in new_probs) >= SATURATION_PROBABILITY:
+                break
+
+    time_str = time_to_str(time.time() - start_time)
+    print(f"Model checking complete. Time elapsed: {time_str}\n")
+    output_str += f"\nTotal elapsed time: {time_str}\n"
+
+    stem = f"noc_{noc.dimension}x{noc.dimension}_{ptype.name.lower()}_noise_threshold_{threshold}_stride_{stride}_block_size_{block_size * stride}_exact"
+    with open(result_path / Path(f"{stem}.time.txt"), "w") as f:
+        f.write(output_str)
+    with open(result_path / Path(f"{stem}.csv"), "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Clock Cycle", "Probability"])
+        writer.writerows(probs)
+
+    return probs
+
 @time_func
 def noc_2x2_resistive():
     """Runs a set of 2x2 resistive simulations."""
@@ -201,6 +1285,11 @@ def noc_8x8_inductive():
     simulate(size=8, result_path=Path("results/8x8"), ptype=PropertyType.INDUCTIVE, threshold=10, clk_upper=40, stride=1)
     simulate(size=8, result_path=Path("results/8x8"), ptype=PropertyType.INDUCTIVE, threshold=20, clk_upper=40, stride=1)
 
+@time_func
+def noc_2x2_fused():
+    """Runs every 2x2 resistive and inductive threshold in one fused sweep."""
+    simulate_fused(size=2, result_path=Path("results/2x2_fused"), ptype=PropertyType.BOTH_RI, thresholds=[1, 5, 10, 20], clk_upper=None, stride=1)
+
 if __name__ == "__main__":
     # Check to make sure that this script was called from above the tools directory
     if Path.cwd().name == "tools":
@@ -217,4 +1306,7 @@ if __name__ == "__main__":
     noc_2x2_inductive()
     noc_3x3_inductive()
     noc_4x4_inductive()
-    noc_8x8_inductive()
\ No newline at end of file
+    noc_8x8_inductive()
+
+    # Fused Simulations
+    noc_2x2_fused()
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""A persistent, content-addressed cache of Modest results."""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from probabilities import parse_probabilities
+
+
+def default_cache_path() -> Path:
+    """Returns the default directory of the result cache.
+
+    Returns:
+        Path: $XDG_CACHE_HOME/modest_noc, or ~/.cache/modest_noc if XDG_CACHE_HOME is not set.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    if cache_home:
+        return Path(cache_home) / "modest_noc"
+    return Path.home() / ".cache" / "modest_noc"
+
+
+@dataclass
+class CacheEntry:
+    """A cached Modest result.
+
+    Attributes:
+        output (str): The raw Modest output.
+        probabilities (list[tuple[int, float]]): The probabilities parsed from the output.
+    """
+    output: str
+    probabilities: list[tuple[int, float]]
+
+
+class ResultCache:
+    """An on-disk cache of Modest results keyed by the model text, Modest version, command and options.
+
+    Every entry is a single JSON file. Reading an entry marks it as recently used, and the least
+    recently used entries are evicted whenever the cache grows past `max_bytes`. The cache is safe
+    to share between processes, since entries are written atomically.
+    """
+
+    def __init__(self, path: Path | None = None, *, max_bytes: int = 1 << 30):
+        """Initializes the cache.
+
+        Args:
+            path (Path | None, optional): The cache directory. Defaults to `default_cache_path()`.
+            max_bytes (int, optional): The maximum total size of all entries. Defaults to 1 GiB.
+        """
+        self.path: Path = path if path is not None else default_cache_path()
+        self.max_bytes: int = max_bytes
+
+    @staticmethod
+    def key(model: str, *parts: str) -> str:
+        """Calculates the key of an entry.
+
+        Args:
+            model (str): The text of the model.
+            *parts (str): Everything else that affects the result, e.g. the Modest version, command and options.
+
+        Returns:
+            str: The hex digest identifying the entry.
+        """
+        digest = hashlib.sha256(model.encode("utf-8"))
+        for part in parts:
+            # Separate the parts so that ("ab", "c") and ("a", "bc") differ
+            digest.update(b"\0" + part.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.path / f"{key}.json"
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Looks up an entry and marks it as recently used.
+
+        Args:
+            key (str): The key returned by `key`.
+
+        Returns:
+            CacheEntry | None: The entry, or None if it is not cached.
+        """
+        entry_path = self._entry_path(key)
+
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entry = CacheEntry(
+                output=data["output"],
+                probabilities=[(int(clk), float(p)) for clk, p in data["probabilities"]],
+            )
+            os.utime(entry_path)
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError):
+            # A corrupt entry is a miss, and is removed so that it is stored again
+            entry_path.unlink(missing_ok=True)
+            return None
+
+        return entry
+
+    def put(self, key: str, output: str, probabilities: list[tuple[int, float]] | None = None) -> CacheEntry:
+        """Stores the output of a Modest run, evicting old entries if the cache is full.
+
+        Args:
+            key (str): The key returned by `key`.
+            output (str): The raw Modest output.
+            probabilities (list[tuple[int, float]] | None, optional): The probabilities parsed from the output.
+                Defaults to parsing them with `parse_probabilities`.
+
+        Returns:
+            CacheEntry: The stored entry.
+        """
+        if probabilities is None:
+            probabilities = parse_probabilities(output)
+
+        entry = CacheEntry(output=output, probabilities=probabilities)
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"output": entry.output, "probabilities": entry.probabilities, "created": time.time()}, f)
+        os.replace(tmp_name, self._entry_path(key))
+
+        self.evict()
+
+        return entry
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits in `max_bytes`."""
+        entries = []
+        for entry_path in self.path.glob("*.json"):
+            try:
+                stat = entry_path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            entry_path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """Removes every entry from the cache."""
+        for entry_path in self.path.glob("*.json"):
+            entry_path.unlink(missing_ok=True)
@@ -0,0 +1,258 @@
+"""Admission control, retry policies and block size tuning for Modest runs."""
+import contextlib
+import itertools
+import math
+import threading
+from dataclasses import dataclass
+from typing import Hashable, Iterator
+
+from modest import RunResult
+
+
+class MemoryBudget:
+    """Admits new Modest runs only while their projected memory use fits in a budget.
+
+    The footprint of a run is estimated from the largest peak memory measured for previous runs of
+    the same kind (e.g. the engine and mesh size). Until a run of that kind has been measured, its entry
+    in `defaults` is used, or `default_estimate_mb` if it has none. A measurement replaces the default,
+    even if it is lower. A run is always admitted when nothing else is running, so a single run
+    larger than the budget can still make progress.
+
+    The budget is thread-safe and can be shared by several sweeps running in the same process.
+    """
+
+    def __init__(self, budget_mb: float, *, default_estimate_mb: float = 600.0):
+        """Initializes the budget.
+
+        Args:
+            budget_mb (float): The memory available to Modest runs in MB.
+            default_estimate_mb (float, optional): The footprint assumed for a kind of run that has not been
+                measured yet, in MB. Defaults to 600 MB, slightly above an 8x8 simulation.
+        """
+        self.budget_mb: float = budget_mb
+        self.default_estimate_mb: float = default_estimate_mb
+        self.measured: dict[Hashable, float] = {}
+        self.defaults: dict[Hashable, float] = {}
+        self._running: dict[int, float] = {}
+        self._tokens = itertools.count()
+        self._condition = threading.Condition()
+
+    def estimate(self, kind: Hashable) -> float:
+        """Returns the projected peak memory of a run of the given kind in MB."""
+        with self._condition:
+            return self._estimate(kind)
+
+    def _estimate(self, kind: Hashable) -> float:
+        if kind in self.measured:
+            return self.measured[kind]
+        return self.defaults.get(kind, self.default_estimate_mb)
+
+    def record(self, kind: Hashable, result: RunResult):
+        """Updates the estimate for a kind of run with the memory a finished run used.
+
+        Args:
+            kind (Hashable): The kind of the run.
+            result (RunResult): The finished run.
+        """
+        if result.cached or result.memory <= 0:
+            return
+
+        with self._condition:
+            self.measured[kind] = max(self.measured.get(kind, 0.0), result.memory)
+
+    @property
+    def in_use(self) -> float:
+        """The projected memory of every admitted run that has not been released, in MB."""
+        with self._condition:
+            return sum(self._running.values())
+
+    def try_admit(self, kind: Hashable, count: int = 1) -> int | None:
+        """Admits a run if its projected memory fits in the remaining budget.
+
+        Args:
+            kind (Hashable): The kind of the run.
+            count (int, optional): The number of runs of this kind admitted together, e.g. by a job that runs
+                them in parallel. They are released together. Defaults to 1.
+
+        Returns:
+            int | None: A token to pass to `release` once the run finishes, or None if the run doesn't fit.
+        """
+        with self._condition:
+            estimate = self._estimate(kind) * count
+            if self._running and sum(self._running.values()) + estimate > self.budget_mb:
+                return None
+
+            token = next(self._tokens)
+            self._running[token] = estimate
+            return token
+
+    def admit(self, kind: Hashable, count: int = 1) -> int:
+        """Waits until a run fits in the budget and admits it.
+
+        Args:
+            kind (Hashable): The kind of the run.
+            count (int, optional): The number of runs of this kind admitted together. Defaults to 1.
+
+        Returns:
+            int: A token to pass to `release` once the run finishes.
+        """
+        with self._condition:
+            while True:
+                token = self.try_admit(kind, count)
+                if token is not None:
+                    return token
+                self._condition.wait()
+
+    def release(self, token: int):
+        """Releases the memory reserved for an admitted run.
+
+        Args:
+            token (int): The token returned by `try_admit` or `admit`.
+        """
+        with self._condition:
+            self._running.pop(token, None)
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def reserve(self, kind: Hashable) -> Iterator[int]:
+        """Context manager that admits a run for the duration of the block.
+
+        Args:
+            kind (Hashable): The kind of the run.
+
+        Yields:
+            int: The admission token.
+        """
+        token = self.admit(kind)
+        try:
+            yield token
+        finally:
+            self.release(token)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and how patiently a failed Modest run is retried.
+
+    Attributes:
+        attempts (int): The most times a run is attempted, including the first attempt.
+        initial_delay (float): Seconds to wait before the first retry.
+        backoff (float): Factor the delay grows by after every retry.
+        max_delay (float): The longest delay between two attempts in seconds.
+    """
+    attempts: int = 3
+    initial_delay: float = 5.0
+    backoff: float = 2.0
+    max_delay: float = 300.0
+
+    def delay(self, retry: int) -> float:
+        """Returns the seconds to wait before a retry.
+
+        Args:
+            retry (int): The number of the retry, starting at 1 for the second attempt.
+
+        Returns:
+            float: The delay before the retry.
+        """
+        return min(self.initial_delay * self.backoff ** (retry - 1), self.max_delay)
+
+
+class BlockSizeTuner:
+    """Chooses how many properties to simulate per Modest run from measured run times.
+
+    The wall time of a run is modelled as `a + b * n` for `n` properties, where `a` is the fixed cost
+    of a run (process start, model compilation and warm-up) and `b` the cost of a property. The first
+    blocks alternate between the calibration sizes. Once runs of two different sizes are measured, the
+    model is fitted by least squares and the size minimizing the projected total time is chosen.
+
+    Sweeping `K` properties in blocks of `n` costs `(K / n) * a + K * b` for the runs, plus about
+    `n / 2 * b` of properties simulated past the end of the curve, which is minimal at
+    `n = sqrt(2 * K * a / b)`.
+    """
+
+    def __init__(self, calibration_sizes: tuple[int, ...] = (8, 32), *, min_size: int = 1, max_size: int = 1000,
+                 default_remaining: int = 1000):
+        """Initializes the tuner.
+
+        Args:
+            calibration_sizes (tuple[int, ...], optional): The numbers of properties of the calibration blocks. Must
+                contain at least two different sizes. Defaults to (8, 32).
+            min_size (int, optional): The smallest number of properties chosen. Defaults to 1.
+            max_size (int, optional): The largest number of properties chosen. Defaults to 1000.
+            default_remaining (int, optional): The number of remaining properties assumed when the caller can't
+                estimate it. Defaults to 1000.
+        """
+        assert len(set(calibration_sizes)) >= 2, "At least two different calibration sizes are required"
+
+        self.calibration_sizes: tuple[int, ...] = calibration_sizes
+        self.min_size: int = min_size
+        self.max_size: int = max_size
+        self.default_remaining: int = default_remaining
+        self.measurements: list[tuple[int, float]] = []
+        self.chosen: int | None = None
+        self._requested = 0
+
+    def record(self, properties: int, wall_time: float):
+        """Records the wall time of a run.
+
+        Args:
+            properties (int): The number of properties of the run.
+            wall_time (float): The wall time of the run in seconds.
+        """
+        self.measurements.append((properties, wall_time))
+
+    def fit(self) -> tuple[float, float] | None:
+        """Fits the cost model to the measurements.
+
+        Returns:
+            tuple[float, float] | None: The fixed cost `a` and the cost per property `b` in seconds, or None
+                if fewer than two different sizes were measured.
+        """
+        if len({n for n, _ in self.measurements}) < 2:
+            return None
+
+        count = len(self.measurements)
+        mean_n = sum(n for n, _ in self.measurements) / count
+        mean_t = sum(t for _, t in self.measurements) / count
+        covariance = sum((n - mean_n) * (t - mean_t) for n, t in self.measurements)
+        variance = sum((n - mean_n) ** 2 for n, _ in self.measurements)
+
+        b = covariance / variance
+        a = mean_t - b * mean_n
+        return a, b
+
+    def next_size(self, remaining: int | None = None, workers: int = 1) -> int:
+        """Returns the number of properties of the next block.
+
+        Args:
+            remaining (int | None, optional): The estimated number of properties left in the sweep, or None if
+                unknown. Defaults to None.
+            workers (int, optional): The number of blocks simulated at the same time. The size is capped so that
+                every worker gets a block. Defaults to 1.
+
+        Returns:
+            int: The number of properties.
+        """
+        if self.chosen is not None:
+            return self.chosen
+
+        model = self.fit()
+        if model is None:
+            size = self.calibration_sizes[self._requested % len(self.calibration_sizes)]
+            self._requested += 1
+            return size
+
+        a, b = model
+        if remaining is None:
+            remaining = self.default_remaining
+
+        if b <= 0:
+            size = self.max_size
+        elif a <= 0:
+            size = self.min_size
+        else:
+            size = round(math.sqrt(2 * remaining * a / b))
+
+        size = min(size, max(remaining // workers, 1))
+        self.chosen = max(self.min_size, min(size, self.max_size))
+        return self.chosen
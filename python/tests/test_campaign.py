@@ -0,0 +1,64 @@
+import pytest
+
+from campaign import DEFAULT_DURATION_S, PAPER_CAMPAIGN, Job, estimate_duration, expand
+from noc import PropertyType
+
+
+def test_expand_covers_every_combination(tmp_path):
+    spec = {
+        "result_path": str(tmp_path),
+        "defaults": {"workers": 4, "block_size": 20},
+        "experiments": [
+            {"sizes": [2, 3], "noise": ["resistive", "inductive"], "thresholds": [1, 5], "strides": [1, 2],
+             "options": {"block_size": 10}, "noc": {"buffer_encoding": "array"}},
+            {"sizes": [8], "noise": ["inductive"], "thresholds": [1, 10], "strides": {"1": 3, "10": 9}, "clk_upper": 40,
+             "result_path": str(tmp_path / "big")},
+        ],
+    }
+    jobs = expand(spec)
+
+    assert len(jobs) == 2 * 2 * 2 * 2 + 2
+    first = [job for job in jobs if job.size in (2, 3)]
+    assert {(job.size, job.ptype, job.threshold, job.stride) for job in first} == {
+        (size, ptype, threshold, stride) for size in (2, 3) for ptype in (PropertyType.RESISTIVE, PropertyType.INDUCTIVE)
+        for threshold in (1, 5) for stride in (1, 2)}
+    assert all(job.options == {"workers": 4, "block_size": 10} for job in first)
+    assert all(job.noc_options == {"buffer_encoding": "array"} for job in first)
+    assert all(job.result_path == tmp_path / f"{job.size}x{job.size}" and job.clk_upper is None for job in first)
+
+    big = [job for job in jobs if job.size == 8]
+    assert [(job.threshold, job.stride, job.clk_upper) for job in big] == [(1, 3, 40), (10, 9, 40)]
+    assert all(job.options == {"workers": 4, "block_size": 20} and job.result_path == tmp_path / "big" for job in big)
+
+
+def test_paper_campaign_matches_the_paper_sweeps():
+    jobs = expand(PAPER_CAMPAIGN)
+    assert len(jobs) == 4 + 3 + 2 * 4 + 2 * 3 + 4 + 4
+    strides = {(job.size, job.ptype, job.threshold): job.stride for job in jobs}
+    assert strides[(2, PropertyType.RESISTIVE, 20)] == 7
+    assert strides[(2, PropertyType.INDUCTIVE, 10)] == 36
+    assert strides[(4, PropertyType.INDUCTIVE, 5)] == 2
+
+
+def job(tmp_path, size: int, threshold: int = 5, stride: int = 1) -> Job:
+    return Job(size=size, ptype=PropertyType.RESISTIVE, threshold=threshold, stride=stride, clk_upper=None, result_path=tmp_path)
+
+
+def test_estimate_prefers_the_timing_file_of_an_earlier_run(tmp_path):
+    timing = tmp_path / "noc_3x3_resistive_noise_threshold_5_stride_1_block_size_50.time.txt"
+    timing.write_text("Simulation parameters:\n...\nTotal elapsed time: 01:02:03.50\n")
+
+    assert estimate_duration(job(tmp_path, 3)) == 3723.5
+    # Other thresholds and strides have timing files of their own
+    assert estimate_duration(job(tmp_path, 3, threshold=10)) == DEFAULT_DURATION_S[3]
+    assert estimate_duration(job(tmp_path, 3, stride=2)) == DEFAULT_DURATION_S[3]
+
+
+def test_estimate_falls_back_to_the_size(tmp_path):
+    (tmp_path / "noc_2x2_resistive_noise_threshold_5_stride_1_block_size_50.time.txt").write_text("interrupted\n")
+    assert estimate_duration(job(tmp_path, 2)) == DEFAULT_DURATION_S[2]
+
+    # Unknown sizes scale with the fourth power of the size from the largest known one
+    largest = max(DEFAULT_DURATION_S)
+    assert estimate_duration(job(tmp_path, 2 * largest)) == pytest.approx(DEFAULT_DURATION_S[largest] * 16)
+    assert estimate_duration(job(tmp_path, 2 * largest)) > estimate_duration(job(tmp_path, largest))
@@ -0,0 +1,56 @@
+import json
+
+import modest
+from checkpoint import MANIFEST_NAME, BlockCheckpoint
+
+PARAMETERS = {"size": 2, "ptype": "RESISTIVE", "precision_policy": None, "timeout": 60.0}
+
+
+def result(lower: int) -> modest.RunResult:
+    return modest.RunResult(f"output of block {lower}", wall_time=1.5, max_rss=100.0, returncode=0)
+
+
+def test_saved_blocks_are_loaded(tmp_path):
+    checkpoint = BlockCheckpoint(tmp_path / "sweep.blocks", PARAMETERS)
+    assert checkpoint.load() == ({}, 0.0)
+
+    checkpoint.save(0, 9, result(0), 12.0)
+    checkpoint.save(10, 19, result(10), 20.0)
+
+    blocks, elapsed = BlockCheckpoint(tmp_path / "sweep.blocks", dict(PARAMETERS)).load()
+    assert blocks == {0: (9, result(0)), 10: (19, result(10))}
+    assert elapsed == 20.0
+
+
+def test_changed_parameters_discard_the_blocks(tmp_path):
+    path = tmp_path / "sweep.blocks"
+    checkpoint = BlockCheckpoint(path, PARAMETERS)
+    checkpoint.load()
+    checkpoint.save(0, 9, result(0), 12.0)
+
+    changed = BlockCheckpoint(path, {**PARAMETERS, "precision_policy": "flat_region_policy(...)"})
+    assert changed.load() == ({}, 0.0)
+    assert json.loads((path / MANIFEST_NAME).read_text()) == changed.parameters
+    assert not list(path.glob("block_*.json"))
+
+    # The original parameters don't bring the discarded blocks back
+    assert BlockCheckpoint(path, PARAMETERS).load() == ({}, 0.0)
+
+
+def test_corrupt_blocks_are_skipped(tmp_path):
+    checkpoint = BlockCheckpoint(tmp_path, PARAMETERS)
+    checkpoint.load()
+    checkpoint.save(0, 9, result(0), 12.0)
+    (tmp_path / "block_0000000010.json").write_text('{"lower": 10, "upp')
+
+    assert checkpoint.load() == ({0: (9, result(0))}, 12.0)
+
+
+def test_clear(tmp_path):
+    checkpoint = BlockCheckpoint(tmp_path / "sweep.blocks", PARAMETERS)
+    checkpoint.load()
+    checkpoint.save(0, 9, result(0), 12.0)
+    checkpoint.clear()
+
+    assert not (tmp_path / "sweep.blocks").exists()
+    assert checkpoint.load() == ({}, 0.0)
@@ -0,0 +1,60 @@
+import math
+import random
+
+import pytest
+
+from explore import DEFAULT_SPACE, GaussianProcess, latin_hypercube
+
+SPACE = {"buffer_size": (2, 8), "activity_thresh": (1, 5)}
+
+
+def curve(configuration: dict[str, int]) -> list[float]:
+    """A smooth stand-in for the probabilities of a configuration at two probe clock cycles."""
+    x = configuration["buffer_size"] / 8
+    y = configuration["activity_thresh"] / 5
+    return [0.5 + 0.3 * math.sin(3 * x) * y, 0.2 + 0.4 * x * x - 0.1 * y]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_gp_interpolates_its_training_points(seed):
+    rng = random.Random(seed)
+    configurations = latin_hypercube(SPACE, 8, rng)
+    gp = GaussianProcess(SPACE, noise=0.01)
+    gp.fit(configurations, [curve(c) for c in configurations])
+
+    for configuration in configurations:
+        means, std = gp.predict(configuration)
+        assert means == pytest.approx(curve(configuration), abs=3 * gp.noise)
+        assert std <= 2 * gp.noise
+
+
+def test_gp_is_uncertain_away_from_its_training_points():
+    configurations = [{"buffer_size": 2, "activity_thresh": 1}, {"buffer_size": 3, "activity_thresh": 1}]
+    gp = GaussianProcess(SPACE, noise=0.01)
+    gp.fit(configurations, [curve(c) for c in configurations])
+
+    far = {"buffer_size": 8, "activity_thresh": 5}
+    assert gp.information_gain(far) > gp.information_gain(configurations[0])
+
+
+@pytest.mark.parametrize("samples, per_stratum", [(4, 1), (4, 3), (5, 2), (10, 1)])
+def test_latin_hypercube_covers_every_stratum(samples, per_stratum):
+    # Every stratum of every parameter holds `per_stratum` values, so each must be sampled exactly once
+    space = {"a": (0, samples * per_stratum - 1), "b": (3, 3 + samples * per_stratum - 1)}
+    for seed in range(10):
+        design = latin_hypercube(space, samples, random.Random(seed))
+        assert len(design) == samples
+        for name, (low, high) in space.items():
+            assert sorted((c[name] - low) // per_stratum for c in design) == list(range(samples))
+            assert all(low <= c[name] <= high for c in design)
+
+
+@pytest.mark.parametrize("space", [
+    DEFAULT_SPACE,
+    {"injection_rate_numerator": (1, 10), "injection_rate_denominator": (2, 10)},
+    {"injection_rate_numerator": (5, 20), "injection_rate_denominator": (1, 8), "buffer_size": (2, 8)},
+])
+def test_latin_hypercube_keeps_the_injection_rate_at_most_one(space):
+    for seed in range(20):
+        for c in latin_hypercube(space, 12, random.Random(seed)):
+            assert c["injection_rate_numerator"] <= c["injection_rate_denominator"]
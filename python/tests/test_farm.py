@@ -0,0 +1,150 @@
+import socket
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import campaign
+import farm
+import modest
+from noc import PropertyType
+from scheduling import RetryPolicy
+
+MODEL = "// model\n"
+
+
+def modest_output(*probabilities: float) -> str:
+    """Canned output of a parametric block with one property per slot."""
+    return "".join(f"  + Property resistiveNoiseProbability1RewardBoundedSlot{slot}\n"
+                   f"    Estimated probability: {p}\n"
+                   f"    Runs used:             1000\n\n" for slot, p in enumerate(probabilities))
+
+
+def succeeded(*probabilities: float) -> modest.RunResult:
+    return modest.RunResult(modest_output(*probabilities), returncode=0)
+
+
+def failed() -> modest.RunResult:
+    return modest.RunResult(None, returncode=1)
+
+
+def coordinator(blocks: int, **kwargs) -> farm.Coordinator:
+    queue = farm.Coordinator(**kwargs)
+    for i in range(blocks):
+        queue.add_block(0, 10 * i, 10 * i + 9, 1, MODEL)
+    return queue
+
+
+def test_expired_lease_is_requeued():
+    queue = coordinator(2, lease_timeout=0.01, retry=RetryPolicy(attempts=2))
+    block = queue.pull("a")
+    time.sleep(0.02)
+
+    # The lost block goes back to the front of the queue
+    assert queue.pull("b").id == block.id
+    assert not queue.heartbeat(block.id, "a")
+    assert queue.heartbeat(block.id, "b")
+
+
+def test_lease_lost_on_last_attempt_is_a_result():
+    queue = coordinator(1, lease_timeout=0.01, retry=RetryPolicy(attempts=1))
+    block = queue.pull("a")
+    time.sleep(0.02)
+
+    assert queue.done
+    assert queue.results[block.id].killed == farm.KILLED_WORKER_LOST
+    assert queue.pull("b") is None
+
+
+def test_failed_block_is_retried():
+    queue = coordinator(1, retry=RetryPolicy(attempts=2))
+    block = queue.pull("a")
+    queue.complete(block.id, "a", failed())
+    assert block.id not in queue.results
+    assert not queue.done
+
+    block = queue.pull("b")
+    assert block.attempts == 2
+    queue.complete(block.id, "b", failed())
+    assert queue.results[block.id].failure is not None
+    assert queue.done
+
+
+def test_saturation_drops_later_blocks():
+    queue = coordinator(3)
+    first, second = queue.pull("a"), queue.pull("b")
+    queue.complete(first.id, "a", succeeded(0.5, 1.0))
+
+    # The waiting block is dropped, and the running one is told to stop
+    assert queue.pull("c") is None
+    assert not queue.heartbeat(second.id, "b")
+
+    queue.complete(second.id, "b", modest.RunResult(None, killed=modest.KILLED_CANCELLED))
+    assert queue.done
+    assert 2 not in queue.results
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def test_localhost_run(monkeypatch):
+    monkeypatch.setattr(farm, "POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(farm, "DONE_LINGER", 0.1)
+
+    def simulate_run(model, *, constants=None, **kwargs) -> modest.RunResult:
+        assert Path(model).read_text() == MODEL
+        return succeeded(constants["CLK_LOW"] / 100)
+
+    monkeypatch.setattr(modest, "simulate_run", simulate_run)
+
+    queue = farm.Coordinator()
+    for lower in (0, 10, 20):
+        queue.add_block(0, lower, lower + 9, 1, MODEL, constants={"CLK_LOW": lower})
+
+    port = free_port()
+    results = {}
+    server = threading.Thread(target=lambda: results.update(queue.serve("localhost", port)))
+    server.start()
+    farm.run_worker("localhost", port, worker_id="local", retry=RetryPolicy(attempts=20, initial_delay=0.05))
+    server.join(timeout=10)
+
+    assert not server.is_alive()
+    assert sorted(results) == [0, 1, 2]
+    assert results[2].output == modest_output(0.2)
+
+
+def test_farm_rejects_unsupported_options(tmp_path):
+    job = campaign.Job(2, PropertyType.RESISTIVE, 1, 1, 20, tmp_path, options={"block_size": 10, "workers": 4})
+    with pytest.raises(ValueError, match="workers"):
+        farm.farm_sweeps([job])
+
+
+def test_blocks_past_saturation_are_reported_as_skipped():
+    queue = coordinator(4, retry=RetryPolicy(attempts=1))
+    first, second, third = queue.pull("a"), queue.pull("b"), queue.pull("c")
+    queue.complete(third.id, "c", failed())
+    queue.complete(first.id, "a", succeeded(0.5, 1.0))
+    queue.complete(second.id, "b", modest.RunResult(None, killed=modest.KILLED_CANCELLED))
+    assert queue.done
+
+    probs, log = farm._collect_sweep(queue, queue.results, 0)
+    assert probs == [(0, 0.5), (1, 1.0)]
+    assert "[failed]" not in log
+    assert [line for line in log.splitlines() if line.startswith("[skipped]")] == [
+        f"[skipped]: block ({lower},{lower + 9}) past the saturation of the sweep" for lower in (10, 20, 30)]
+
+
+def test_failed_blocks_before_saturation_are_reported():
+    queue = coordinator(2, retry=RetryPolicy(attempts=1))
+    first, second = queue.pull("a"), queue.pull("b")
+    queue.complete(first.id, "a", failed())
+    queue.complete(second.id, "b", succeeded(0.25))
+
+    probs, log = farm._collect_sweep(queue, queue.results, 0)
+    assert probs == [(10, 0.25)]
+    assert "[failed]: block (0,9) exit code 1" in log
+    assert "[skipped]" not in log
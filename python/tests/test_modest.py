@@ -0,0 +1,242 @@
+import asyncio
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import modest
+from probabilities import parse_estimates, parse_probabilities
+
+
+def stub_simulate_run(monkeypatch, *, failing_seed: int | None = None) -> list[modest.Precision]:
+    """Answers each simulation with one success per four runs, and records the precision it ran with."""
+    calls = []
+
+    def simulate_run(model, *, precision=None, **kwargs):
+        calls.append(precision)
+        if precision.seed == failing_seed:
+            return modest.RunResult(None, wall_time=1.0, returncode=1)
+        output = (f"  + Property resistiveNoiseProbability1RewardBounded4\n"
+                  f"    Estimated probability: 0.25\n"
+                  f"    Runs used:             {precision.runs}\n\n")
+        return modest.RunResult(output, wall_time=precision.seed + 1.0, cpu_time=2.0, max_rss=10.0, returncode=0)
+
+    monkeypatch.setattr(modest, "simulate_run", simulate_run)
+    return calls
+
+
+def test_replicas_split_the_runs_and_pool_the_counts(monkeypatch):
+    calls = stub_simulate_run(monkeypatch)
+    result = modest.simulate_replicas("model", 4, precision=modest.Precision(runs=400, seed=10, max_runs=1000))
+
+    assert sorted(precision.seed for precision in calls) == [10, 11, 12, 13]
+    assert {(precision.runs, precision.max_runs) for precision in calls} == {(100, None)}
+
+    assert result.failure is None
+    assert parse_estimates(result.output)["resistiveNoiseProbability1RewardBounded4"].runs == 400
+    assert parse_probabilities(result.output) == [(4, 0.25)]
+    assert result.wall_time == 14.0
+    assert result.cpu_time == 8.0
+    assert result.max_rss == 40.0
+
+
+def test_replicas_share_the_required_runs(monkeypatch):
+    calls = stub_simulate_run(monkeypatch)
+    precision = modest.Precision(confidence=0.95, width=0.05)
+    modest.simulate_replicas("model", 3, precision=precision)
+
+    assert {call.runs for call in calls} == {-(-precision.required_runs() // 3)}
+    assert sorted(call.seed for call in calls) == [0, 1, 2]
+
+
+def test_replicas_fail_together(monkeypatch):
+    stub_simulate_run(monkeypatch, failing_seed=1)
+    result = modest.simulate_replicas("model", 2, precision=modest.Precision(runs=10))
+
+    assert result.output is None
+    assert result.returncode == 1
+    assert result.failure is not None
+
+
+def test_replicas_need_a_bounded_precision():
+    with pytest.raises(ValueError):
+        modest.simulate_replicas("model", 2, precision=modest.Precision(width=0.1, relative_width=True))
+
+
+def test_workspace_shares_identical_models(tmp_path):
+    with modest.ModelWorkspace(tmp_path) as workspace:
+        first = workspace.acquire("module m;\n")
+        second = workspace.acquire("module m;\n")
+        other = workspace.acquire("module other;\n")
+
+        assert first == second != other
+        assert sorted(workspace.path.iterdir()) == sorted([first, other])
+        assert first.read_text() == "module m;\n"
+        assert first.name[0].isalpha()
+
+        workspace.release(first)
+        assert first.exists()
+        workspace.release(second)
+        assert not first.exists()
+        assert other.exists()
+
+    assert not workspace.path.exists()
+
+
+def test_workspace_streams_chunked_models(tmp_path):
+    with modest.ModelWorkspace(tmp_path) as workspace:
+        with workspace.model("module m;\n") as path:
+            # A streamed copy of a model in use is discarded in favor of the existing file
+            with workspace.model(iter(["module ", "m;\n"])) as streamed:
+                assert streamed == path
+                assert [p.suffix for p in workspace.path.iterdir()] == [".modest"]
+            assert path.exists()
+        assert not path.exists()
+
+
+def test_workspace_discards_a_failed_stream(tmp_path):
+    def chunks():
+        yield "module m;\n"
+        raise RuntimeError("generation failed")
+
+    with modest.ModelWorkspace(tmp_path) as workspace:
+        with pytest.raises(RuntimeError):
+            workspace.acquire(chunks())
+        assert not list(workspace.path.iterdir())
+
+
+def stub_executable(tmp_path, monkeypatch, script: str) -> Path:
+    """Puts a `modest` shell script first on the PATH."""
+    bin_path = tmp_path / "bin"
+    bin_path.mkdir()
+    executable = bin_path / modest.MODEST_EXECUTABLE
+    executable.write_text(f"#!/bin/sh\n{script}")
+    executable.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_path}{os.pathsep}{os.environ['PATH']}")
+    return executable
+
+
+def max_overlap(log: Path) -> int:
+    """Returns the most runs that were in flight at once, from the start and end events they logged."""
+    running = peak = 0
+    for event in log.read_text().split():
+        running += 1 if event == "start" else -1
+        peak = max(peak, running)
+    return peak
+
+
+@pytest.mark.parametrize("limit", [1, 3])
+def test_async_runs_respect_the_concurrency_limit(tmp_path, monkeypatch, limit):
+    log = tmp_path / "runs.log"
+    stub_executable(tmp_path, monkeypatch, f"echo start >> {log}\nsleep 0.1\necho end >> {log}\necho \"$@\"\n")
+    monkeypatch.setattr(modest, "MAX_CONCURRENT_RUNS", modest.MAX_CONCURRENT_RUNS)
+    modest.set_max_concurrency(limit)
+
+    async def run_all() -> list[str]:
+        checks = [modest.check_async(tmp_path / f"check_{i}.modest") for i in range(4)]
+        simulations = [modest.simulate_async(tmp_path / f"simulate_{i}.modest") for i in range(4)]
+        return await asyncio.gather(*checks, *simulations)
+
+    outputs = asyncio.run(run_all())
+    assert [output.split()[0] for output in outputs] == ["check"] * 4 + ["simulate"] * 4
+    assert max_overlap(log) == limit
+
+
+def test_concurrency_limit_must_be_positive():
+    with pytest.raises(ValueError):
+        modest.set_max_concurrency(0)
+
+
+def test_stream_kills_modest_once_saturated(tmp_path, monkeypatch):
+    properties = "".join(f"echo '  + Property resistiveNoiseProbability1RewardBounded{clk}'\n"
+                         f"echo '    Estimated probability: {probability}'\n"
+                         for clk, probability in [(1, 0.5), (2, 0.995), (3, 1.0)])
+    # The last property would only be printed long after saturation
+    script = properties.replace("echo '  + Property resistiveNoiseProbability1RewardBounded3'", "sleep 30\necho '  + Property resistiveNoiseProbability1RewardBounded3'")
+    stub_executable(tmp_path, monkeypatch, script)
+
+    start = time.monotonic()
+    stream = modest.simulate_stream(tmp_path / "model.modest", stop=lambda clk, probability: probability >= 0.99)
+    assert list(stream) == [(1, 0.5), (2, 0.995)]
+
+    assert time.monotonic() - start < 10
+    assert stream.stopped
+    assert stream.result.returncode is None
+    assert stream.result.failure is None
+    assert "RewardBounded3" not in stream.output
+
+
+def test_stream_runs_to_the_end_without_saturation(tmp_path, monkeypatch):
+    stub_executable(tmp_path, monkeypatch, "echo '  + Property resistiveNoiseProbability1RewardBounded4'\n"
+                                           "echo '    Estimated probability: 0.25'\n")
+    stream = modest.simulate_stream(tmp_path / "model.modest", stop=lambda clk, probability: probability >= 0.99)
+
+    assert list(stream) == [(4, 0.25)]
+    assert not stream.stopped
+    assert stream.result.returncode == 0
+
+
+def test_run_resources_are_measured_with_wait4(tmp_path, monkeypatch):
+    # Hold 64 MB and burn some CPU time, then print and exit with an error
+    stub_executable(tmp_path, monkeypatch, f"exec {sys.executable} -c '"
+                    "import sys, time\n"
+                    "block = bytearray(64 * 1024 * 1024)\n"
+                    "end = time.process_time() + 0.3\n"
+                    "while time.process_time() < end: pass\n"
+                    "print(\"Peak memory usage: 12 MB\")\n"
+                    "sys.exit(3)'\n")
+    result = modest.simulate_run(tmp_path / "model.modest")
+
+    assert result.returncode == 3
+    assert result.failure == "exit code 3"
+    assert result.max_rss >= 64
+    assert result.peak_memory == 12.0
+    assert result.memory == result.max_rss
+    assert result.cpu_time >= 0.25
+    assert result.wall_time >= result.cpu_time * 0.9
+    assert result.killed is None
+
+
+@pytest.mark.parametrize("reason", [modest.KILLED_TIMEOUT, modest.KILLED_CANCELLED])
+def test_watchdog_kills_the_run(tmp_path, monkeypatch, reason):
+    pid_file = tmp_path / "pid"
+    stub_executable(tmp_path, monkeypatch, f"echo $$ > {pid_file}\nexec sleep 30\n")
+
+    start = time.monotonic()
+    if reason == modest.KILLED_TIMEOUT:
+        result = modest.simulate_run(tmp_path / "model.modest", timeout=0.5)
+    else:
+        result = modest.simulate_run(tmp_path / "model.modest", cancel=lambda: time.monotonic() - start > 0.5)
+
+    assert time.monotonic() - start < 10
+    assert result.killed == reason
+    assert result.output is None
+    assert result.returncode == -signal.SIGKILL
+    # The process was reaped, not just signalled
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+
+def test_watchdog_kills_a_run_over_its_memory_limit(tmp_path, monkeypatch):
+    stub_executable(tmp_path, monkeypatch, f"exec {sys.executable} -c '"
+                    "import time\n"
+                    "block = bytearray(256 * 1024 * 1024)\n"
+                    "time.sleep(30)'\n")
+    result = modest.simulate_run(tmp_path / "model.modest", max_memory=64)
+
+    assert result.killed == modest.KILLED_MEMORY
+    assert result.failure == f"killed ({modest.KILLED_MEMORY})"
+    assert result.wall_time < 10
+
+
+def test_splitting_needs_an_importance_function():
+    precision = modest.Precision(splitting=modest.SPLITTING_RESTART)
+    with pytest.raises(ValueError, match="importance function"):
+        precision.options()
+
+    options = modest.Precision(splitting=modest.SPLITTING_RESTART, importance_function="resistiveNoise").options()
+    assert options[-4:] == [modest.SPLITTING_METHOD_OPT, modest.SPLITTING_RESTART,
+                            modest.IMPORTANCE_FUNCTION_OPT, "resistiveNoise"]
@@ -0,0 +1,230 @@
+import io
+import re
+
+import pytest
+
+from noc import Noc, PropertyType
+
+
+def instantiate(model: str, constants: dict[str, int]) -> str:
+    """Sets the open constants of a parametric model, the way Modest's -E option does.
+
+    The open declarations get their values, the bound of every slot is evaluated, and the properties are
+    renamed after the clock cycle of their slot, which gives the text of the concrete model.
+    """
+    model = re.sub(r"// The (thresholds are open|clock bound of the property in slot).*\n", "", model)
+    model = re.sub(r"const int (\w+);\n\n?", lambda m: f"const int {m.group(1)} = {constants[m.group(1)]};\n"
+                   if m.group(1).endswith("THRESH") else "", model)
+
+    def bound(match: re.Match) -> str:
+        return str(eval(match.group(1), {}, dict(constants)))
+
+    def clock(match: re.Match) -> str:
+        return str(constants["CLK_LOW"] + int(match.group(1)) * constants["CLK_STRIDE"])
+
+    model = re.sub(r"<=(CLK_LOW \+ \d+ \* CLK_STRIDE)\]", lambda m: f"<={bound(m)}]", model)
+    return re.sub(r"RewardBoundedSlot(\d+)", lambda m: f"RewardBounded{clock(m)}", model)
+
+
+@pytest.mark.parametrize("ptype", [PropertyType.RESISTIVE, PropertyType.INDUCTIVE, PropertyType.BOTH_RI])
+@pytest.mark.parametrize("clk_low, clk_high, stride", [(0, 49, 1), (50, 99, 1), (6, 15, 3), (100, 100, 7)])
+def test_parametric_model_matches_the_concrete_model(ptype, clk_low, clk_high, stride):
+    noc = Noc(2, resistive_noise_threshold=5, inductive_noise_threshold=3)
+    concrete = noc.print(ptype, clk_low=clk_low, clk_high=clk_high, stride=stride)
+
+    # A sweep generates the parametric model once, with the bounds of its first block
+    slots = len(range(clk_low, clk_high + 1, stride))
+    parametric = noc.print(ptype, clk_low=0, clk_high=(slots - 1) * stride, stride=stride, parametric=True)
+
+    assert instantiate(parametric, noc.parametric_constants(clk_low=clk_low, stride=stride)) == concrete
+
+
+def test_fused_parametric_model_matches_the_concrete_model():
+    noc = Noc(2)
+    concrete = noc.print(PropertyType.BOTH_RI, clk_low=20, clk_high=38, stride=2, thresholds=[1, 5, 10])
+    parametric = noc.print(PropertyType.BOTH_RI, clk_low=0, clk_high=18, stride=2, thresholds=[1, 5, 10], parametric=True)
+
+    assert instantiate(parametric, noc.parametric_constants(clk_low=20, stride=2)) == concrete
+
+
+@pytest.mark.parametrize("attribute, value", [
+    ("buffer_size", 6), ("activity_thresh", 2), ("injection_rate_numerator", 1), ("resistive_noise_threshold", 7),
+    ("buffer_encoding", "array"), ("bounded_counters", True), ("specialize_routers", True),
+])
+def test_changing_the_noc_drops_the_cached_sections(attribute, value):
+    noc = Noc(3)
+    before = noc.print(PropertyType.BOTH_RI, clk_high=10)
+    assert noc._sections
+
+    setattr(noc, attribute, value)
+    assert not noc._sections
+
+    after = noc.print(PropertyType.BOTH_RI, clk_high=10)
+    assert after != before
+    assert after == Noc(3, cache_sections=False, **{attribute: value}).print(PropertyType.BOTH_RI, clk_high=10)
+
+
+@pytest.mark.parametrize("cache_sections", [True, False])
+@pytest.mark.parametrize("options", [{}, dict(specialize_routers=True), dict(buffer_encoding="array", bounded_counters=True)])
+def test_chunks_join_into_the_printed_model(cache_sections, options):
+    noc = Noc(3, cache_sections=cache_sections, **options)
+    for kwargs in [dict(clk_low=4, clk_high=20, stride=4), dict(clk_high=9, parametric=True), dict(thresholds=[1, 5])]:
+        # The second round is generated from whatever the first one cached
+        for _ in range(2):
+            assert "".join(noc.iter_chunks(PropertyType.BOTH_RI, **kwargs)) == noc.print(PropertyType.BOTH_RI, **kwargs)
+    assert bool(noc._sections) == cache_sections
+
+
+@pytest.mark.parametrize("ptype", [PropertyType.RESISTIVE, PropertyType.FUNCTION])
+@pytest.mark.parametrize("buffer_size", [1, 4])
+def test_array_buffers_only_change_the_buffer_encoding(ptype, buffer_size):
+    lists = Noc(3, buffer_size=buffer_size)
+    arrays = Noc(3, buffer_size=buffer_size, buffer_encoding="array")
+    list_model = lists.print(ptype, clk_high=5)
+    array_model = arrays.print(ptype, clk_high=5)
+
+    empty = f"buffer {{slots: [{', '.join(['0'] * buffer_size)}], count: 0}}"
+    assert array_model.count(f"buffer: {empty}") == 5 * arrays.num_nodes
+    assert "buffer option" not in array_model
+
+    # The functions are unrolled over the slots, and a full buffer saturates one past its length
+    assert array_model.count(" ? n : ls.slots[") == buffer_size
+    assert array_model.count("(ls.count > ") == buffer_size
+    assert f"slots: [{''.join(f'ls.slots[{i}], ' for i in range(1, buffer_size))}0]" in array_model
+    assert "int(0..BUFFER_LENGTH + 1) count" in array_model
+    assert "count: sat_add(ls.count, 1, BUFFER_LENGTH + 1)" in array_model
+
+    # Everything else is the model with lists
+    for noc, model in [(lists, list_model), (arrays, array_model)]:
+        assert noc.buffer_datatype() in model and noc.buffer_functions() in model
+    list_rest = list_model.replace(lists.buffer_datatype(), "").replace(lists.buffer_functions(), "")
+    array_rest = array_model.replace(arrays.buffer_datatype(), "").replace(arrays.buffer_functions(), "")
+    assert list_rest.replace("buffer option", "buffer").replace("buffer: none", f"buffer: {empty}") == array_rest
+
+
+DIRECTIONS = ["NORTH", "WEST", "EAST", "SOUTH"]
+OPPOSITE = {"NORTH": "SOUTH", "WEST": "EAST", "EAST": "WEST", "SOUTH": "NORTH"}
+
+
+def generic_neighbors(model: str) -> dict[int, dict[str, int]]:
+    """Reads the neighbor of each router in each direction from the `ids` of the generic model."""
+    tables = re.findall(r"ids: \[([^\]]+)\]", model)
+    return {id: {dir: int(neighbor) for dir, neighbor in zip(DIRECTIONS, ids.split(", ")) if neighbor != "NO_CONNECT"}
+            for id, ids in enumerate(tables)}
+
+
+def generic_route(id: int, destination: int, width: int) -> str:
+    """The direction the generic `AdvanceFlits` sends a flit in, by `getColumnShift`."""
+    shift = destination % width - id % width
+    if shift == 0:
+        return "NORTH" if destination < id else "SOUTH"
+    return "WEST" if shift < 0 else "EAST"
+
+
+def specialized_route(body: str, id: int, destination: int, width: int) -> str:
+    """Follows the branches of a specialized `AdvanceFlits_{id}` for a flit with the given destination."""
+    body = body.strip()
+    match = re.match(r"Send_(\d+)_(\w+)\(ch\)$", body)
+    if match:
+        assert int(match.group(1)) == id
+        return match.group(2)
+
+    match = re.match(r"if\s*\((.+?)\)\s*\{", body)
+    condition = match.group(1).replace(f"peekFront(noc[{id}].channels[ch].buffer)", str(destination))
+    then, rest = split_block(body[match.end():])
+    otherwise, rest = split_block(re.match(r"\s*else\s*\{", rest) and rest[rest.index("{") + 1:])
+    assert not rest.strip()
+    taken = then if eval(condition.replace("NOC_MESH_WIDTH", str(width))) else otherwise
+    return specialized_route(re.sub(r"//.*", "", taken), id, destination, width)
+
+
+def split_block(text: str) -> tuple[str, str]:
+    """Splits the text after an opening brace into the block and what follows its closing brace."""
+    depth = 1
+    for i, char in enumerate(text):
+        depth += {"{": 1, "}": -1}.get(char, 0)
+        if depth == 0:
+            return text[:i], text[i + 1:]
+    raise AssertionError("Unbalanced braces")
+
+
+@pytest.mark.parametrize("ptype", [PropertyType.RESISTIVE, PropertyType.FUNCTION])
+def test_specialized_routers_match_the_generic_topology(ptype):
+    width = 3
+    noc = Noc(width, specialize_routers=True)
+    neighbors = generic_neighbors(noc.print(ptype, clk_high=5))
+    # The first and last chunk are the comments around the section
+    routers = list(noc.iter_router_processes(ptype))[1:-1]
+    assert len(routers) == len(neighbors) == noc.num_nodes
+
+    for id, processes in enumerate(routers):
+        # Every connected direction has a Send into the opposite channel of that neighbor, and no other does
+        sends = re.findall(r"process Send_(\d+)_(\w+)\(int ch\).*?\n    if\(!noc\[(\d+)\]\.channels\[(\w+)\]\.isFull", processes, re.S)
+        assert {dir: int(neighbor) for _, dir, neighbor, _ in sends} == neighbors[id]
+        assert all(int(sender) == id and channel == OPPOSITE[dir] for sender, dir, _, channel in sends)
+
+        # The channels without a neighbor are marked serviced right away
+        unconnected = re.search(rf"process AdvanceChannel_{id}\(int ch\) \{{.*?if \((.*?)noc\[{id}\]", processes, re.S).group(1)
+        assert set(re.findall(r"ch == (\w+)", unconnected)) == set(DIRECTIONS) - set(neighbors[id])
+
+        # Every destination is routed as the generic XY routing does, and only towards a neighbor
+        body, _ = split_block(processes[processes.index(f"process AdvanceFlits_{id}(int ch) {{") + len(f"process AdvanceFlits_{id}(int ch) {{"):])
+        body = re.sub(r"//.*", "", body)
+        for destination in range(noc.num_nodes):
+            if destination == id:
+                continue
+            dir = specialized_route(body, id, destination, width)
+            assert dir == generic_route(id, destination, width)
+            assert dir in neighbors[id]
+
+        assert f"process Router_{id}() {{" in processes
+        assert (f"UpdateGlobalNoiseTracking({id});" in processes) == (ptype != PropertyType.FUNCTION)
+
+
+def noise_bounds_and_thresholds(model: str, constants: dict[str, int]) -> dict[str, tuple[int, list[int]]]:
+    """Reads the saturation bound of each noise counter and the thresholds its properties check."""
+    values = dict(constants)
+    values.update((name, int(value)) for name, value in re.findall(r"const int (\w+) = (-?\d+);", model))
+    values.update((name, values[value]) for name, value in re.findall(r"const int (\w+) = ([A-Z_]+);", model))
+
+    result = {}
+    for noise in ["resistive", "inductive"]:
+        checked = [values.get(t) if not t.isdigit() else int(t) for t in re.findall(rf"\({noise}Noise >= (\w+)\)", model)]
+        result[noise] = (values[f"{noise.upper()}_NOISE_MAX"], checked)
+    return result
+
+
+@pytest.mark.parametrize("ptype", [PropertyType.RESISTIVE, PropertyType.INDUCTIVE, PropertyType.BOTH_RI])
+@pytest.mark.parametrize("parametric", [False, True])
+@pytest.mark.parametrize("thresholds", [None, [1, 12, 5]])
+def test_bounded_noise_counters_reach_every_threshold(ptype, parametric, thresholds):
+    # Different thresholds per noise type, so that a bound taken from the wrong one shows
+    noc = Noc(2, bounded_counters=True, resistive_noise_threshold=7, inductive_noise_threshold=3)
+    model = noc.print(ptype, clk_high=6, parametric=parametric, thresholds=thresholds)
+    constants = noc.parametric_constants() if parametric else {}
+
+    bounds = noise_bounds_and_thresholds(model, constants)
+    for noise, (bound, checked) in bounds.items():
+        if ptype.name in (noise.upper(), "BOTH_RI"):
+            assert checked, f"No {noise} properties"
+        # A counter that saturates below a threshold would never satisfy its property
+        assert all(threshold <= bound for threshold in checked), (noise, bound, checked)
+        assert bound == (max(thresholds) if thresholds else {"resistive": 7, "inductive": 3}[noise])
+
+
+@pytest.mark.parametrize("ptype", list(PropertyType))
+@pytest.mark.parametrize("options", [
+    {}, dict(cache_sections=False), dict(buffer_encoding="array"), dict(bounded_counters=True), dict(specialize_routers=True),
+    dict(buffer_encoding="array", bounded_counters=True, specialize_routers=True, cache_sections=False),
+])
+def test_written_model_matches_the_printed_model(ptype, options):
+    noc = Noc(3, **options)
+    kwargs_list = [dict(clk_low=3, clk_high=12, stride=3), dict(clks=[2, 9, 10]),
+                   dict(generate_flits="process GenerateFlits(int id) {\n    tau\n}\n")]
+    if ptype in (PropertyType.RESISTIVE, PropertyType.INDUCTIVE, PropertyType.BOTH_RI):
+        kwargs_list += [dict(clk_high=8, parametric=True), dict(clk_high=8, thresholds=[2, 4])]
+
+    for kwargs in kwargs_list:
+        fp = io.StringIO()
+        noc.write(fp, ptype, **kwargs)
+        assert fp.getvalue() == noc.print(ptype, **kwargs)
@@ -0,0 +1,100 @@
+import math
+
+import pytest
+
+import modest
+import planner
+from campaign import DEFAULT_DURATION_S, Job
+from noc import Noc, PropertyType
+from psn_results import ENGINE_EXACT, ENGINE_SIMULATION
+
+
+def test_state_bound_of_a_2x2_mesh():
+    # Up to 4 flits for any of the 4 routers per channel, and three flags
+    channel = (1 + 4 + 4 ** 2 + 4 ** 3 + 4 ** 4) * 2 ** 3
+    router = channel ** 5 * math.factorial(5) * 5 * 5 * 6 * 6 ** 2
+    expected = 4 * math.log10(router) + math.log10(11) + math.log10(6)
+    assert planner.log10_state_bound(Noc(2, resistive_noise_threshold=5), PropertyType.RESISTIVE) == pytest.approx(expected)
+
+
+def test_state_bound_grows_with_the_model():
+    def bound(size: int = 2, ptype: PropertyType = PropertyType.RESISTIVE, **kwargs) -> float:
+        return planner.log10_state_bound(Noc(size, **kwargs), ptype)
+
+    assert bound(2) < bound(3) < bound(4)
+    assert bound(buffer_size=2) < bound(buffer_size=4)
+    assert bound(resistive_noise_threshold=1) < bound(resistive_noise_threshold=20)
+    # The functional properties have no noise or activity counters
+    assert bound(ptype=PropertyType.FUNCTION) < bound()
+    both = bound(ptype=PropertyType.BOTH_RI, resistive_noise_threshold=5, inductive_noise_threshold=3)
+    assert both == pytest.approx(bound(resistive_noise_threshold=5) + math.log10(4))
+
+
+def job(tmp_path, clk_upper: int | None = 10, stride: int = 1) -> Job:
+    return Job(size=2, ptype=PropertyType.RESISTIVE, threshold=5, stride=stride, clk_upper=clk_upper, result_path=tmp_path)
+
+
+def stub_exploration(monkeypatch, states: int, transitions: int, wall_time: float = 1.0, memory: float = 100.0) -> list[Noc]:
+    explored = []
+
+    def explore_state_space(noc, ptype, *, timeout, max_memory):
+        explored.append(noc)
+        if states is None:
+            return None
+        return states, transitions, modest.RunResult("", wall_time=wall_time, max_rss=memory, returncode=0)
+
+    monkeypatch.setattr(planner, "explore_state_space", explore_state_space)
+    return explored
+
+
+def test_plan_without_a_clock_bound_simulates(tmp_path, monkeypatch):
+    explored = stub_exploration(monkeypatch, 10, 20)
+    plan = planner.plan_job(job(tmp_path, clk_upper=None))
+    assert plan.engine == ENGINE_SIMULATION
+    assert not explored
+
+
+def test_plan_simulates_if_the_exploration_does_not_finish(tmp_path, monkeypatch):
+    stub_exploration(monkeypatch, None, None)
+    plan = planner.plan_job(job(tmp_path))
+    assert plan.engine == ENGINE_SIMULATION
+    assert plan.states is None and plan.exact_time is None
+
+
+def test_plan_checks_small_state_spaces_exactly(tmp_path, monkeypatch):
+    explored = stub_exploration(monkeypatch, 1000, 4000, wall_time=2.0, memory=100.0)
+    plan = planner.plan_job(job(tmp_path, clk_upper=10, stride=2), seconds_per_transition_step=1e-3, exact_memory_factor=2.0)
+
+    assert plan.engine == ENGINE_EXACT
+    assert explored[0].bounded_counters
+    # The properties of clock cycles 0, 2, ..., 10 take 30 steps over the 4000 transitions
+    assert plan.exact_time == pytest.approx(2.0 + 1e-3 * 4000 * 30)
+    assert plan.exact_memory == 200.0
+    assert plan.simulation_time == DEFAULT_DURATION_S[2]
+
+
+def test_plan_simulates_if_exact_checking_is_slower_or_too_large(tmp_path, monkeypatch):
+    stub_exploration(monkeypatch, 10 ** 6, 10 ** 7, memory=1000.0)
+    slow = planner.plan_job(job(tmp_path, clk_upper=1000), seconds_per_transition_step=1e-6)
+    assert slow.engine == ENGINE_SIMULATION
+    assert slow.exact_time >= slow.simulation_time
+
+    large = planner.plan_job(job(tmp_path), memory_mb=1500.0, exact_memory_factor=2.0)
+    assert large.engine == ENGINE_SIMULATION
+    assert large.exact_memory == 2000.0
+
+
+def test_calibration_measures_the_cost_model(tmp_path, monkeypatch):
+    stub_exploration(monkeypatch, 1000, 5000, wall_time=2.0, memory=100.0)
+    checked = []
+
+    def check_run(model, *, timeout, max_memory):
+        checked.append(model)
+        return modest.RunResult("", wall_time=2.0 + 5000 * planner.CALIBRATION_CLK * 1e-6, max_rss=180.0, returncode=0)
+
+    monkeypatch.setattr(modest, "check_run", check_run)
+    seconds_per_step, memory_factor = planner.calibrate(job(tmp_path))
+
+    assert seconds_per_step == pytest.approx(1e-6)
+    assert memory_factor == pytest.approx(1.8)
+    assert len(checked) == 1 and checked[0].count("property ") == 1
@@ -0,0 +1,138 @@
+import re
+
+import pytest
+
+from noc import Noc, PropertyType
+from probabilities import (Estimate, clopper_pearson, iter_probabilities, merge_outputs, parse_estimates,
+                           parse_error_bounds, parse_fused_probabilities, parse_probabilities)
+
+PROPERTY_PATTERN = re.compile(r"property (\w+)\s*= Pmax\(<>\[S\(clk_indicator\)<=([^\]]+)\] \((\w+)Noise >= (\d+)\)\);")
+
+
+def modest_output(properties: str, constants: dict[str, int]) -> tuple[str, dict[tuple[str, int], list[tuple[int, float]]]]:
+    """Answers every property with a probability that encodes its noise type, threshold and clock bound.
+
+    Returns:
+        The canned Modest output, and the curves it should parse into, read off the properties themselves.
+    """
+    output = "Command: modest simulate model.modest\nPeak memory usage: 102 MB\n\n"
+    expected = {}
+    for name, bound, noise, threshold in PROPERTY_PATTERN.findall(properties):
+        clk = eval(bound, {}, dict(constants))
+        probability = clk / 1000 + int(threshold) / 100 + (0.5 if noise == "inductive" else 0.0)
+        expected.setdefault((noise, int(threshold)), []).append((clk, probability))
+        output += (f"  + Property {name}\n"
+                   f"    Estimated probability: {probability}\n"
+                   f"    Runs used:             14780\n\n"
+                   f"    + Error bounds\n"
+                   f"      Statement: Adaptive: P(error > ε) < δ\n"
+                   f"      ε:         0.01\n"
+                   f"      δ:         0.050000000000000044\n\n")
+
+    for curve in expected.values():
+        curve.sort()
+    return output, expected
+
+
+@pytest.mark.parametrize("ptype, thresholds, kwargs", [
+    (PropertyType.BOTH_RI, [1, 5, 10], dict(clk_low=0, clk_high=30, stride=3)),
+    (PropertyType.RESISTIVE, [2, 20], dict(clk_low=7, clk_high=50, stride=7)),
+    (PropertyType.INDUCTIVE, [4], dict(clks=[3, 11, 12])),
+])
+def test_fused_property_names_round_trip(ptype, thresholds, kwargs):
+    properties = Noc(2).fused_properties(ptype, thresholds, **kwargs)
+    output, expected = modest_output(properties, {})
+
+    curves = parse_fused_probabilities(output)
+    assert curves == expected
+    noises = {PropertyType.BOTH_RI: ["resistive", "inductive"], PropertyType.RESISTIVE: ["resistive"],
+              PropertyType.INDUCTIVE: ["inductive"]}[ptype]
+    assert set(curves) == {(noise, threshold) for noise in noises for threshold in thresholds}
+
+
+def test_parametric_fused_property_names_round_trip():
+    noc = Noc(2)
+    properties = noc.fused_properties(PropertyType.BOTH_RI, [1, 5], clk_low=0, clk_high=8, stride=2, parametric=True)
+    constants = noc.parametric_constants(clk_low=40, stride=2)
+    output, expected = modest_output(properties, constants)
+
+    curves = parse_fused_probabilities(output, clk_low=40, stride=2)
+    assert curves == expected
+    assert [clk for clk, _ in curves[("inductive", 5)]] == [40, 42, 44, 46, 48]
+
+
+def test_clopper_pearson_without_successes_or_failures():
+    assert clopper_pearson(0, 20) == (0.0, pytest.approx(0.16843, abs=1e-5))
+    assert clopper_pearson(20, 20) == (pytest.approx(0.83157, abs=1e-5), 1.0)
+    assert clopper_pearson(0, 0) == (0.0, 1.0)
+
+
+def test_clopper_pearson_of_half_the_runs():
+    lower, upper = clopper_pearson(5, 10)
+    assert lower == pytest.approx(0.187, abs=1e-3)
+    assert upper == pytest.approx(0.813, abs=1e-3)
+    assert clopper_pearson(5, 10, confidence=0.99)[0] < lower
+
+
+def replica_output(counts: dict[int, tuple[int, int]]) -> str:
+    """Modest output with the given (successes, runs) for the resistive property of each clock cycle."""
+    output = "Command: modest simulate model.modest\n\n"
+    for clk, (successes, runs) in counts.items():
+        output += (f"  + Property resistiveNoiseProbability1RewardBounded{clk}\n"
+                   f"    Estimated probability: {successes / runs:.10f}\n"
+                   f"    Runs used:             {runs}\n\n")
+    return output
+
+
+def test_merged_outputs_pool_the_counts():
+    outputs = [replica_output({3: (1, 8), 5: (4, 8)}), replica_output({3: (2, 8), 5: (8, 8)})]
+    merged = merge_outputs(outputs)
+
+    assert parse_estimates(merged) == {
+        "resistiveNoiseProbability1RewardBounded3": Estimate(3, 16),
+        "resistiveNoiseProbability1RewardBounded5": Estimate(12, 16),
+    }
+    assert parse_probabilities(merged) == [(3, 3 / 16), (5, 12 / 16)]
+    # The pooled output reads like the output of a single simulation
+    assert merge_outputs([merged]) == merged.replace("Pooled 2", "Pooled 1")
+
+
+def test_merged_probabilities_avoid_exponent_notation():
+    merged = merge_outputs([replica_output({7: (1, 1_000_000)})])
+    assert parse_probabilities(merged) == [(7, 1e-6)]
+
+
+@pytest.mark.parametrize("slot, kwargs", [("", {}), ("Slot", dict(clk_low=40, stride=3))])
+def test_incremental_parsing_matches_the_whole_output(slot, kwargs):
+    text = "Command: modest simulate model.modest\nPeak memory usage: 102 MB\n\n"
+    for i, probability in enumerate([0.0, 0.125, 0.5, 0.875, 1.0]):
+        text += (f"  + Property resistiveNoiseProbability1RewardBounded{slot}{i * 2}\n"
+                 f"    {'Estimated probability' if i % 2 else 'Probability'}: {probability}\n"
+                 f"    Runs used:             14780\n\n")
+
+    lines = text.splitlines(keepends=True)
+    assert list(iter_probabilities(lines, **kwargs)) == parse_probabilities(text, **kwargs)
+    assert len(parse_probabilities(text, **kwargs)) == 5
+
+
+def test_error_bounds_are_parsed_per_property():
+    output = ("  + Property resistiveNoiseProbability1RewardBounded3\n"
+              "    Estimated probability: 0.25\n"
+              "    Runs used:             14780\n\n"
+              "    + Error bounds\n"
+              "      Statement: Adaptive: P(error > ε) < δ\n"
+              "      ε:         0.01\n"
+              "      δ:         0.050000000000000044\n\n"
+              "  + Property resistiveNoiseProbability1RewardBounded4\n"
+              "    Estimated probability: 0.5\n\n"
+              "  + Property resistiveNoiseProbability1RewardBounded5\n"
+              "    Estimated probability: 1E-05\n\n"
+              "    + Error bounds\n"
+              "      Statement: Relative: P(|error| > ε·p) < δ\n"
+              "      ε:         1E-1\n"
+              "      δ:         5e-2\n")
+    assert parse_error_bounds(output) == {
+        "resistiveNoiseProbability1RewardBounded3": ("Adaptive: P(error > ε) < δ", 0.01, 0.050000000000000044),
+        "resistiveNoiseProbability1RewardBounded5": ("Relative: P(|error| > ε·p) < δ", 0.1, 0.05),
+    }
+    assert parse_error_bounds("Peak memory usage: 102 MB\n") == {}
@@ -0,0 +1,168 @@
+import time
+
+import pytest
+
+import modest
+import psn_results
+from probabilities import parse_probabilities
+from psn_results import SATURATION_PROBABILITY, balanced_blocks, find_saturation, refinement_points
+from scheduling import RetryPolicy
+
+
+def step_probe(saturation: int, probed: list[int]):
+    """A monotone probability that saturates at a clock cycle, recording the clock cycles it was probed at."""
+    def probe(clk: int) -> float:
+        probed.append(clk)
+        return 1.0 if clk >= saturation else min(clk / saturation, 0.9)
+    return probe
+
+
+@pytest.mark.parametrize("saturation", [1, 7, 64, 65, 1000, 4097])
+def test_find_saturation_of_a_monotone_probe(saturation):
+    probed = []
+    assert find_saturation(step_probe(saturation, probed)) == saturation
+    # The exponential and the binary search take about log2(k) probes each
+    assert len(probed) <= 2 * max(saturation, 64).bit_length() + 2
+
+
+@pytest.mark.parametrize("saturation, stride, expected", [(10, 3, 12), (12, 3, 12), (100, 7, 105)])
+def test_find_saturation_only_probes_multiples_of_the_stride(saturation, stride, expected):
+    probed = []
+    assert find_saturation(step_probe(saturation, probed), stride=stride, start=stride) == expected
+    assert all(clk % stride == 0 for clk in probed)
+
+
+def test_find_saturation_gives_up_at_the_limit():
+    probed = []
+    assert find_saturation(lambda clk: probed.append(clk) or SATURATION_PROBABILITY / 2, limit=1000) is None
+    assert max(probed) <= 1000
+
+
+@pytest.mark.parametrize("clk_upper, block_size, stride, workers", [
+    (100, 50, 1, 1), (100, 50, 1, 8), (99, 10, 1, 3), (200, 60, 3, 4), (5, 50, 1, 16), (0, 50, 1, 4),
+])
+def test_balanced_blocks_cover_the_sweep(clk_upper, block_size, stride, workers):
+    blocks = balanced_blocks(clk_upper, block_size, stride, workers)
+    properties = clk_upper // stride + 1
+
+    # Adjacent blocks touch, and together they hold every multiple of the stride up to clk_upper
+    assert blocks[0][0] == 0
+    assert blocks[-1][1] == clk_upper
+    assert all(upper + 1 == lower for (_, upper), (lower, _) in zip(blocks, blocks[1:]))
+    assert all(lower % stride == 0 for lower, _ in blocks)
+
+    sizes = [len(range(lower, upper + 1, stride)) for lower, upper in blocks]
+    assert sum(sizes) == properties
+    assert max(sizes) <= max(block_size // stride, 1)
+    assert len(blocks) >= min(workers, properties)
+
+
+def test_balanced_blocks_split_evenly():
+    assert balanced_blocks(99, 40) == [(0, 33), (34, 67), (68, 99)]
+    assert balanced_blocks(99, 100, workers=4) == [(0, 24), (25, 49), (50, 74), (75, 99)]
+
+
+# The curve of the stubbed Modest runs, which saturates at clock cycle SATURATION
+SATURATION = 45
+
+
+def curve_probability(clk: int) -> float:
+    return min(clk / SATURATION, 1.0)
+
+
+def stub_simulate_run(tmp_path, *, failing: dict[int, int] = {}, slow_from: int | None = None):
+    """A stand-in for `modest.simulate_run` whose model text is "lower,upper".
+
+    Blocks in `failing` fail that many attempts, counted in files since the attempts run in worker processes.
+    Blocks from `slow_from` on run until they are cancelled.
+    """
+    def simulate_run(model, *, cancel=None, **kwargs):
+        lower, upper = map(int, model.split(","))
+        if lower in failing:
+            attempts = tmp_path / f"attempts_{lower}"
+            count = len(attempts.read_text()) if attempts.exists() else 0
+            attempts.write_text("x" * (count + 1))
+            if count < failing[lower]:
+                return modest.RunResult(None, returncode=1)
+
+        deadline = time.time() + (10.0 if slow_from is not None and lower >= slow_from else 0.02)
+        while time.time() < deadline:
+            if cancel is not None and cancel():
+                return modest.RunResult(None, killed=modest.KILLED_CANCELLED)
+            time.sleep(0.01)
+
+        output = "".join(f"  + Property resistiveNoiseProbability1RewardBounded{clk}\n"
+                         f"    Estimated probability: {curve_probability(clk)}\n\n" for clk in range(lower, upper + 1))
+        return modest.RunResult(output, returncode=0)
+
+    return simulate_run
+
+
+def run_blocks(workers: int, retry: RetryPolicy = RetryPolicy(attempts=1)) -> list[tuple[int, int, str | None]]:
+    """Runs a sweep of 10 clock cycle blocks up to 199, returning the merged blocks and their failures."""
+    merged = []
+
+    def merge(lower: int, upper: int, result: modest.RunResult) -> bool:
+        merged.append((lower, upper, result.failure))
+        return result.failure is None and saturates(lower, upper, result.output)
+
+    def saturates(lower: int, upper: int, output: str) -> bool:
+        return max(p for _, p in parse_probabilities(output)) >= SATURATION_PROBABILITY
+
+    psn_results._run_blocks(psn_results.clock_blocks(199, 10), lambda lower, upper: dict(model=f"{lower},{upper}"),
+                            merge, saturates, workers, retry=retry)
+    return merged
+
+
+SATURATED_SWEEP = [(lower, lower + 9, None) for lower in range(0, 50, 10)]
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_run_blocks_merges_in_clock_order_until_saturation(monkeypatch, tmp_path, workers):
+    monkeypatch.setattr(modest, "simulate_run", stub_simulate_run(tmp_path))
+    assert run_blocks(workers) == SATURATED_SWEEP
+
+
+def test_run_blocks_cancels_blocks_past_saturation(monkeypatch, tmp_path):
+    # Blocks after the saturated one would run for 10 s unless they are cancelled
+    monkeypatch.setattr(modest, "simulate_run", stub_simulate_run(tmp_path, slow_from=50))
+    start = time.time()
+    assert run_blocks(3) == SATURATED_SWEEP
+    assert time.time() - start < 5.0
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_run_blocks_retries_failed_blocks(monkeypatch, tmp_path, workers):
+    monkeypatch.setattr(modest, "simulate_run", stub_simulate_run(tmp_path, failing={10: 1, 30: 2}))
+    assert run_blocks(workers, RetryPolicy(attempts=3, initial_delay=0.0)) == SATURATED_SWEEP
+    assert (tmp_path / "attempts_30").read_text() == "xxx"
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_run_blocks_merges_blocks_that_fail_every_attempt(monkeypatch, tmp_path, workers):
+    monkeypatch.setattr(modest, "simulate_run", stub_simulate_run(tmp_path, failing={20: 5}))
+    merged = run_blocks(workers, RetryPolicy(attempts=2, initial_delay=0.0))
+    assert merged == SATURATED_SWEEP[:2] + [(20, 29, "exit code 1")] + SATURATED_SWEEP[3:]
+
+
+def test_refinement_points_split_steep_intervals():
+    probs = [(0, 0.0), (8, 0.05), (16, 0.5), (24, 0.9), (32, 0.95)]
+    assert refinement_points(probs, 0.1) == [12, 20]
+    # The tolerance is exclusive, and every interval above it is refined
+    assert refinement_points(probs, 0.05) == [12, 20]
+    assert refinement_points(probs, 0.04) == [4, 12, 20, 28]
+    assert refinement_points(probs, 0.5) == []
+
+
+def test_refinement_points_leave_out_skipped_and_adjacent_cycles():
+    probs = [(0, 0.0), (1, 0.5), (5, 1.0), (10, 1.0)]
+    # Adjacent cycles have nothing in between, and uneven intervals round down
+    assert refinement_points(probs, 0.1) == [3]
+    assert refinement_points(probs, 0.1, skip={3}) == []
+
+
+def test_flat_curve_needs_no_refinement():
+    assert refinement_points([(clk, 0.3) for clk in range(0, 100, 10)], 0.01) == []
+    assert refinement_points([(clk, 1.0) for clk in range(0, 100, 10)], 0.0) == []
+    assert refinement_points([(0, 0.2)], 0.01) == []
+    assert refinement_points([], 0.01) == []
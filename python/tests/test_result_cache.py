@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from result_cache import ResultCache
+
+OUTPUT = "  + Property resistiveNoiseProbability1RewardBounded3\n    Estimated probability: 0.25\n"
+
+
+def test_key_depends_on_every_part():
+    key = ResultCache.key("model", "v1", "simulate")
+    assert key == ResultCache.key("model", "v1", "simulate")
+    assert key != ResultCache.key("model2", "v1", "simulate")
+    assert key != ResultCache.key("model", "v2", "simulate")
+    assert key != ResultCache.key("model", "v1", "check")
+    # The parts are separated, so they can't run into each other
+    assert ResultCache.key("m", "ab", "c") != ResultCache.key("m", "a", "bc")
+
+
+def test_put_and_get(tmp_path):
+    cache = ResultCache(tmp_path)
+    key = cache.key("model", "v1")
+    assert cache.get(key) is None
+
+    cache.put(key, OUTPUT)
+    entry = cache.get(key)
+    assert entry.output == OUTPUT
+    assert entry.probabilities == [(3, 0.25)]
+
+
+def test_evicts_the_least_recently_used_entries(tmp_path):
+    cache = ResultCache(tmp_path)
+    keys = [cache.key(f"model {i}") for i in range(3)]
+    for i, key in enumerate(keys[:2]):
+        cache.put(key, OUTPUT)
+        os.utime(tmp_path / f"{key}.json", (1000 + i, 1000 + i))
+
+    # Reading the older entry makes the other one the least recently used
+    assert cache.get(keys[0]) is not None
+
+    entry_size = (tmp_path / f"{keys[0]}.json").stat().st_size
+    cache.max_bytes = 2 * entry_size + entry_size // 2
+    cache.put(keys[2], OUTPUT)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+
+
+@pytest.mark.parametrize("content", ['{"output": "trunc', '{"probabilities": []}', '{"output": "", "probabilities": 5}', "[]"])
+def test_corrupt_entry_is_a_miss(tmp_path, content):
+    cache = ResultCache(tmp_path)
+    key = cache.key("model")
+    (tmp_path / f"{key}.json").write_text(content)
+
+    assert cache.get(key) is None
+    assert not (tmp_path / f"{key}.json").exists()
+
+    # The entry can be stored again
+    cache.put(key, OUTPUT)
+    assert cache.get(key).output == OUTPUT
+
+
+def test_clear(tmp_path):
+    cache = ResultCache(tmp_path)
+    key = cache.key("model")
+    cache.put(key, OUTPUT)
+    cache.clear()
+    assert cache.get(key) is None
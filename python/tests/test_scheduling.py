@@ -0,0 +1,143 @@
+import math
+import threading
+
+import pytest
+
+from modest import RunResult
+from scheduling import BlockSizeTuner, MemoryBudget, RetryPolicy
+
+
+def calibrated(a: float, b: float, sizes: tuple[int, ...] = (8, 32), **kwargs) -> BlockSizeTuner:
+    """A tuner that measured one run of each calibration size, costing exactly `a + b * n`."""
+    tuner = BlockSizeTuner(sizes, **kwargs)
+    for n in sizes:
+        tuner.record(n, a + b * n)
+    return tuner
+
+
+def test_calibration_alternates_until_two_sizes_are_measured():
+    tuner = BlockSizeTuner((8, 32))
+    assert [tuner.next_size() for _ in range(4)] == [8, 32, 8, 32]
+
+    # Runs of a single size can't separate the fixed cost from the cost per property
+    tuner.record(8, 3.0)
+    tuner.record(8, 3.2)
+    assert tuner.fit() is None
+    assert tuner.next_size() == 8
+    assert tuner.chosen is None
+
+
+def test_fit_recovers_the_cost_model():
+    tuner = BlockSizeTuner((8, 32))
+    for n in (8, 32, 8, 32, 16):
+        tuner.record(n, 2.0 + 0.05 * n)
+    a, b = tuner.fit()
+    assert a == pytest.approx(2.0)
+    assert b == pytest.approx(0.05)
+
+
+def test_fit_is_least_squares():
+    tuner = BlockSizeTuner((1, 3))
+    for n, t in [(1, 1.0), (2, 3.0), (3, 2.0)]:
+        tuner.record(n, t)
+    # The least squares line through (1, 1), (2, 3) and (3, 2)
+    assert tuner.fit() == pytest.approx((1.0, 0.5))
+
+
+def test_chooses_the_size_minimizing_the_total_time():
+    tuner = calibrated(2.0, 0.05)
+    assert tuner.next_size(remaining=400) == round(math.sqrt(2 * 400 * 2.0 / 0.05))
+
+    # The choice is kept for the rest of the sweep
+    assert tuner.next_size(remaining=10) == tuner.chosen == 179
+
+
+@pytest.mark.parametrize("a, b, kwargs, expected", [
+    (100.0, 0.001, dict(max_size=500), 500),   # Huge fixed cost
+    (0.001, 10.0, dict(min_size=4), 4),        # Huge cost per property
+    (2.0, -0.01, dict(max_size=300), 300),     # Noisy timings with no cost per property
+    (-1.0, 0.05, dict(min_size=2), 2),         # Noisy timings with no fixed cost
+])
+def test_size_is_clamped(a, b, kwargs, expected):
+    assert calibrated(a, b, **kwargs).next_size(remaining=10_000) == expected
+
+
+def test_size_leaves_a_block_for_every_worker():
+    assert calibrated(100.0, 0.01).next_size(remaining=400, workers=4) == 100
+
+
+def test_unknown_remaining_uses_the_default():
+    tuner = calibrated(2.0, 0.05, default_remaining=100)
+    assert tuner.next_size() == round(math.sqrt(2 * 100 * 2.0 / 0.05))
+
+
+def test_budget_always_admits_when_idle():
+    budget = MemoryBudget(100.0, default_estimate_mb=600.0)
+    token = budget.try_admit("8x8")
+    assert token is not None
+    assert budget.in_use == 600.0
+
+    assert budget.try_admit("8x8") is None
+    budget.release(token)
+    assert budget.in_use == 0.0
+
+
+def test_budget_admits_runs_that_fit():
+    budget = MemoryBudget(1000.0, default_estimate_mb=300.0)
+    tokens = [budget.try_admit("2x2"), budget.try_admit("2x2"), budget.try_admit("2x2")]
+    assert None not in tokens
+    assert budget.try_admit("2x2") is None
+    # Runs admitted together reserve their memory together
+    budget.release(tokens.pop())
+    assert budget.try_admit("2x2", count=2) is None
+    assert budget.try_admit("2x2", count=1) is not None
+
+
+def test_admission_blocks_until_memory_is_released():
+    budget = MemoryBudget(500.0, default_estimate_mb=300.0)
+    first = budget.admit("4x4")
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(budget.admit("4x4")))
+    waiter.start()
+
+    waiter.join(0.2)
+    assert waiter.is_alive() and not admitted
+
+    budget.release(first)
+    waiter.join(5.0)
+    assert not waiter.is_alive() and admitted
+
+
+def test_record_keeps_the_largest_measurement():
+    budget = MemoryBudget(1000.0, default_estimate_mb=600.0)
+    assert budget.estimate("3x3") == 600.0
+
+    budget.record("3x3", RunResult("", max_rss=120.0))
+    budget.record("3x3", RunResult("", max_rss=80.0, peak_memory=150.0))
+    budget.record("3x3", RunResult("", max_rss=90.0))
+    assert budget.estimate("3x3") == 150.0
+
+    # Cached and unmeasured runs say nothing about the memory of a run
+    budget.record("3x3", RunResult("", max_rss=900.0, cached=True))
+    budget.record("4x4", RunResult(""))
+    assert budget.estimate("3x3") == 150.0
+    assert budget.estimate("4x4") == 600.0
+
+
+def test_a_measurement_replaces_the_default_estimate():
+    budget = MemoryBudget(1000.0, default_estimate_mb=600.0)
+    budget.defaults[("simulate", 2)] = 120.0
+    assert budget.estimate(("simulate", 2)) == 120.0
+    assert budget.estimate(("simulate", 3)) == 600.0
+
+    budget.record(("simulate", 2), RunResult("", max_rss=40.0))
+    budget.record(("simulate", 3), RunResult("", max_rss=250.0))
+    assert budget.estimate(("simulate", 2)) == 40.0
+    assert budget.estimate(("simulate", 3)) == 250.0
+
+
+def test_retry_delays_back_off_up_to_the_cap():
+    policy = RetryPolicy(attempts=6, initial_delay=5.0, backoff=2.0, max_delay=30.0)
+    assert [policy.delay(retry) for retry in range(1, 6)] == [5.0, 10.0, 20.0, 30.0, 30.0]
+    assert RetryPolicy(initial_delay=1.0, backoff=1.0).delay(50) == 1.0
+    assert RetryPolicy().delay(100) == RetryPolicy().max_delay